@@ -0,0 +1,102 @@
+import sys
+import time
+import importlib
+import tracemalloc
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+def criar_soup(html, somente=None, parser=None):
+    """
+    Analisa o HTML com o parser mais rápido disponível (lxml, se instalado;
+    senão html.parser).
+
+    Args:
+        somente (SoupStrainer, opcional): Restringe a árvore aos elementos que
+            casam com o filtro (e aos seus descendentes), ex.: o container dos cards.
+        parser (str, opcional): Força um parser específico.
+    """
+    return BeautifulSoup(html, parser or PARSER, parse_only=somente)
+
+def seletor(css):
+    """
+    Compila um seletor CSS uma única vez (uso: SELETOR.select(soup), .select_one(tag)).
+    """
+    return soupsieve.compile(css)
+
+def container(nome, **atributos):
+    """
+    Filtro para restringir a análise a um container (ex.: div#div-cardsParity).
+    """
+    return SoupStrainer(nome, **atributos)
+
+# Extratores comparados pelo benchmark: apelido -> (módulo, função que recebe o HTML)
+EXTRATORES = {
+    "esf": ("grade_esfera", "cards_do_html"),
+    "liv": ("liv", "cards_do_html"),
+    "banners": ("slid_liv", "banners_do_html"),
+}
+
+# Configurações comparadas: (rótulo, parser, restringir ao container)
+CONFIGURACOES = [
+    ("html.parser, documento inteiro", "html.parser", False),
+    ("html.parser, só o container", "html.parser", True),
+    ("lxml, documento inteiro", "lxml", False),
+    ("lxml, só o container", "lxml", True),
+]
+
+def medir(funcao, html, repeticoes):
+    """
+    Returns:
+        tuple: (resultado, melhor tempo em segundos, pico de memória em bytes).
+    """
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(html)
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcao(html)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, melhor, pico
+
+def benchmark(apelido, caminhos, repeticoes=5):
+    """
+    Compara tempo de análise e pico de memória das configurações de parser
+    sobre páginas salvas, conferindo se todas extraem os mesmos cards.
+    """
+    modulo, nome_funcao = EXTRATORES[apelido]
+    extrair = getattr(importlib.import_module(modulo), nome_funcao)
+
+    for caminho in caminhos:
+        with open(caminho, encoding="utf-8") as arquivo:
+            html = arquivo.read()
+        print(f"[INFO] {caminho} ({len(html) / 1024:.0f} KiB), melhor de {repeticoes}:")
+
+        referencia = None
+        for rotulo, parser, restringir in CONFIGURACOES:
+            if parser == "lxml" and PARSER != "lxml":
+                print(f"  {rotulo:<32} lxml não instalado")
+                continue
+            resultado, tempo, pico = medir(
+                lambda texto: extrair(texto, parser=parser, restringir=restringir), html, repeticoes
+            )
+            if referencia is None:
+                referencia = resultado
+            igual = "ok" if resultado == referencia else "DIFERENTE"
+            quantidade = len(resultado) if resultado is not None else 0
+            print(f"  {rotulo:<32} {tempo * 1000:8.1f} ms  pico {pico / 1024 / 1024:7.2f} MiB  "
+                  f"{quantidade} cards  {igual}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in EXTRATORES:
+        print(f"Uso: python analise_html.py {{{'|'.join(EXTRATORES)}}} pagina.html [pagina.html ...]")
+        sys.exit(1)
+    benchmark(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,143 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+# zstd (pacote zstandard) quando instalado; senão gzip, da biblioteca padrão
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Pasta do arquivo de páginas brutas; desativado por padrão (ative com, por
+# exemplo, MILOG_ARQUIVO=arquivo_paginas numa máquina em que a pasta persista).
+# Cada página é guardada uma única vez, comprimida, em
+# objetos/<2 primeiros>/<sha256>.<ext>; indice.jsonl registra cada obtenção
+# (fonte, URL, horário, hash).
+PASTA_ARQUIVO = os.getenv("MILOG_ARQUIVO", "")
+
+# No modo de extração 'js' a página não é serializada; arquivá-la exige ler o
+# page_source só para isso, o que só é feito com MILOG_ARQUIVO_JS=1
+ARQUIVAR_NO_MODO_JS = os.getenv("MILOG_ARQUIVO_JS", "").strip().lower() in ("1", "true", "sim", "yes")
+
+# Nível de compressão (zstd: 1-22; gzip: 1-9)
+NIVEL_COMPRESSAO = int(os.getenv("MILOG_ARQUIVO_NIVEL", "9"))
+
+# Compressões possíveis dos objetos (também a extensão do arquivo)
+COMPRESSOES = ("zst", "gz")
+
+_trava = threading.Lock()
+
+def arquivo_ativo() -> bool:
+    return PASTA_ARQUIVO.strip().lower() not in ("", "0", "false", "nao", "no")
+
+def caminho_indice():
+    return os.path.join(PASTA_ARQUIVO, "indice.jsonl")
+
+def caminho_objeto(hash_pagina, compressao):
+    return os.path.join(PASTA_ARQUIVO, "objetos", hash_pagina[:2], f"{hash_pagina}.{compressao}")
+
+def comprimir(dados):
+    """
+    Returns:
+        tuple: (compressão usada, bytes comprimidos).
+    """
+    if zstandard is not None:
+        return "zst", zstandard.ZstdCompressor(level=min(NIVEL_COMPRESSAO, 22)).compress(dados)
+    return "gz", gzip.compress(dados, compresslevel=min(NIVEL_COMPRESSAO, 9), mtime=0)
+
+def descomprimir(compressao, dados):
+    if compressao == "zst":
+        if zstandard is None:
+            raise RuntimeError("Página comprimida com zstd; instale o pacote 'zstandard' para lê-la.")
+        return zstandard.ZstdDecompressor().decompress(dados)
+    return gzip.decompress(dados)
+
+def objeto_existente(hash_pagina):
+    """
+    Compressão do objeto já guardado com esse hash (None se não existir).
+    """
+    for compressao in COMPRESSOES:
+        if os.path.exists(caminho_objeto(hash_pagina, compressao)):
+            return compressao
+    return None
+
+def arquivar(fonte, url, conteudo, tipo="html"):
+    """
+    Guarda uma página obtida (HTML ou JSON) no arquivo e registra a obtenção no
+    índice. Páginas idênticas a uma já guardada só ganham a linha do índice.
+    Falhas de disco não interrompem a coleta.
+
+    Args:
+        fonte (str): Quem obteve a página, ex.: 'esf', 'esf.api', 'liv', 'banners'.
+        conteudo (str ou bytes): Corpo da página (já descomprimido).
+        tipo (str): 'html' ou 'json'.
+
+    Returns:
+        str ou None: Hash sha256 da página; None se o arquivo estiver desativado ou falhou.
+    """
+    if not arquivo_ativo() or conteudo is None:
+        return None
+    dados = conteudo.encode("utf-8") if isinstance(conteudo, str) else conteudo
+    hash_pagina = hashlib.sha256(dados).hexdigest()
+    try:
+        compressao = objeto_existente(hash_pagina)
+        if compressao is None:
+            compressao, comprimidos = comprimir(dados)
+            caminho = caminho_objeto(hash_pagina, compressao)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, "wb") as arquivo:
+                arquivo.write(comprimidos)
+            os.replace(temporario, caminho)
+
+        entrada = {
+            "data_hora": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "fonte": fonte,
+            "url": url,
+            "tipo": tipo,
+            "hash": hash_pagina,
+            "compressao": compressao,
+        }
+        with _trava, open(caminho_indice(), "a", encoding="utf-8") as indice:
+            indice.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"[WARN] Não foi possível arquivar a página de '{fonte}': {e}")
+        return None
+    return hash_pagina
+
+def entradas(fontes=None, desde=None):
+    """
+    Percorre o índice em ordem de obtenção, sem carregá-lo inteiro na memória.
+
+    Args:
+        fontes (iterable of str, opcional): Só as entradas cujo programa (parte
+            do nome da fonte antes do '.') esteja entre estes.
+        desde (str, opcional): Só as entradas a partir deste horário ('AAAA-MM-DD HH:MM:SS').
+
+    Yields:
+        dict: Entradas do índice (data_hora, fonte, url, tipo, hash, compressao).
+    """
+    if not os.path.exists(caminho_indice()):
+        return
+    fontes = set(fontes) if fontes is not None else None
+    with open(caminho_indice(), encoding="utf-8") as indice:
+        for linha in indice:
+            try:
+                entrada = json.loads(linha)
+            except ValueError:
+                continue  # linha truncada por uma gravação interrompida
+            if fontes is not None and entrada["fonte"].split(".")[0] not in fontes:
+                continue
+            if desde is not None and entrada["data_hora"] < desde:
+                continue
+            yield entrada
+
+def ler(entrada):
+    """
+    Conteúdo de uma página do arquivo, como texto.
+    """
+    with open(caminho_objeto(entrada["hash"], entrada["compressao"]), "rb") as arquivo:
+        return descomprimir(entrada["compressao"], arquivo.read()).decode("utf-8")
@@ -0,0 +1,331 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import importlib
+import traceback
+import tempfile
+from datetime import datetime
+import arquivo_paginas
+import banco
+import coleta_http
+import metricas
+import milog
+import pipeline
+import servidor_local
+
+# Bancada de testes offline: sobe servidor_local.py com páginas gravadas,
+# executa cada scraper de ponta a ponta contra ele (cada execução em um
+# processo novo, como no cron) e mede as etapas. O resultado sai em JSON e
+# pode ser comparado com uma execução de referência.
+#
+#   python bancada.py exportar fixtures            # páginas do arquivo_paginas
+#   python bancada.py executar fixtures --saida atual.json --base referencia.json
+#
+# As páginas também podem ser gravadas com MILOG_GRAVAR_RESPOSTAS=fixtures.
+
+# Etapas do relatório -> prefixos das métricas (metricas.REGISTRO) somadas nelas
+ETAPAS = {
+    "inicio_navegador": ("navegador.inicio.",),
+    "carregamento": ("navegador.carregamento.", "http."),
+    "espera": ("espera.",),
+    "extracao": ("extracao.",),
+    "interpretacao": ("bancada.interpretacao",),
+    "gravacao": ("bancada.gravacao", "linkesf.gravacao"),
+    "rotulos": ("rotulos.",),
+}
+
+# Variáveis com os nomes das tabelas: a bancada usa tabelas próprias
+# (PREFIXO_TABELAS + nome), nunca as de produção
+TABELAS = ("TABLE_EMPRESAS_ESF", "TABLE_PONTUACAO_ESF", "TABLE_EMPRESAS_LIV", "TABLE_PONTUACAO_LIV", "TABLE_BANNERS_LIV")
+PREFIXO_TABELAS = os.getenv("BANCADA_PREFIXO_TABELAS", "bancada_")
+
+# Aumento máximo aceito em relação à referência (0.2 = 20% mais lento)
+LIMITE_REGRESSAO = float(os.getenv("BANCADA_LIMITE_REGRESSAO", "0.2"))
+
+# Etapas mais curtas que isto na referência não são comparadas (ruído)
+MINIMO_COMPARAVEL = float(os.getenv("BANCADA_MINIMO_SEGUNDOS", "0.05"))
+
+# Tempo máximo de cada execução de um scraper, em segundos
+LIMITE_EXECUCAO = float(os.getenv("BANCADA_LIMITE_EXECUCAO", "600"))
+
+def etapas_das_metricas(resumo):
+    """
+    Agrupa o resumo de metricas nas etapas do relatório. A gravação é
+    informada sem a rotulagem, que roda dentro dela.
+
+    Returns:
+        dict: etapa -> segundos (só as etapas medidas).
+    """
+    etapas = {}
+    for nome, item in resumo.items():
+        for etapa, prefixos in ETAPAS.items():
+            if nome.startswith(prefixos):
+                etapas[etapa] = etapas.get(etapa, 0.0) + item["total"]
+    if "gravacao" in etapas and "rotulos" in etapas:
+        etapas["gravacao"] = max(0.0, etapas["gravacao"] - etapas["rotulos"])
+    return etapas
+
+def medir(job, usar_banco):
+    """
+    Executado no processo filho: roda o scraper uma vez e mede as etapas.
+    Os scrapers do pipeline rodam etapa por etapa (coleta, interpretação,
+    gravação); os de link, por executar(connection), e só com banco.
+
+    Returns:
+        dict: {"sucesso", "registros", "total", "etapas", "metricas"} ou
+        {"ignorado": motivo}.
+    """
+    if job not in pipeline.FONTES and not usar_banco:
+        return {"ignorado": "precisa do banco (use --banco)"}
+
+    metricas.limpar()
+    inicio = time.perf_counter()
+    registros = None
+    sucesso = False
+    connection = None
+    try:
+        modulo = importlib.import_module(milog.JOBS[job])
+        connection = banco.conectar() if usar_banco else None
+        if job in pipeline.FONTES:
+            argumentos = ()
+            if connection is not None:
+                getattr(modulo, pipeline.FONTES[job][1])(connection)
+                if hasattr(modulo, "minimo_cards"):
+                    argumentos = (modulo.minimo_cards(connection),)
+            brutos = modulo.coletar(*argumentos)
+            with metricas.etapa("bancada.interpretacao", silencioso=True):
+                registros = modulo.interpretar(brutos)
+            if connection is not None:
+                with metricas.etapa("bancada.gravacao", silencioso=True):
+                    modulo.gravar(registros, connection)
+            sucesso = bool(registros)
+        else:
+            modulo.executar(connection)
+            sucesso = True
+    except Exception:
+        print(f"[ERROR] '{job}' falhou na bancada:\n{traceback.format_exc()}")
+    finally:
+        if connection is not None:
+            connection.close()
+
+    resumo = metricas.resumo()
+    return {
+        "sucesso": sucesso,
+        "registros": len(registros) if registros is not None else None,
+        "total": time.perf_counter() - inicio,
+        "etapas": etapas_das_metricas(resumo),
+        "metricas": {nome: item["total"] for nome, item in resumo.items()},
+    }
+
+def ambiente_bancada(url_servidor):
+    """
+    Variáveis de ambiente dos processos filhos: páginas do servidor local,
+    sem cache de cards nem arquivo de páginas (toda execução parte do zero) e
+    tabelas próprias da bancada.
+    """
+    ambiente = dict(os.environ, MILOG_SERVIDOR_LOCAL=url_servidor, MILOG_CACHE_CARDS="0", MILOG_ARQUIVO="0")
+    ambiente.pop("MILOG_GRAVAR_RESPOSTAS", None)
+    for variavel in TABELAS:
+        ambiente[variavel] = PREFIXO_TABELAS + variavel[len("TABLE_"):].lower()
+    return ambiente
+
+def executar_uma_vez(job, ambiente, usar_banco):
+    """
+    Roda 'medir' em um processo novo e lê o resultado.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        saida = os.path.join(pasta, "resultado.json")
+        comando = [sys.executable, os.path.abspath(__file__), "_medir", job, saida]
+        if usar_banco:
+            comando.append("--banco")
+        try:
+            processo = subprocess.run(comando, env=ambiente, timeout=LIMITE_EXECUCAO)
+        except subprocess.TimeoutExpired:
+            return {"sucesso": False, "erro": f"não terminou em {LIMITE_EXECUCAO:.0f}s"}
+        if not os.path.exists(saida):
+            return {"sucesso": False, "erro": f"processo terminou com código {processo.returncode}"}
+        with open(saida, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+
+def consolidar(execucoes):
+    """
+    Mediana de cada etapa e do total entre as repetições bem-sucedidas.
+    """
+    if any("ignorado" in execucao for execucao in execucoes):
+        return {"ignorado": execucoes[0]["ignorado"]}
+    validas = [execucao for execucao in execucoes if execucao.get("sucesso")]
+    resultado = {
+        "sucesso": len(validas) == len(execucoes),
+        "registros": validas[-1]["registros"] if validas else None,
+        "execucoes": execucoes,
+    }
+    if validas:
+        resultado["total"] = statistics.median(execucao["total"] for execucao in validas)
+        nomes = sorted({etapa for execucao in validas for etapa in execucao["etapas"]})
+        resultado["etapas"] = {
+            etapa: statistics.median(execucao["etapas"].get(etapa, 0.0) for execucao in validas)
+            for etapa in nomes
+        }
+    return resultado
+
+def executar_bancada(pasta, jobs, repeticoes=3, usar_banco=False):
+    """
+    Sobe o servidor local com as páginas de 'pasta' e mede cada scraper.
+
+    Returns:
+        dict: Resultado JSON-serializável (ver consolidar).
+    """
+    servidor, url = servidor_local.iniciar(pasta)
+    print(f"[INFO] Páginas de {pasta} servidas em {url}.")
+    ambiente = ambiente_bancada(url)
+    scrapers = {}
+    try:
+        for job in jobs:
+            execucoes = []
+            for repeticao in range(repeticoes):
+                print(f"[INFO] === Bancada: '{job}' ({repeticao + 1}/{repeticoes}) ===")
+                execucoes.append(executar_uma_vez(job, ambiente, usar_banco))
+                if "ignorado" in execucoes[-1]:
+                    break
+            scrapers[job] = consolidar(execucoes)
+    finally:
+        servidor.shutdown()
+
+    return {
+        "data_hora": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "repeticoes": repeticoes,
+        "banco": usar_banco,
+        "scrapers": scrapers,
+    }
+
+def regressoes(atual, base, limite=None, minimo=None):
+    """
+    Compara o resultado com a referência: uma etapa (ou o total) mais lenta
+    que a referência * (1 + limite), ou um scraper que passou a falhar.
+
+    Returns:
+        list of str: Descrição de cada regressão.
+    """
+    limite = LIMITE_REGRESSAO if limite is None else limite
+    minimo = MINIMO_COMPARAVEL if minimo is None else minimo
+    encontradas = []
+    for job, referencia in base.get("scrapers", {}).items():
+        resultado = atual["scrapers"].get(job)
+        if resultado is None or "ignorado" in referencia or "ignorado" in resultado:
+            continue
+        if referencia.get("sucesso") and not resultado.get("sucesso"):
+            encontradas.append(f"{job}: falhou (passava na referência)")
+            continue
+        if not resultado.get("sucesso"):
+            continue
+        medidas = dict(referencia.get("etapas", {}), total=referencia.get("total", 0.0))
+        atuais = dict(resultado.get("etapas", {}), total=resultado.get("total", 0.0))
+        for etapa, antes in medidas.items():
+            depois = atuais.get(etapa)
+            if depois is not None and antes >= minimo and depois > antes * (1 + limite):
+                encontradas.append(f"{job}.{etapa}: {antes:.3f}s -> {depois:.3f}s (+{(depois / antes - 1) * 100:.0f}%)")
+    return encontradas
+
+def imprimir_relatorio(resultado):
+    """
+    Tabela por scraper: tempo de cada etapa e total.
+    """
+    etapas = list(ETAPAS)
+    print(f"{'scraper':<10}" + "".join(f"{etapa:>18}" for etapa in etapas) + f"{'total':>10}  registros")
+    for job, item in resultado["scrapers"].items():
+        if "ignorado" in item:
+            print(f"{job:<10}  ignorado: {item['ignorado']}")
+            continue
+        if "total" not in item:
+            print(f"{job:<10}  FALHOU")
+            continue
+        colunas = "".join(
+            f"{item['etapas'][etapa]:>17.3f}s" if etapa in item["etapas"] else f"{'-':>18}" for etapa in etapas
+        )
+        situacao = "" if item["sucesso"] else "  (com falhas)"
+        print(f"{job:<10}{colunas}{item['total']:>9.2f}s  {item['registros']}{situacao}")
+
+def exportar_fixtures(pasta, desde=None):
+    """
+    Copia para 'pasta' a versão mais recente de cada URL do arquivo de
+    páginas, com os nomes que servidor_local.py procura.
+
+    Returns:
+        int: Quantidade de páginas exportadas.
+    """
+    mais_recentes = {}
+    for entrada in arquivo_paginas.entradas(desde=desde):
+        mais_recentes[coleta_http.nome_arquivo_resposta(entrada["url"])] = entrada
+    os.makedirs(pasta, exist_ok=True)
+    for nome, entrada in mais_recentes.items():
+        with open(os.path.join(pasta, nome), "w", encoding="utf-8") as arquivo:
+            arquivo.write(arquivo_paginas.ler(entrada))
+        print(f"[INFO] {entrada['url']} ({entrada['fonte']}, {entrada['data_hora']}) -> {nome}")
+    return len(mais_recentes)
+
+def main(argumentos):
+    parser = argparse.ArgumentParser(description="Bancada de testes offline dos scrapers.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    executar = comandos.add_parser("executar", help="Mede os scrapers contra as páginas gravadas.")
+    executar.add_argument("fixtures", help="Pasta com as páginas gravadas.")
+    executar.add_argument("jobs", nargs="*", metavar="job",
+                          help=f"Scrapers a medir, entre {', '.join(milog.JOBS)} (padrão: todos; 'banners' é o slid_liv).")
+    executar.add_argument("--repeticoes", type=int, default=3)
+    executar.add_argument("--banco", action="store_true",
+                          help=f"Grava no MySQL de DB_* em tabelas '{PREFIXO_TABELAS}*' (sem isso, só coleta e interpretação).")
+    executar.add_argument("--saida", help="Arquivo JSON do resultado (padrão: só imprime).")
+    executar.add_argument("--base", help="Resultado JSON de referência para detectar regressões.")
+    executar.add_argument("--limite", type=float, default=LIMITE_REGRESSAO,
+                          help="Aumento máximo aceito em relação à referência (0.2 = 20%%).")
+
+    exportar = comandos.add_parser("exportar", help="Gera a pasta de páginas a partir do arquivo_paginas.")
+    exportar.add_argument("fixtures")
+    exportar.add_argument("--desde", default=None)
+
+    medir_job = comandos.add_parser("_medir")  # uso interno: processo filho
+    medir_job.add_argument("job")
+    medir_job.add_argument("saida")
+    medir_job.add_argument("--banco", action="store_true")
+
+    opcoes = parser.parse_args(argumentos)
+
+    if opcoes.comando == "_medir":
+        resultado = medir(opcoes.job, opcoes.banco)
+        with open(opcoes.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo)
+        return 0
+
+    if opcoes.comando == "exportar":
+        return 0 if exportar_fixtures(opcoes.fixtures, opcoes.desde) else 1
+
+    invalidos = [job for job in opcoes.jobs if job not in milog.JOBS]
+    if invalidos:
+        parser.error(f"scraper(s) desconhecido(s): {', '.join(invalidos)}")
+    resultado = executar_bancada(opcoes.fixtures, opcoes.jobs or list(milog.JOBS), opcoes.repeticoes, opcoes.banco)
+    imprimir_relatorio(resultado)
+    if opcoes.saida:
+        with open(opcoes.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f"[INFO] Resultado gravado em {opcoes.saida}.")
+
+    falhou = any(item.get("sucesso") is False for item in resultado["scrapers"].values())
+    if opcoes.base:
+        with open(opcoes.base, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+        encontradas = regressoes(resultado, base, opcoes.limite)
+        for regressao in encontradas:
+            print(f"[ERROR] Regressão: {regressao}")
+        if not encontradas:
+            print(f"[INFO] Nenhuma regressão acima de {opcoes.limite:.0%} em relação a {opcoes.base}.")
+        falhou = falhou or bool(encontradas)
+    return 1 if falhou else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
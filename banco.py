@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import uuid
+import random
+from datetime import datetime
+import mysql.connector
+from mysql.connector import errors, pooling
+
+# Limite de conexões do pool do mysql.connector
+TAMANHO_MAXIMO_POOL = 32
+
+# Novas tentativas em falhas de conexão: espera exponencial com jitter
+# (BACKOFF_BASE * 2^tentativa, limitada a BACKOFF_MAXIMO, sorteada entre 0 e esse valor)
+TENTATIVAS = int(os.getenv("DB_TENTATIVAS", "5"))
+BACKOFF_BASE = float(os.getenv("DB_BACKOFF_BASE", "1"))
+BACKOFF_MAXIMO = float(os.getenv("DB_BACKOFF_MAXIMO", "30"))
+
+# Pasta onde ficam os registros coletados que não puderam ser gravados;
+# são reenviados na próxima execução
+PASTA_SPOOL = os.getenv("MILOG_SPOOL", "spool")
+
+def configuracao_banco():
+    """
+    Parâmetros de conexão lidos das variáveis de ambiente, como em conectar_banco dos bots.
+    """
+    return {
+        "host": os.getenv("DB_HOST"),          # Host do banco de dados
+        "database": os.getenv("DB_NAME"),      # Nome do banco de dados
+        "user": os.getenv("DB_USER"),          # Usuário do banco de dados
+        "password": os.getenv("DB_PASSWORD"),  # Senha do banco de dados
+    }
+
+def erro_de_conexao(err):
+    """
+    Indica se o erro é de conexão (servidor fora do ar, conexão perdida, pool
+    esgotado), e não de SQL ou de dados.
+    """
+    return isinstance(err, (errors.InterfaceError, errors.OperationalError, errors.PoolError))
+
+def espera_backoff(tentativa):
+    """
+    Segundos de espera antes da próxima tentativa (backoff exponencial com jitter total).
+    """
+    return random.uniform(0, min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** tentativa))
+
+def com_backoff(funcao, descricao, tentativas=None):
+    """
+    Executa funcao(), repetindo em erros de conexão com espera exponencial e jitter.
+    Outros erros e a falha da última tentativa são propagados.
+    """
+    tentativas = TENTATIVAS if tentativas is None else tentativas
+    for tentativa in range(tentativas):
+        try:
+            return funcao()
+        except mysql.connector.Error as err:
+            if not erro_de_conexao(err) or tentativa == tentativas - 1:
+                raise
+            espera = espera_backoff(tentativa)
+            print(f"[WARN] Falha em {descricao} ({err}); nova tentativa em {espera:.1f}s "
+                  f"({tentativa + 2}/{tentativas}).")
+            time.sleep(espera)
+
+def conectar():
+    """
+    Abre uma conexão MySQL, com novas tentativas em falhas transitórias.
+    """
+    return com_backoff(lambda: mysql.connector.connect(**configuracao_banco()), "conexão com o banco")
+
+def criar_pool(tamanho, nome="milog"):
+    """
+    Cria um pool de conexões MySQL compartilhado pelos jobs do orquestrador,
+    com uma conexão por gravador concorrente. connection.close() numa conexão
+    do pool a devolve ao pool.
+
+    Returns:
+        MySQLConnectionPool ou None: None se não foi possível conectar.
+    """
+    tamanho = max(1, min(tamanho, TAMANHO_MAXIMO_POOL))
+    try:
+        pool = com_backoff(lambda: pooling.MySQLConnectionPool(
+            pool_name=nome, pool_size=tamanho, pool_reset_session=True, **configuracao_banco()
+        ), "criação do pool de conexões")
+        print(f"[INFO] Pool de {tamanho} conexão(ões) com o banco de dados criado.")
+        return pool
+    except mysql.connector.Error as err:
+        print(f"[ERROR] Não foi possível conectar ao banco de dados: {err}")
+        return None
+
+def obter_conexao(pool):
+    """
+    Retira uma conexão do pool, esperando com backoff se ele estiver esgotado,
+    e a reconecta se ela caiu enquanto estava ociosa.
+    """
+    def obter():
+        connection = pool.get_connection()
+        try:
+            connection.ping(reconnect=True, attempts=1, delay=0)
+        except mysql.connector.Error:
+            connection.close()
+            raise
+        return connection
+    return com_backoff(obter, "obtenção de conexão do pool")
+
+def reconectar(connection):
+    """
+    Restabelece uma conexão perdida, com novas tentativas e backoff.
+    """
+    com_backoff(lambda: connection.ping(reconnect=True, attempts=1, delay=0), "reconexão com o banco")
+
+def guardar_no_spool(fonte, registros, data_hora_coleta):
+    """
+    Grava os registros de uma coleta em um arquivo JSON na pasta de spool.
+
+    Returns:
+        str: Caminho do arquivo.
+    """
+    os.makedirs(PASTA_SPOOL, exist_ok=True)
+    nome = f"{fonte}-{data_hora_coleta.replace(' ', 'T').replace(':', '')}-{uuid.uuid4().hex[:8]}.json"
+    caminho = os.path.join(PASTA_SPOOL, nome)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump({"fonte": fonte, "data_hora_coleta": data_hora_coleta, "registros": registros},
+                  arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+    print(f"[WARN] Banco indisponível: {len(registros)} registros de '{fonte}' guardados em {caminho}.")
+    return caminho
+
+def gravar_ou_guardar(fonte, gravar, registros, connection, data_hora_coleta=None):
+    """
+    Grava os registros com gravar(registros, connection, data_hora_coleta).
+    Se a conexão caiu, reconecta e tenta de novo; se o banco continuar
+    inacessível, guarda os registros no spool para a próxima execução.
+
+    Returns:
+        bool: True se gravou no banco; False se os registros foram para o spool.
+    """
+    if data_hora_coleta is None:
+        data_hora_coleta = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        try:
+            gravar(registros, connection, data_hora_coleta)
+        except mysql.connector.Error as err:
+            if not erro_de_conexao(err):
+                raise
+            print(f"[WARN] Conexão com o banco perdida ao gravar '{fonte}' ({err}); reconectando...")
+            # Descarta o que tiver ficado da transação interrompida antes de repetir
+            try:
+                connection.rollback()
+            except mysql.connector.Error:
+                pass
+            reconectar(connection)
+            gravar(registros, connection, data_hora_coleta)
+        return True
+    except mysql.connector.Error as err:
+        if not erro_de_conexao(err):
+            raise
+        guardar_no_spool(fonte, registros, data_hora_coleta)
+        return False
+
+def reenviar_spool(fonte, gravar, connection):
+    """
+    Reenvia, em ordem de coleta, os registros de 'fonte' guardados no spool,
+    apagando cada arquivo depois de gravado. Para no primeiro erro de conexão.
+
+    Returns:
+        int: Quantidade de arquivos reenviados.
+    """
+    if not os.path.isdir(PASTA_SPOOL):
+        return 0
+    arquivos = sorted(
+        nome for nome in os.listdir(PASTA_SPOOL) if nome.startswith(f"{fonte}-") and nome.endswith(".json")
+    )
+    reenviados = 0
+    for nome in arquivos:
+        caminho = os.path.join(PASTA_SPOOL, nome)
+        with open(caminho, encoding="utf-8") as arquivo:
+            conteudo = json.load(arquivo)
+        try:
+            gravar(conteudo["registros"], connection, conteudo["data_hora_coleta"])
+        except mysql.connector.Error as err:
+            if not erro_de_conexao(err):
+                # Não adianta reenviar: separa o arquivo para análise e segue com os demais
+                os.replace(caminho, caminho + ".erro")
+                print(f"[ERROR] Registros de {nome} rejeitados pelo banco ({err}); arquivo renomeado para .erro.")
+                continue
+            print(f"[WARN] Banco indisponível; os arquivos restantes de '{fonte}' continuam no spool.")
+            break
+        os.remove(caminho)
+        reenviados += 1
+        print(f"[INFO] Coleta de {conteudo['data_hora_coleta']} de '{fonte}' reenviada do spool ({nome}).")
+    return reenviados
+
+def arquivos_no_spool():
+    """
+    Arquivos que ficaram no spool: coletas ainda não gravadas (.json) e
+    rejeitadas pelo banco (.json.erro).
+    """
+    if not os.path.isdir(PASTA_SPOOL):
+        return []
+    return sorted(nome for nome in os.listdir(PASTA_SPOOL) if nome.endswith((".json", ".json.erro")))
+
+def avisar_spool_pendente():
+    """
+    Ao fim da execução, registra os arquivos que ficaram no spool (só são
+    reenviados se a pasta for preservada até a próxima execução).
+
+    Returns:
+        int: Quantidade de arquivos no spool.
+    """
+    arquivos = arquivos_no_spool()
+    if arquivos:
+        print(f"[ERROR] {len(arquivos)} arquivo(s) no spool '{PASTA_SPOOL}' não gravados no banco: {', '.join(arquivos)}")
+    return len(arquivos)
@@ -0,0 +1,220 @@
+import os
+import re
+import json
+import time
+import threading
+from urllib.parse import urlsplit, urlunsplit, quote
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import analise_html
+import arquivo_paginas
+import metricas
+import navegador
+
+# Tempo máximo de cada requisição (conexão, leitura), em segundos
+TIMEOUT = (10, 30)
+
+# Por quanto tempo (segundos) uma resposta é reaproveitada dentro do mesmo
+# processo, ex.: esf e linkesf lendo a mesma grade no orquestrador
+VALIDADE_RESPOSTA = 600
+
+# Fração mínima de cards, em relação à coleta anterior, para aceitar o resultado via HTTP
+FRACAO_MINIMA = 0.8
+
+_sessao = None
+_trava = threading.Lock()
+# url -> (instante, resposta); e uma trava por URL para não buscar a mesma página duas vezes
+_respostas = {}
+_travas_url = {}
+
+def http_ativo() -> bool:
+    """
+    Indica se os scrapers devem tentar a coleta via HTTP antes do Selenium
+    (variável de ambiente MILOG_HTTP; padrão: ativo, MILOG_HTTP=0 desliga).
+    """
+    return os.getenv("MILOG_HTTP", "1").strip().lower() not in ("0", "false", "nao", "no")
+
+def url_configurada(variavel, padrao):
+    """
+    URL de uma página, sobrescrita pela variável de ambiente informada
+    (ex.: para apontar para um servidor local com respostas gravadas). Sem
+    ela, MILOG_SERVIDOR_LOCAL=<url base> troca só o servidor, mantendo o
+    caminho da URL padrão (usado pela bancada de testes, bancada.py).
+    """
+    if os.getenv(variavel):
+        return os.getenv(variavel)
+    servidor = os.getenv("MILOG_SERVIDOR_LOCAL")
+    if servidor:
+        partes = urlsplit(padrao)
+        return servidor.rstrip("/") + urlunsplit(("", "", partes.path or "/", partes.query, ""))
+    return padrao
+
+def sessao():
+    """
+    Sessão HTTP compartilhada, com pool de conexões (keep-alive), retentativas
+    com espera exponencial para erros transitórios e descompressão gzip.
+    """
+    global _sessao
+    with _trava:
+        if _sessao is None:
+            retentativas = Retry(
+                total=3, backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+            )
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retentativas)
+            _sessao = requests.Session()
+            _sessao.mount("http://", adaptador)
+            _sessao.mount("https://", adaptador)
+            _sessao.headers.update({
+                "User-Agent": navegador.USER_AGENT,
+                "Accept": "text/html,application/json;q=0.9,*/*;q=0.8",
+                "Accept-Encoding": "gzip, deflate",
+                "Accept-Language": "pt-BR,pt;q=0.9",
+            })
+        return _sessao
+
+def gravar_resposta(url, conteudo):
+    """
+    Com MILOG_GRAVAR_RESPOSTAS=<pasta>, grava o corpo da resposta (já
+    descomprimido) para ser servido depois por servidor_local.py.
+    """
+    pasta = os.getenv("MILOG_GRAVAR_RESPOSTAS")
+    if not pasta:
+        return
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, nome_arquivo_resposta(url)), "wb") as arquivo:
+        arquivo.write(conteudo)
+
+def nome_arquivo_resposta(url):
+    """
+    Nome do arquivo de uma resposta gravada: caminho + query, codificados.
+    """
+    partes = urlsplit(url)
+    caminho = partes.path or "/"
+    if partes.query:
+        caminho += "?" + partes.query
+    return quote(caminho, safe="")
+
+def obter(url, nome, **kwargs):
+    """
+    Faz um GET com a sessão compartilhada. Uma resposta obtida há menos de
+    VALIDADE_RESPOSTA segundos no mesmo processo é reaproveitada.
+
+    Returns:
+        requests.Response ou None: Resposta com status 2xx; None em caso de erro.
+    """
+    with _trava:
+        trava_url = _travas_url.setdefault(url, threading.Lock())
+    with trava_url:
+        guardada = _respostas.get(url)
+        if guardada and time.monotonic() - guardada[0] < VALIDADE_RESPOSTA:
+            print(f"[INFO] {url} reaproveitada de uma requisição anterior.")
+            return guardada[1]
+        resposta = _obter(url, nome, **kwargs)
+        if resposta is not None:
+            _respostas[url] = (time.monotonic(), resposta)
+        return resposta
+
+def _obter(url, nome, **kwargs):
+    inicio = time.perf_counter()
+    try:
+        resposta = sessao().get(url, timeout=TIMEOUT, **kwargs)
+        resposta.raise_for_status()
+    except requests.RequestException as e:
+        print(f"[WARN] Requisição HTTP falhou ({nome}): {e}")
+        return None
+    finally:
+        metricas.registrar(f"http.{nome}", time.perf_counter() - inicio)
+
+    # Sem charset no cabeçalho, requests assumiria ISO-8859-1 para text/html
+    if "charset" not in resposta.headers.get("Content-Type", "").lower():
+        resposta.encoding = "utf-8"
+    gravar_resposta(url, resposta.content)
+    tipo = "json" if "json" in resposta.headers.get("Content-Type", "").lower() else "html"
+    arquivo_paginas.arquivar(nome, url, resposta.text, tipo)
+    print(f"[INFO] {url} obtida via HTTP ({len(resposta.content) / 1024:.0f} KiB) "
+          f"em {time.perf_counter() - inicio:.2f}s.")
+    return resposta
+
+# Atribuições de estado inicial em scripts inline, ex.: window.__INITIAL_STATE__ = {...};
+PADRAO_ESTADO_INLINE = re.compile(r"window\.[\w$]+\s*=\s*(\{.*\}|\[.*\])\s*;?\s*$", re.DOTALL)
+SELETOR_SCRIPT = analise_html.seletor("script")
+
+def jsons_embutidos(html):
+    """
+    Extrai os blocos JSON embutidos na página: <script type="application/json">
+    (inclusive __NEXT_DATA__), application/ld+json e atribuições de estado
+    inicial (window.X = {...}). Blocos inválidos são ignorados.
+
+    Returns:
+        list: Objetos JSON decodificados.
+    """
+    soup = analise_html.criar_soup(html, analise_html.container("script"))
+    blocos = []
+    for script in SELETOR_SCRIPT.select(soup):
+        texto = (script.string or "").strip()
+        if not texto:
+            continue
+        tipo = (script.get("type") or "").lower()
+        if "json" not in tipo:
+            match = PADRAO_ESTADO_INLINE.search(texto)
+            if not match:
+                continue
+            texto = match.group(1)
+        try:
+            blocos.append(json.loads(texto))
+        except ValueError:
+            continue
+    return blocos
+
+def procurar_registros(objeto, reconhecer):
+    """
+    Percorre um JSON e devolve a maior lista cujos itens (dicionários) são
+    reconhecidos como registros pela função reconhecer.
+    """
+    melhor = []
+    pendentes = [objeto]
+    while pendentes:
+        atual = pendentes.pop()
+        if isinstance(atual, dict):
+            pendentes.extend(atual.values())
+        elif isinstance(atual, list):
+            itens = [item for item in atual if isinstance(item, dict)]
+            if itens and len(itens) > len(melhor) and all(reconhecer(item) for item in itens):
+                melhor = itens
+            pendentes.extend(atual)
+    return melhor
+
+def primeiro_campo(registro, chaves):
+    """
+    Valor da primeira chave presente (e não vazia) no registro; aceita
+    caminhos com ponto e índices de lista (ex.: 'image.url', 'images.0.url').
+    """
+    for chave in chaves:
+        valor = registro
+        for parte in chave.split("."):
+            if isinstance(valor, list) and parte.isdigit():
+                valor = valor[int(parte)] if int(parte) < len(valor) else None
+            else:
+                valor = valor.get(parte) if isinstance(valor, dict) else None
+        if valor not in (None, ""):
+            return valor
+    return None
+
+def cards_completos(cards, campos, minimo=0):
+    """
+    Decide se o resultado da coleta via HTTP pode substituir o Selenium: pelo
+    menos 'minimo' cards e nenhum card sem os campos obrigatórios.
+    """
+    if not cards:
+        return False
+    if len(cards) < minimo:
+        print(f"[WARN] Coleta via HTTP parcial: {len(cards)} cards, esperado ao menos {minimo}.")
+        return False
+    incompletos = sum(1 for card in cards if any(card.get(campo) is None for campo in campos))
+    if incompletos:
+        print(f"[WARN] Coleta via HTTP parcial: {incompletos} cards sem {', '.join(campos)}.")
+        return False
+    return True
@@ -1,14 +1,28 @@
 import os  # ✅ Importação corrigida
 import mysql.connector
-import re
+import banco
 import time
 from datetime import datetime
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import migracoes
+import rotulos
+import historico
+import coleta_http
+import grade_esfera
+import regras_pontuacao
+import impressoes
+
+# Versão de interpretar(): incremente ao mudar como os cards viram parceiros,
+# para descartar o cache de cards da coleta anterior
+VERSAO_INTERPRETACAO = 1
+
+# Quantidade máxima de linhas por INSERT multi-linha
+TAMANHO_LOTE_INSERCAO = 500
+
+# Colunas gravadas em cada linha de pontuação, na ordem do INSERT
+COLUNAS_PONTUACAO = ("data_hora_coleta", "moeda", "pontuacao", "descricao_text", "empresa_id", "visto_ate")
+
+# Colunas que, no modo "gravar só mudanças", definem se a coleta gera linha nova
+COLUNAS_MUDANCA = ("moeda", "pontuacao", "descricao_text")
 
 def get_env_var(var_name: str) -> str:
     """
@@ -25,12 +39,7 @@ def conectar_banco():
     Conecta ao banco de dados MySQL e retorna o objeto de conexão.
     """
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),        # Host do banco de dados
-            database=os.getenv("DB_NAME"),    # Nome do banco de dados
-            user=os.getenv("DB_USER"),        # Usuário do banco de dados
-            password=os.getenv("DB_PASSWORD") # Senha do banco de dados
-        )
+        connection = banco.conectar()  # Com novas tentativas em falhas transitórias
         if connection.is_connected():
             print("[INFO] Conectado ao banco de dados.")
             return connection
@@ -48,6 +57,11 @@ def criar_tabelas(connection):
     table_pontuacao = get_env_var("TABLE_PONTUACAO_ESF")
 
     try:
+        # Esquema já na versão atual: nenhuma verificação adicional
+        if migracoes.esquema_atualizado(connection, table_empresas):
+            print(f"[INFO] Esquema de '{table_empresas}' já está na versão {migracoes.VERSAO_ATUAL}.")
+            return
+
         cursor = connection.cursor()
 
         # Criação da tabela para as empresas
@@ -76,157 +90,228 @@ def criar_tabelas(connection):
         cursor.execute(create_pontuacao_table_query)
         connection.commit()
 
+        # Índices, tabela de agregados e demais alterações versionadas
+        migracoes.aplicar_migracoes(connection, table_empresas, table_pontuacao)
+
         print(f"[INFO] Tabelas '{table_empresas}' e '{table_pontuacao}' criadas ou já existentes.")
     except mysql.connector.Error as err:
         print(f"[ERROR] Não foi possível criar as tabelas: {err}")
 
-def obter_empresa_id(nome_empresa, logo, connection):
+def resolver_empresas(empresas, connection):
     """
-    Verifica se a empresa já está cadastrada. Se sim, atualiza o logo,
-    caso contrário, insere a empresa e retorna o novo ID.
+    Resolve em lote os IDs das empresas de todos os cards coletados.
+    Carrega o mapa nome -> (id, logo) com uma única consulta e grava as
+    empresas novas e os logos alterados em um único upsert multi-linha,
+    dentro de uma única transação.
+
+    Args:
+        empresas (list of tuple): Pares (nome, logo), um por card.
+        connection: Objeto de conexão MySQL.
+
+    Returns:
+        list of int: IDs das empresas, na mesma ordem dos cards.
     """
     table_empresas = get_env_var("TABLE_EMPRESAS_ESF")
 
     cursor = connection.cursor()
-    cursor.execute(f"SELECT id, logo FROM {table_empresas} WHERE nome = %s", (nome_empresa,))
-    empresa = cursor.fetchone()
-
-    if empresa:
-        # Empresa já existe, vamos atualizar o logo se for diferente
-        empresa_id, current_logo = empresa
-        if current_logo != logo:
-            cursor.execute(f"UPDATE {table_empresas} SET logo = %s WHERE id = %s", (logo, empresa_id))
+    cursor.execute(f"SELECT nome, id, logo FROM {table_empresas}")
+    existentes = {nome: (empresa_id, logo) for nome, empresa_id, logo in cursor.fetchall()}
+
+    # Se o mesmo nome aparecer em mais de um card, prevalece o último logo
+    logos = {}
+    for nome_empresa, logo in empresas:
+        logos[nome_empresa] = logo
+
+    pendentes = [
+        (nome_empresa, logo) for nome_empresa, logo in logos.items()
+        if nome_empresa not in existentes or existentes[nome_empresa][1] != logo
+    ]
+    ids = {nome_empresa: dados[0] for nome_empresa, dados in existentes.items()}
+
+    if pendentes:
+        try:
+            cursor.executemany(f"""
+                INSERT INTO {table_empresas} (nome, logo) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE logo = VALUES(logo)
+            """, pendentes)
+
+            novas = [nome_empresa for nome_empresa, _ in pendentes if nome_empresa not in existentes]
+            if novas:
+                marcadores = ", ".join(["%s"] * len(novas))
+                cursor.execute(
+                    f"SELECT nome, id FROM {table_empresas} WHERE nome IN ({marcadores})", novas
+                )
+                ids.update({nome_empresa: empresa_id for nome_empresa, empresa_id in cursor.fetchall()})
+
+                # A collation do MySQL pode casar nomes que diferem só em caixa/acento
+                for nome_empresa in novas:
+                    if nome_empresa not in ids:
+                        cursor.execute(f"SELECT id FROM {table_empresas} WHERE nome = %s", (nome_empresa,))
+                        ids[nome_empresa] = cursor.fetchone()[0]
+
             connection.commit()
-            print(f"[INFO] Logo atualizado para a empresa '{nome_empresa}'.")
-        return empresa_id
-    else:
-        # Inserir nova empresa com o logo
-        cursor.execute(f"INSERT INTO {table_empresas} (nome, logo) VALUES (%s, %s)", (nome_empresa, logo))
-        connection.commit()
-        print(f"[INFO] Empresa '{nome_empresa}' inserida com sucesso.")
-        return cursor.lastrowid
+        except mysql.connector.Error:
+            connection.rollback()
+            raise
+
+        atualizadas = len(pendentes) - len(novas)
+        print(f"[INFO] Empresas resolvidas em lote: {len(novas)} inseridas, {atualizadas} logos atualizados.")
+
+    return [ids[nome_empresa] for nome_empresa, _ in empresas]
+
 
 def extrair_pontuacao(descricao: str):
     """
     Faz o parse da descrição para identificar a pontuação e a moeda associada:
       - Moeda (R$, U$, Eu$)
       - Pontuação associada (x ou valores numéricos)
+
+    As regras ficam em regras_pontuacao (compartilhadas com a Livelo), com
+    cache por texto da descrição.
     """
-    moeda = "R$"  # Valor padrão de moeda
-    pontuacao = "x"  # Pontuação padrão
-
-    # Identificar moeda
-    if "real" in descricao.lower():  # Detecta "real" ou "reais"
-        moeda = "R$"
-    elif "dólar" in descricao.lower():  # Detecta "dólar"
-        moeda = "U$"
-    elif "euro" in descricao.lower():  # Detecta "euro"
-        moeda = "Eu$"
-
-    # Regra especial: "a cada x reais"
-    if "a cada" in descricao.lower() and "reais" in descricao.lower():
-        numerador = re.search(r'(\d+,\d+|\d+)\s?pt', descricao)  # Número antes de "pt" ou "pts"
-        denominador = re.search(r'(\d+,\d+|\d+)\s?reais', descricao)  
-        if numerador and denominador:
-            numerador_value = numerador.group(1).replace(',', '.')
-            denominador_value = denominador.group(1).replace(',', '.')
-            try:
-                divisao = float(numerador_value) / float(denominador_value)
-                return moeda, str(divisao)
-            except ZeroDivisionError:
-                return moeda, "0"
-
-    # Regra 1: "Ganhe de x a x pts" -> extrai o maior valor
-    if "de" in descricao.lower() and "a" in descricao.lower():
-        valores = re.findall(r'\d+,\d+|\d+', descricao)
-        if valores:
-            return moeda, max(valores, key=lambda x: float(x.replace(',', '.')))
-
-    # Regra geral: número antes de "pt" ou "pts"
-    pontuacao_match = re.search(r'(\d+,\d+|\d+)\s?(pt|pts)', descricao)
-    if pontuacao_match:
-        return moeda, pontuacao_match.group(1)
-
-    return moeda, pontuacao
+    return regras_pontuacao.pontuacao_esfera(descricao)
 
-def extrair_parceiros(connection):
+def minimo_cards(connection):
+    """
+    Quantidade mínima de cards para aceitar a coleta via HTTP: menos cards que
+    a coleta anterior indica uma resposta parcial.
+    """
+    if not coleta_http.http_ativo():
+        return 0
+    anterior = historico.quantidade_ultima_coleta(connection, get_env_var("TABLE_PONTUACAO_ESF"))
+    return int(anterior * coleta_http.FRACAO_MINIMA)
+
+def coletar(minimo=0):
     """
-    Acessa a página da Esfera, coleta as informações dos cards de parceiros
-    e retorna uma lista de dicionários com:
+    Etapa de coleta: obtém os campos brutos dos cards via HTTP, com o Selenium
+    como alternativa. Não acessa o banco.
+
+    Returns:
+        list: Cards (vazia ou None se a página não carregou).
+    """
+    cards = None
+    if coleta_http.http_ativo():
+        cards = grade_esfera.cards_via_http(minimo=minimo)
+    if cards is None:
+        cards = grade_esfera.cards_via_selenium("esf")
+    return cards
+
+def interpretar(cards, usar_cache=True):
+    """
+    Etapa de interpretação: converte os cards brutos em parceiros com:
       - nome
-      - moeda
-      - descricao_text
       - logo
+      - moeda
       - pontuacao
+      - descricao_text
     """
-    url = "https://www.esfera.com.vc/c/ganhe-pontos/esf02163"
-
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-    )
-
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.set_window_size(1920, 1080)
-
-    print("[INFO] Abrindo página...")
-    driver.get(url)
-
-    # Aguardar os cards carregarem
-    try:
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "box-partner-custom"))
-        )
-        print("[INFO] Cards encontrados.")
-    except:
-        print("[ERROR] Timeout ao esperar os cards.")
-        driver.quit()
-        return []
-
-    # Capturar o HTML
-    time.sleep(2)  # garantir carregamento final
-    html = driver.page_source
-    driver.quit()
-
-    soup = BeautifulSoup(html, "html.parser")
-    div_cards = soup.find_all("div", class_="col-xs-6 col-sm-3 col-lg-2")
-    if not div_cards:
+    if not cards:
         print("[ERROR] Não foi possível encontrar os cards.")
         return []
 
-    print(f"[INFO] Total de cards encontrados: {len(div_cards)}")
+    print(f"[INFO] Total de cards encontrados: {len(cards)}")
+
+    # Cards idênticos aos da coleta anterior reaproveitam o parceiro já
+    # interpretado e resolvido (com empresa_id)
+    # (usar_cache=False: reprocessamento do arquivo de páginas, fora da coleta)
+    anteriores = impressoes.carregar("esf", chave_cache()) if usar_cache else {}
+    reaproveitados = 0
 
     parceiros = []
-    for card in div_cards:
-        # Nome da empresa
-        nome_div = card.find("div", class_="-partnerName")
-        nome = nome_div.get_text(strip=True) if nome_div else "Nome não encontrado"
+    novos = []
+    for card in cards:
+        impressao = impressoes.impressao(card)
+        if impressao in anteriores:
+            parceiros.append(dict(anteriores[impressao]))
+            reaproveitados += 1
+            continue
+
+        nome = card["nome"] if card["nome"] is not None else "Nome não encontrado"
+        logo = card["logo"] if card["logo"] is not None else "Logo não encontrada"
+        descricao_text = card["descricao"] if card["descricao"] is not None else "Descrição não encontrada"
+
+        parceiro = {
+            "nome": nome,
+            "logo": logo,
+            "descricao_text": descricao_text,
+            "impressao": impressao
+        }
+        parceiros.append(parceiro)
+        novos.append(parceiro)
+
+    # Extrai a pontuação de todas as descrições novas de uma vez
+    pontuacoes = regras_pontuacao.pontuacoes_esfera([parceiro["descricao_text"] for parceiro in novos])
+    for parceiro, (moeda, pontuacao) in zip(novos, pontuacoes):
+        parceiro["moeda"] = moeda
+        parceiro["pontuacao"] = pontuacao
+
+    if reaproveitados:
+        print(f"[INFO] {reaproveitados} cards inalterados desde a última coleta reaproveitados do cache.")
+    return parceiros
 
-        # Imagem da logo
-        img_tag = card.find("img")
-        logo = img_tag.get("src", "Logo não encontrada") if img_tag else "Logo não encontrada"
+def pontuacao_numerica(pontuacao):
+    """
+    Converte a pontuação extraída para o valor gravado (0.0 se não for numérica).
+    """
+    try:
+        return float(pontuacao.replace(',', '.'))
+    except ValueError:
+        return 0.0
 
-        # Descrição
-        descricao_div = card.find("div", class_="-partnerPoints")
-        descricao_text = descricao_div.get_text(" ", strip=True) if descricao_div else "Descrição não encontrada"
+def valores_derivados(parceiro):
+    """
+    Colunas da linha de pontuação que vêm da interpretação da página (as que o
+    reprocessamento do arquivo de páginas reescreve).
+    """
+    return {
+        "moeda": parceiro["moeda"],
+        "pontuacao": pontuacao_numerica(parceiro["pontuacao"]),
+        "descricao_text": parceiro["descricao_text"],
+    }
 
-        # Extrai pontuação
-        moeda, pontuacao = extrair_pontuacao(descricao_text)
+def chave_cache():
+    """
+    Chave do cache de cards: banco, tabela de empresas e versão das regras.
+    """
+    versao = f"{regras_pontuacao.VERSAO_REGRAS}.{VERSAO_INTERPRETACAO}"
+    return impressoes.identidade(get_env_var("TABLE_EMPRESAS_ESF"), versao)
 
-        empresa_id = obter_empresa_id(nome, logo, connection)
+def resolver_parceiros(parceiros, connection):
+    """
+    Preenche o empresa_id dos parceiros que ainda não o têm (os reaproveitados
+    do cache já vêm resolvidos), resolvendo todas as empresas de uma vez em vez
+    de uma ida ao banco por card.
+    """
+    pendentes = [parceiro for parceiro in parceiros if "empresa_id" not in parceiro]
+    if pendentes:
+        empresa_ids = resolver_empresas([(parceiro["nome"], parceiro["logo"]) for parceiro in pendentes], connection)
+        for parceiro, empresa_id in zip(pendentes, empresa_ids):
+            parceiro["empresa_id"] = empresa_id
+    return parceiros
 
-        parceiros.append({
-            "empresa_id": empresa_id,
-            "moeda": moeda,
-            "pontuacao": pontuacao,
-            "descricao_text": descricao_text
+def gravar(parceiros, connection, data_hora_coleta=None):
+    """
+    Etapa de gravação: resolve as empresas e grava a pontuação e as labels.
+    Depois de gravados, os parceiros passam a ser o cache da próxima coleta.
+    """
+    if parceiros and salvar_relatorio_mysql(resolver_parceiros(parceiros, connection), connection, data_hora_coleta):
+        impressoes.salvar("esf", chave_cache(), {
+            parceiro["impressao"]: parceiro for parceiro in parceiros if "impressao" in parceiro
         })
 
-    return parceiros
+def extrair_parceiros(connection):
+    """
+    Coleta as informações dos cards de parceiros da Esfera (via HTTP, com o
+    Selenium como alternativa) e retorna uma lista de dicionários com:
+      - nome
+      - moeda
+      - descricao_text
+      - logo
+      - pontuacao
+      - empresa_id
+    """
+    parceiros = interpretar(coletar(minimo_cards(connection)))
+    return resolver_parceiros(parceiros, connection) if parceiros else []
 
 def calcular_moda(pontuacoes):
     """
@@ -292,15 +377,23 @@ def calcular_label_pontuacao(pontuacoes):
     else:
         return "Má Pontuação"
 
-def salvar_relatorio_mysql(parceiros, connection):
+def salvar_relatorio_mysql(parceiros, connection, data_hora_coleta=None):
     """
     Insere os dados de pontuação no banco de dados MySQL.
     Relaciona com a empresa e inclui a descrição.
     Atualiza a label_pontuacao na tabela de empresas.
 
+    Todas as linhas da execução recebem o mesmo data_hora_coleta e são
+    enviadas como INSERT multi-linha em lotes de TAMANHO_LOTE_INSERCAO,
+    com um único commit ao final.
+
     Args:
         parceiros (list of dict): Lista de parceiros com suas pontuações.
         connection: Objeto de conexão MySQL.
+        data_hora_coleta (str, opcional): Carimbo da coleta; se omitido, usa o horário atual.
+
+    Returns:
+        bool: True se os dados foram gravados.
     """
     if not parceiros:
         print("[WARN] Lista de parceiros vazia; não há o que salvar.")
@@ -313,64 +406,78 @@ def salvar_relatorio_mysql(parceiros, connection):
     try:
         cursor = connection.cursor()
         insert_query = f"""
-            INSERT INTO {table_pontuacao} (
-                data_hora_coleta, moeda, pontuacao, descricao_text, empresa_id
-            ) VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO {table_pontuacao} ({", ".join(COLUNAS_PONTUACAO)})
+            VALUES ({", ".join(["%s"] * len(COLUNAS_PONTUACAO))})
         """
 
-        for parceiro in parceiros:
+        inicio = time.perf_counter()
+        if data_hora_coleta is None:
             data_hora_coleta = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            # Converter pontuacao para float se possível
-            try:
-                pontuacao_float = float(parceiro["pontuacao"].replace(',', '.'))
-            except ValueError:
-                pontuacao_float = 0.0  # Ou outra lógica de tratamento
-            cursor.execute(insert_query, (
+
+        linhas = [
+            (
                 data_hora_coleta,
                 parceiro["moeda"],
-                pontuacao_float,
+                pontuacao_numerica(parceiro["pontuacao"]),
                 parceiro["descricao_text"],
-                parceiro["empresa_id"]
-            ))
+                parceiro["empresa_id"],
+                data_hora_coleta
+            )
+            for parceiro in parceiros
+        ]
+
+        # Toda coleta entra nos agregados, mesmo as que não geram linha nova
+        posicao_empresa = COLUNAS_PONTUACAO.index("empresa_id")
+        posicao_pontuacao = COLUNAS_PONTUACAO.index("pontuacao")
+        observacoes = [(linha[posicao_empresa], linha[posicao_pontuacao]) for linha in linhas]
+
+        vistas = []
+        if historico.gravar_so_mudancas():
+            linhas, vistas = historico.separar_inalteradas(
+                connection, table_pontuacao, COLUNAS_PONTUACAO, linhas, COLUNAS_MUDANCA
+            )
+            historico.marcar_vistas(connection, table_pontuacao, vistas, data_hora_coleta)
+        historico.registrar_coleta(
+            connection, table_pontuacao, data_hora_coleta, len({empresa_id for empresa_id, _ in observacoes})
+        )
 
-        connection.commit()
-        print("[INFO] Dados inseridos no banco de dados com sucesso.")
-
-        # Após inserir, atualizar a label_pontuacao para cada parceiro
-        for parceiro in parceiros:
-            empresa_id = parceiro["empresa_id"]
-
-            # Recuperar todas as pontuações do parceiro
-            cursor.execute(f"""
-                SELECT pontuacao FROM {table_pontuacao}
-                WHERE empresa_id = %s ORDER BY data_hora_coleta ASC
-            """, (empresa_id,))
-            resultados = cursor.fetchall()
-            pontuacoes = [row[0] for row in resultados]
-
-            # Calcular a label
-            label = calcular_label_pontuacao(pontuacoes)
-
-            # Atualizar a tabela de empresas
-            cursor.execute(f"""
-                UPDATE {table_empresas}
-                SET label_pontuacao = %s
-                WHERE id = %s
-            """, (label, empresa_id))
-            print(f"[INFO] label_pontuacao atualizado para a empresa ID {empresa_id}: {label}")
+        for i in range(0, len(linhas), TAMANHO_LOTE_INSERCAO):
+            cursor.executemany(insert_query, linhas[i:i + TAMANHO_LOTE_INSERCAO])
+
+        duracao = time.perf_counter() - inicio
+        print(f"[INFO] {len(linhas)} linhas de pontuação enviadas em {duracao:.2f}s "
+              f"({len(linhas) / duracao if duracao else 0:.0f} linhas/s); "
+              f"{len(vistas)} inalteradas só tiveram visto_ate atualizado.")
+
+        # Atualiza os agregados e a label_pontuacao sem reler o histórico completo
+        rotulos.atualizar_labels(connection, table_pontuacao, table_empresas, observacoes)
 
         connection.commit()
-        print("[INFO] Labels de pontuação atualizadas com sucesso.")
+        print(f"[INFO] Dados e labels de pontuação gravados em uma única transação "
+              f"({time.perf_counter() - inicio:.2f}s no total).")
+        return True
     except mysql.connector.Error as err:
+        # Conexão perdida: quem chamou reconecta ou guarda os registros no spool
+        if banco.erro_de_conexao(err):
+            raise
+        connection.rollback()
         print(f"[ERROR] Erro ao inserir dados no banco de dados: {err}")
+        return False
+
+def executar(connection):
+    """
+    Executa o bot com uma conexão já aberta (usado por main e pelo orquestrador milog.py).
+    """
+    criar_tabelas(connection)
+    banco.reenviar_spool("esf", gravar, connection)
+    parceiros = interpretar(coletar(minimo_cards(connection)))
+    # Se o banco cair depois da coleta, os parceiros ficam no spool para a próxima execução
+    banco.gravar_ou_guardar("esf", gravar, parceiros, connection)
 
 def main():
     connection = conectar_banco()
     if connection:
-        criar_tabelas(connection)
-        parceiros = extrair_parceiros(connection)
-        if parceiros:
-            salvar_relatorio_mysql(parceiros, connection)
+        executar(connection)
         connection.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+import time
+import metricas
+
+# Tempo sem mutações no DOM (e sem variação na contagem de elementos) para
+# considerar a página estável
+QUIETO_MS = 500
+# Tempo máximo de espera, em segundos, mesmo que a página não se estabilize
+LIMITE_S = 10
+INTERVALO_S = 0.1
+
+# Conta XHR/fetch pendentes e o instante da última mutação do DOM. Injetado em
+# todo documento novo por navegador.criar_driver; instalado sob demanda se faltar.
+SCRIPT_INSTRUMENTACAO = """
+(function () {
+    if (window.__milogEspera) { return; }
+    var estado = {pendentes: 0, ultimaMutacao: Date.now()};
+    window.__milogEspera = estado;
+
+    var enviar = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        estado.pendentes++;
+        this.addEventListener("loadend", function () { estado.pendentes--; });
+        return enviar.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var buscar = window.fetch;
+        window.fetch = function () {
+            estado.pendentes++;
+            return buscar.apply(this, arguments).finally(function () { estado.pendentes--; });
+        };
+    }
+    // Página restaurada do cache de navegação (driver.back()): requisições antigas não voltam
+    window.addEventListener("pageshow", function (evento) {
+        if (evento.persisted) {
+            estado.pendentes = 0;
+            estado.ultimaMutacao = Date.now();
+        }
+    });
+
+    var observar = function () {
+        new MutationObserver(function () { estado.ultimaMutacao = Date.now(); })
+            .observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    };
+    if (document.documentElement) {
+        observar();
+    } else {
+        document.addEventListener("DOMContentLoaded", observar);
+    }
+})();
+"""
+
+SCRIPT_ESTADO = """
+var estado = window.__milogEspera;
+return {
+    instrumentado: !!estado,
+    carregado: document.readyState === "complete",
+    pendentes: estado ? estado.pendentes : 0,
+    quieto_ms: estado ? Date.now() - estado.ultimaMutacao : 0,
+    elementos: arguments[0] ? document.querySelectorAll(arguments[0]).length : 0
+};
+"""
+
+def aguardar_estabilidade(driver, seletor=None, nome="pagina", quieto_ms=QUIETO_MS, limite=LIMITE_S,
+                          silencioso=False):
+    """
+    Espera a página se estabilizar em vez de dormir um tempo fixo: documento
+    carregado, nenhum XHR/fetch pendente, DOM sem mutações há quieto_ms e a
+    contagem de elementos do seletor inalterada pelo mesmo período. Retorna
+    assim que as condições valem ou quando o limite é atingido. A duração
+    real é registrada em metricas como 'espera.<nome>'.
+
+    Args:
+        seletor (str, opcional): Seletor CSS dos elementos que devem parar de mudar (ex.: cards).
+        nome (str): Identificação da espera nas métricas.
+        quieto_ms (int): Período de silêncio exigido, em milissegundos.
+        limite (float): Tempo máximo de espera, em segundos.
+        silencioso (bool): Não imprime a duração quando a página estabiliza.
+
+    Returns:
+        bool: True se a página estabilizou; False se o limite foi atingido.
+    """
+    inicio = time.monotonic()
+    contagem_anterior, contagem_desde = None, inicio
+    while True:
+        estado = driver.execute_script(SCRIPT_ESTADO, seletor)
+        agora = time.monotonic()
+        if not estado["instrumentado"]:
+            # Documento aberto antes da injeção: o período de silêncio conta a partir daqui
+            driver.execute_script(SCRIPT_INSTRUMENTACAO)
+
+        if estado["elementos"] != contagem_anterior:
+            contagem_anterior, contagem_desde = estado["elementos"], agora
+        # Toda mudança na contagem é uma mutação, então o silêncio do DOM também
+        # garante a contagem estável desde antes da primeira leitura
+        contagem_estavel_ms = max((agora - contagem_desde) * 1000, estado["quieto_ms"])
+
+        estavel = (
+            estado["instrumentado"]
+            and estado["carregado"]
+            and estado["pendentes"] <= 0
+            and estado["quieto_ms"] >= quieto_ms
+            and contagem_estavel_ms >= quieto_ms
+        )
+        if estavel or agora - inicio >= limite:
+            break
+        time.sleep(INTERVALO_S)
+
+    duracao = time.monotonic() - inicio
+    metricas.registrar(f"espera.{nome}", duracao)
+    if not estavel:
+        print(f"[WARN] Espera '{nome}' atingiu o limite de {limite:.0f}s "
+              f"({estado['pendentes']} requisições pendentes, DOM quieto há {estado['quieto_ms']} ms).")
+    elif not silencioso:
+        print(f"[INFO] Página estável ('{nome}') após {duracao:.2f}s.")
+    return estavel
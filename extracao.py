@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import arquivo_paginas
+import metricas
+
+# Funções auxiliares incluídas nos scripts de extração. 'texto' reproduz o
+# get_text(separador, strip=True) do BeautifulSoup: junta os nós de texto não
+# vazios, já aparados, ignorando script/style/template.
+FUNCOES_JS = """
+function texto(elemento, separador) {
+    if (!elemento) { return null; }
+    var partes = [];
+    var percurso = document.createTreeWalker(elemento, NodeFilter.SHOW_TEXT, {
+        acceptNode: function (no) {
+            var pai = no.parentNode.nodeName;
+            return (pai === "SCRIPT" || pai === "STYLE" || pai === "TEMPLATE")
+                ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT;
+        }
+    });
+    while (percurso.nextNode()) {
+        var parte = percurso.currentNode.nodeValue.trim();
+        if (parte) { partes.push(parte); }
+    }
+    return partes.join(separador || "");
+}
+function atributo(elemento, nome) {
+    return elemento ? elemento.getAttribute(nome) : null;
+}
+function classes(elemento) {
+    return (elemento.getAttribute("class") || "").trim().split(/\\s+/);
+}
+"""
+
+MODOS = ("js", "html", "conferir")
+
+def modo_extracao() -> str:
+    """
+    Lê o modo de extração da variável de ambiente MILOG_EXTRACAO:
+      - 'js' (padrão): um único script na página devolve só os campos dos cards;
+      - 'html': page_source + BeautifulSoup (caminho original);
+      - 'conferir': executa os dois e aponta as diferenças.
+    """
+    modo = os.getenv("MILOG_EXTRACAO", "js").strip().lower() or "js"
+    if modo not in MODOS:
+        raise ValueError(f"MILOG_EXTRACAO inválido: '{modo}' (use {', '.join(MODOS)})")
+    return modo
+
+def extrair_no_navegador(driver, script, nome):
+    """
+    Executa o script de extração na página.
+
+    Returns:
+        list ou None: Cards devolvidos pelo script; None se o script falhou ou
+        não encontrou nada (o chamador usa o caminho do HTML).
+    """
+    inicio = time.perf_counter()
+    try:
+        cards = driver.execute_script(script)
+    except Exception as e:
+        print(f"[WARN] Extração no navegador falhou ({nome}): {e}")
+        return None
+    duracao = time.perf_counter() - inicio
+    metricas.registrar(f"extracao.{nome}.js", duracao)
+
+    if not cards:
+        print(f"[WARN] Extração no navegador não encontrou cards ({nome}); usando o HTML da página.")
+        return None
+    print(f"[INFO] {len(cards)} cards extraídos no navegador em {duracao:.2f}s "
+          f"({len(json.dumps(cards, ensure_ascii=False)) / 1024:.1f} KiB).")
+    return cards
+
+def salvar_html(html, nome):
+    """
+    Com MILOG_SALVAR_HTML=<pasta>, grava a página analisada em <pasta>/<nome>.html
+    (entrada do benchmark de analise_html.py).
+    """
+    pasta = os.getenv("MILOG_SALVAR_HTML")
+    if not pasta:
+        return
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"{nome}.html")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write(html)
+    print(f"[INFO] HTML da página salvo em {caminho}.")
+
+def arquivar_pagina(driver, nome, html=None):
+    """
+    Guarda a página renderizada no arquivo de páginas (arquivo_paginas), para
+    poder ser reprocessada depois sem navegador. No modo 'js' (sem html) o
+    page_source só é lido com o arquivo ativo e MILOG_ARQUIVO_JS=1.
+    """
+    if not arquivo_paginas.arquivo_ativo():
+        return
+    if html is None and not arquivo_paginas.ARQUIVAR_NO_MODO_JS:
+        return
+    try:
+        if html is None:
+            html = driver.page_source
+        arquivo_paginas.arquivar(nome, driver.current_url, html)
+    except Exception as e:
+        print(f"[WARN] Não foi possível arquivar a página ({nome}): {e}")
+
+def extrair_do_html(driver, cards_do_html, nome):
+    """
+    Caminho original: serializa o DOM com page_source e analisa com BeautifulSoup.
+    """
+    inicio = time.perf_counter()
+    html = driver.page_source
+    salvar_html(html, nome)
+    cards = cards_do_html(html)
+    duracao = time.perf_counter() - inicio
+    metricas.registrar(f"extracao.{nome}.html", duracao)
+    print(f"[INFO] HTML da página ({len(html) / 1024:.0f} KiB) analisado em {duracao:.2f}s.")
+    arquivar_pagina(driver, nome, html)
+    return cards
+
+def conferir(cards_js, cards_html, nome):
+    """
+    Compara as duas extrações e imprime as diferenças.
+
+    Returns:
+        bool: True se forem idênticas.
+    """
+    if cards_js == cards_html:
+        print(f"[INFO] Conferência ({nome}): extrações idênticas ({len(cards_js)} cards).")
+        return True
+
+    print(f"[WARN] Conferência ({nome}): {len(cards_js)} cards no navegador, {len(cards_html)} no HTML.")
+    for indice, (card_js, card_html) in enumerate(zip(cards_js, cards_html)):
+        if card_js != card_html:
+            print(f"[WARN]   card {indice}: navegador={card_js} html={card_html}")
+    return False
+
+def coletar_cards(driver, script, cards_do_html, nome):
+    """
+    Extrai os campos dos cards da página aberta no driver, conforme o modo
+    configurado. O script e cards_do_html devem devolver a mesma estrutura
+    (lista de dicionários JSON-serializáveis), com os campos brutos de cada card.
+
+    Args:
+        script (str): Script de extração (normalmente FUNCOES_JS + script do scraper).
+        cards_do_html (callable): Recebe o HTML e devolve os cards (caminho de fallback).
+        nome (str): Identificação do scraper nas mensagens e métricas.
+
+    Returns:
+        list: Cards extraídos.
+    """
+    modo = modo_extracao()
+    cards = extrair_no_navegador(driver, script, nome) if modo != "html" else None
+    if cards is not None and modo != "conferir":
+        arquivar_pagina(driver, nome)
+        return cards
+
+    cards_html = extrair_do_html(driver, cards_do_html, nome)
+    if cards is None:
+        return cards_html
+    conferir(cards, cards_html or [], nome)
+    return cards
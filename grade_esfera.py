@@ -0,0 +1,190 @@
+import os
+import re
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import analise_html
+import coleta_http
+import espera
+import extracao
+import metricas
+import navegador
+
+# Grade de parceiros da Esfera (sobrescrita por ESFERA_URL, ex.: servidor local de testes)
+URL_PARCEIROS = coleta_http.url_configurada("ESFERA_URL", "https://www.esfera.com.vc/c/ganhe-pontos/esf02163")
+URL_BASE_ESFERA = "https://www.esfera.com.vc"
+
+# Classe exata dos cards de parceiros (mesma regra do find_all do BeautifulSoup)
+CLASSE_CARD = "col-xs-6 col-sm-3 col-lg-2"
+
+# Campos de cada card, compartilhados pelo bot de pontuação (esf) e pelo de links (linkesf):
+#   nome       texto de div.-partnerName
+#   alt        alt da logo (nome usado pelo linkesf)
+#   logo       src da logo
+#   descricao  texto de div.-partnerPoints
+#   tem_link   se o box do card tem um <a>
+#   href       href desse <a>
+CAMPOS_CARD = ("nome", "alt", "logo", "descricao", "tem_link", "href")
+
+# Devolve, em uma única chamada, só os campos brutos de cada card (null = elemento ausente)
+SCRIPT_EXTRACAO_CARDS = extracao.FUNCOES_JS + """
+return Array.from(document.querySelectorAll("div.col-xs-6.col-sm-3.col-lg-2"))
+    .filter(function (card) { return classes(card).join(" ") === "%s"; })
+    .map(function (card) {
+        var img = card.querySelector("img");
+        var box = card.querySelector("div.box-partner-custom");
+        var link = box ? box.querySelector("a") : null;
+        return {
+            nome: texto(card.querySelector('div[class~="-partnerName"]'), ""),
+            alt: atributo(box ? box.querySelector("img") : null, "alt"),
+            logo: atributo(img, "src"),
+            descricao: texto(card.querySelector('div[class~="-partnerPoints"]'), " "),
+            tem_link: !!link,
+            href: atributo(link, "href")
+        };
+    });
+""" % CLASSE_CARD
+
+# Só os cards são analisados (com a classe exata); o resto da página é descartado
+CONTAINER_CARDS = analise_html.container("div", class_=CLASSE_CARD)
+SELETOR_CARD = analise_html.seletor("div.col-xs-6.col-sm-3.col-lg-2")
+SELETOR_NOME = analise_html.seletor("div.-partnerName")
+SELETOR_LOGO = analise_html.seletor("img")
+SELETOR_DESCRICAO = analise_html.seletor("div.-partnerPoints")
+SELETOR_BOX = analise_html.seletor("div.box-partner-custom")
+SELETOR_LINK = analise_html.seletor("a")
+
+def cards_do_html(html, parser=None, restringir=True):
+    """
+    Extrai do HTML da página os mesmos campos brutos de SCRIPT_EXTRACAO_CARDS.
+    Caminho da coleta via HTTP e de fallback (e de conferência) da extração no navegador.
+
+    Args:
+        parser (str, opcional): Parser do BeautifulSoup (padrão: lxml, se instalado).
+        restringir (bool): Analisa só os cards em vez do documento inteiro.
+    """
+    soup = analise_html.criar_soup(html, CONTAINER_CARDS if restringir else None, parser)
+    cards = []
+    for card in SELETOR_CARD.select(soup):
+        if card.get("class") != CLASSE_CARD.split():
+            continue
+        nome_div = SELETOR_NOME.select_one(card)
+        img_tag = SELETOR_LOGO.select_one(card)
+        descricao_div = SELETOR_DESCRICAO.select_one(card)
+        box = SELETOR_BOX.select_one(card)
+        img_box = SELETOR_LOGO.select_one(box) if box else None
+        link = SELETOR_LINK.select_one(box) if box else None
+        cards.append({
+            "nome": nome_div.get_text(strip=True) if nome_div else None,
+            "alt": img_box.get("alt") if img_box else None,
+            "logo": img_tag.get("src") if img_tag else None,
+            "descricao": descricao_div.get_text(" ", strip=True) if descricao_div else None,
+            "tem_link": link is not None,
+            "href": link.get("href") if link else None,
+        })
+    return cards
+
+# Chaves aceitas para cada campo quando os parceiros vêm em JSON (catálogo
+# embutido na página ou do endpoint em ESFERA_API_URL)
+CHAVES_JSON_CARD = {
+    "nome": ("partnerName", "nome", "name"),
+    "logo": ("logo", "logoUrl", "image", "image.url", "images.0.url"),
+    "descricao": ("partnerPoints", "pointsText", "points", "description", "summary"),
+    "href": ("href", "url", "link", "partnerUrl"),
+}
+
+def registro_parece_card(registro):
+    """
+    Reconhece um parceiro do catálogo em JSON: tem nome e um texto de
+    pontuação (com número e 'pt'/'ponto'), como o exibido em div.-partnerPoints.
+    """
+    descricao = coleta_http.primeiro_campo(registro, CHAVES_JSON_CARD["descricao"])
+    return (
+        coleta_http.primeiro_campo(registro, CHAVES_JSON_CARD["nome"]) is not None
+        and isinstance(descricao, str)
+        and re.search(r"\d", descricao) is not None
+        and re.search(r"pts?\b|ponto", descricao, re.IGNORECASE) is not None
+    )
+
+def cards_de_json(objeto):
+    """
+    Converte a maior lista de parceiros encontrada no JSON para os campos de CAMPOS_CARD.
+    """
+    cards = []
+    for registro in coleta_http.procurar_registros(objeto, registro_parece_card):
+        valores = {
+            campo: coleta_http.primeiro_campo(registro, chaves) for campo, chaves in CHAVES_JSON_CARD.items()
+        }
+        nome = " ".join(str(valores["nome"]).split())
+        cards.append({
+            "nome": nome,
+            "alt": nome,
+            "logo": str(valores["logo"]) if valores["logo"] is not None else None,
+            "descricao": " ".join(str(valores["descricao"]).split()),
+            "tem_link": valores["href"] is not None,
+            "href": str(valores["href"]) if valores["href"] is not None else None,
+        })
+    return cards
+
+def cards_via_http(minimo=0, campos=("nome", "descricao")):
+    """
+    Coleta a grade sem navegador: HTML renderizado no servidor, catálogo JSON
+    embutido na página e, se configurado, o endpoint em ESFERA_API_URL. A
+    resposta pode vir com gzip (descomprimida pela sessão). Usa o primeiro
+    resultado completo (ao menos 'minimo' cards, todos com os campos pedidos).
+
+    Returns:
+        list ou None: Cards; None se nenhuma fonte trouxe dados completos.
+    """
+    candidatos = []
+    resposta = coleta_http.obter(URL_PARCEIROS, "esf")
+    if resposta is not None:
+        inicio = time.perf_counter()
+        candidatos.append(("HTML", cards_do_html(resposta.text)))
+        candidatos += [("JSON embutido", cards_de_json(bloco)) for bloco in coleta_http.jsons_embutidos(resposta.text)]
+        metricas.registrar("extracao.esf.http", time.perf_counter() - inicio)
+
+    url_api = os.getenv("ESFERA_API_URL")
+    if url_api:
+        resposta_api = coleta_http.obter(url_api, "esf.api")
+        if resposta_api is not None:
+            try:
+                candidatos.append(("API", cards_de_json(resposta_api.json())))
+            except ValueError:
+                print("[WARN] Resposta de ESFERA_API_URL não é JSON.")
+
+    for origem, cards in candidatos:
+        if coleta_http.cards_completos(cards, campos, minimo):
+            print(f"[INFO] {len(cards)} cards da Esfera obtidos via HTTP ({origem}), sem abrir o navegador.")
+            return cards
+    print("[INFO] Coleta via HTTP da Esfera sem dados completos; usando o navegador.")
+    return None
+
+def cards_via_selenium(perfil="esf"):
+    """
+    Abre a grade no Chrome e extrai os campos dos cards.
+
+    Returns:
+        list: Cards (vazia se a página não carregou).
+    """
+    driver = navegador.criar_driver(perfil)
+
+    print("[INFO] Abrindo página...")
+    navegador.abrir(driver, URL_PARCEIROS, perfil)
+
+    # Aguardar os cards carregarem
+    try:
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located((By.CLASS_NAME, "box-partner-custom"))
+        )
+        print("[INFO] Cards encontrados.")
+    except:
+        print("[ERROR] Timeout ao esperar os cards.")
+        navegador.encerrar_driver(driver)
+        return []
+
+    espera.aguardar_estabilidade(driver, ".box-partner-custom", nome=f"{perfil}.cards")
+    cards = extracao.coletar_cards(driver, SCRIPT_EXTRACAO_CARDS, cards_do_html, perfil)
+    navegador.encerrar_driver(driver)
+    return cards
@@ -0,0 +1,242 @@
+import os
+import bisect
+from collections import Counter
+from datetime import datetime, timedelta
+import rotulos
+
+def gravar_so_mudancas() -> bool:
+    """
+    Indica se o modo "gravar só mudanças" está ativo (variável de ambiente
+    MILOG_GRAVAR_SO_MUDANCAS=1). Nesse modo uma nova linha de pontuação só é
+    gravada quando algo mudou em relação à última linha do parceiro; caso
+    contrário, apenas o visto_ate da última linha é atualizado.
+    """
+    return os.getenv("MILOG_GRAVAR_SO_MUDANCAS", "").strip().lower() in ("1", "true", "sim", "yes")
+
+def carregar_ultimas_linhas(connection, table_pontuacao, colunas, empresa_ids):
+    """
+    Carrega, com uma única consulta, a última linha gravada de cada empresa.
+
+    Returns:
+        dict: empresa_id -> dict com 'id' e as colunas pedidas.
+    """
+    empresa_ids = list(set(empresa_ids))
+    if not empresa_ids:
+        return {}
+
+    marcadores = ", ".join(["%s"] * len(empresa_ids))
+    campos = ", ".join(f"p.{coluna}" for coluna in colunas)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT p.id, p.empresa_id, {campos}
+        FROM {table_pontuacao} p
+        JOIN (
+            SELECT empresa_id, MAX(id) AS id FROM {table_pontuacao}
+            WHERE empresa_id IN ({marcadores})
+            GROUP BY empresa_id
+        ) ultimas ON ultimas.id = p.id
+    """, empresa_ids)
+
+    return {
+        linha[1]: dict(zip(("id",) + tuple(colunas), (linha[0],) + tuple(linha[2:])))
+        for linha in cursor.fetchall()
+    }
+
+def mesmo_valor(novo, gravado):
+    # Colunas FLOAT voltam do MySQL com 6 dígitos significativos
+    if isinstance(gravado, float):
+        return rotulos.normalizar_pontuacao(novo) == rotulos.normalizar_pontuacao(gravado)
+    return novo == gravado
+
+def separar_inalteradas(connection, table_pontuacao, colunas, linhas, comparar):
+    """
+    Separa as linhas da execução entre as que precisam ser inseridas e as que
+    repetem a última linha gravada do parceiro.
+
+    Args:
+        colunas (tuple of str): Nomes das colunas, na ordem dos valores de cada linha.
+        linhas (list of tuple): Linhas a gravar (devem incluir 'empresa_id' e 'data_hora_coleta').
+        comparar (tuple of str): Colunas que definem se houve mudança.
+
+    Returns:
+        tuple: (linhas a inserir, IDs das últimas linhas que só precisam de
+        visto_ate; repetidos quando a empresa vem em mais de um card).
+    """
+    if not linhas:
+        return [], []
+    posicao = {coluna: i for i, coluna in enumerate(colunas)}
+    ultimas = carregar_ultimas_linhas(
+        connection, table_pontuacao, tuple(comparar) + ("data_hora_coleta", "visto_ate"),
+        [linha[posicao["empresa_id"]] for linha in linhas]
+    )
+    anterior = coleta_anterior(connection, table_pontuacao, linhas[0][posicao["data_hora_coleta"]])
+    return separar_linhas(colunas, linhas, ultimas, comparar, anterior)
+
+def separar_linhas(colunas, linhas, ultimas, comparar, anterior):
+    """
+    Parte de separar_inalteradas que não acessa o banco. Uma linha só é
+    estendida se repete a última do parceiro e se ela foi vista na coleta
+    anterior: quando o parceiro some de uma coleta, a volta gera linha nova,
+    para que cada linha cubra só coletas seguidas em que ele apareceu.
+
+    Args:
+        ultimas (dict): empresa_id -> última linha (com 'id', 'data_hora_coleta',
+            'visto_ate' e as colunas de 'comparar').
+        anterior (datetime ou None): Coleta registrada imediatamente antes desta.
+    """
+    posicao = {coluna: i for i, coluna in enumerate(colunas)}
+    inserir, vistas = [], []
+    for linha in linhas:
+        ultima = ultimas.get(linha[posicao["empresa_id"]])
+        if (
+            ultima
+            and anterior is not None
+            and _como_data_hora(ultima["visto_ate"] or ultima["data_hora_coleta"]) == _como_data_hora(anterior)
+            and all(mesmo_valor(linha[posicao[coluna]], ultima[coluna]) for coluna in comparar)
+        ):
+            vistas.append(ultima["id"])
+        else:
+            inserir.append(linha)
+    return inserir, vistas
+
+def marcar_vistas(connection, table_pontuacao, ids, data_hora_coleta):
+    """
+    Atualiza o visto_ate das linhas informadas e soma em vezes_vista quantas
+    vezes cada uma foi vista na coleta (a mesma empresa pode vir em mais de
+    um card idêntico, como no modo completo, que grava uma linha por card),
+    com um UPDATE por quantidade distinta. Não faz commit.
+    """
+    if not ids:
+        return
+    por_quantidade = {}
+    for linha_id, quantidade in Counter(ids).items():
+        por_quantidade.setdefault(quantidade, []).append(linha_id)
+    cursor = connection.cursor()
+    for quantidade, linhas in sorted(por_quantidade.items()):
+        marcadores = ", ".join(["%s"] * len(linhas))
+        cursor.execute(f"""
+            UPDATE {table_pontuacao} SET visto_ate = %s, vezes_vista = vezes_vista + %s
+            WHERE id IN ({marcadores})
+        """, [data_hora_coleta, quantidade] + linhas)
+
+def quantidade_ultima_coleta(connection, table_pontuacao):
+    """
+    Quantidade de empresas vistas na coleta mais recente, nos dois modos de
+    gravação, lida da tabela de coletas pela chave primária (sem varrer a
+    tabela de pontuação).
+    """
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT empresas FROM {tabela_coletas(table_pontuacao)}
+        ORDER BY data_hora_coleta DESC LIMIT 1
+    """)
+    resultado = cursor.fetchone()
+    cursor.close()
+    return resultado[0] if resultado else 0
+
+def tabela_coletas(table_pontuacao):
+    return f"{table_pontuacao}_coletas"
+
+def criar_tabela_coletas(connection, table_pontuacao):
+    """
+    Cria a tabela com uma linha por coleta gravada (nos dois modos de gravação).
+    """
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {tabela_coletas(table_pontuacao)} (
+            data_hora_coleta DATETIME PRIMARY KEY,
+            empresas INT NOT NULL
+        );
+    """)
+
+def registrar_coleta(connection, table_pontuacao, data_hora_coleta, empresas):
+    """
+    Registra uma coleta e quantas empresas ela viu. Não faz commit.
+    """
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        INSERT INTO {tabela_coletas(table_pontuacao)} (data_hora_coleta, empresas) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE empresas = VALUES(empresas)
+    """, (data_hora_coleta, empresas))
+
+def coleta_anterior(connection, table_pontuacao, data_hora_coleta):
+    """
+    Carimbo da última coleta registrada antes de data_hora_coleta (None se não houver).
+    """
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT MAX(data_hora_coleta) FROM {tabela_coletas(table_pontuacao)}
+        WHERE data_hora_coleta < %s
+    """, (data_hora_coleta,))
+    (anterior,) = cursor.fetchone()
+    return anterior
+
+def expandir_serie_diaria(linhas, coletas=None):
+    """
+    Expande um histórico compacto em uma série diária: cada linha vale para as
+    coletas de data_hora_coleta até visto_ate (ou só a própria, se visto_ate
+    for nulo) e cada dia fica com o valor da última coleta do dia. Dias sem
+    coleta ficam de fora.
+
+    Args:
+        linhas (list of tuple): (data_hora_coleta, visto_ate, valores...) em ordem de coleta.
+        coletas (list, opcional): Carimbos das coletas registradas. Sem eles,
+            cada linha vale para todos os dias do intervalo.
+
+    Returns:
+        list of tuple: (data, valores) com uma entrada por dia.
+    """
+    serie = {}
+    if coletas is None:
+        for data_hora_coleta, visto_ate, *valores in linhas:
+            dia = _como_data(data_hora_coleta)
+            fim = _como_data(visto_ate) if visto_ate else dia
+            while dia <= fim:
+                serie[dia] = tuple(valores)
+                dia += timedelta(days=1)
+        return sorted(serie.items())
+
+    coletas = sorted({_como_data_hora(coleta) for coleta in coletas})
+    por_coleta = {}
+    for data_hora_coleta, visto_ate, *valores in linhas:
+        inicio = _como_data_hora(data_hora_coleta)
+        fim = _como_data_hora(visto_ate) if visto_ate else inicio
+        cobertas = coletas[bisect.bisect_left(coletas, inicio):bisect.bisect_right(coletas, fim)]
+        for coleta in [inicio] + cobertas:
+            por_coleta[coleta] = tuple(valores)
+    for coleta in sorted(por_coleta):
+        serie[coleta.date()] = por_coleta[coleta]
+    return sorted(serie.items())
+
+def carregar_serie_diaria(connection, table_pontuacao, empresa_id, colunas=("moeda", "pontuacao")):
+    """
+    Lê o histórico (compacto ou completo) de uma empresa e o devolve como
+    série diária, só com os dias em que houve coleta.
+
+    Returns:
+        list of tuple: (data, valores) com uma entrada por dia.
+    """
+    campos = ", ".join(colunas)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT data_hora_coleta, visto_ate, {campos} FROM {table_pontuacao}
+        WHERE empresa_id = %s ORDER BY data_hora_coleta ASC, id ASC
+    """, (empresa_id,))
+    linhas = cursor.fetchall()
+    if not linhas:
+        return []
+    cursor.execute(f"""
+        SELECT data_hora_coleta FROM {tabela_coletas(table_pontuacao)}
+        WHERE data_hora_coleta BETWEEN %s AND %s
+    """, (linhas[0][0], max(linha[1] or linha[0] for linha in linhas)))
+    return expandir_serie_diaria(linhas, [coleta for (coleta,) in cursor.fetchall()])
+
+def _como_data(valor):
+    if isinstance(valor, str):
+        valor = datetime.strptime(valor, "%Y-%m-%d %H:%M:%S")
+    return valor.date() if isinstance(valor, datetime) else valor
+
+def _como_data_hora(valor):
+    if isinstance(valor, str):
+        return datetime.strptime(valor, "%Y-%m-%d %H:%M:%S")
+    return valor
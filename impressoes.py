@@ -0,0 +1,64 @@
+import os
+import json
+import hashlib
+
+# Pasta dos caches de cards interpretados, um arquivo por programa
+# (MILOG_CACHE_CARDS=0 desativa o cache)
+PASTA_CACHE = os.getenv("MILOG_CACHE_CARDS", "cache_cards")
+
+def cache_ativo() -> bool:
+    return PASTA_CACHE.strip().lower() not in ("", "0", "false", "nao", "no")
+
+def impressao(card):
+    """
+    Impressão digital dos campos brutos de um card (independe da ordem das chaves).
+    """
+    conteudo = json.dumps(card, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+def identidade(table_empresas, versao):
+    """
+    Chave que valida o cache: banco, tabela de empresas (os empresa_id só valem
+    nela) e versão das regras de interpretação.
+    """
+    return f"{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}/{table_empresas}@{versao}"
+
+def caminho_cache(programa):
+    return os.path.join(PASTA_CACHE, f"{programa}.json")
+
+def carregar(programa, chave):
+    """
+    Lê os registros da coleta anterior, indexados pela impressão do card.
+    Um cache de outra versão das regras ou de outro banco é descartado.
+
+    Returns:
+        dict: impressão -> registro interpretado (com empresa_id).
+    """
+    if not cache_ativo():
+        return {}
+    try:
+        with open(caminho_cache(programa), encoding="utf-8") as arquivo:
+            conteudo = json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+    if conteudo.get("chave") != chave:
+        print(f"[INFO] Cache de cards de '{programa}' descartado (regras ou banco diferentes).")
+        return {}
+    return conteudo.get("registros", {})
+
+def salvar(programa, chave, registros):
+    """
+    Substitui o cache pelos registros da coleta atual (só os cards desta coleta
+    entram, para o arquivo não crescer indefinidamente).
+
+    Args:
+        registros (dict): impressão -> registro interpretado (com empresa_id).
+    """
+    if not cache_ativo():
+        return
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    caminho = caminho_cache(programa)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump({"chave": chave, "registros": registros}, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
@@ -1,9 +1,9 @@
 import os
 import mysql.connector
+import banco
 import time
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from urllib.parse import urljoin
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import (
     NoSuchElementException,
@@ -14,6 +14,15 @@ from selenium.common.exceptions import (
 )
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+import migracoes
+import coleta_http
+import grade_esfera
+import historico
+import espera
+import navegador
+import politica_links
+import pool_navegadores
+import metricas
 
 def get_env_var(var_name: str) -> str:
     value = os.getenv(var_name)
@@ -23,12 +32,7 @@ def get_env_var(var_name: str) -> str:
 
 def conectar_banco():
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            database=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD")
-        )
+        connection = banco.conectar()  # Com novas tentativas em falhas transitórias
         if connection.is_connected():
             print("[INFO] Conectado ao banco de dados.")
             return connection
@@ -36,77 +40,13 @@ def conectar_banco():
         print(f"[ERROR] Não foi possível conectar ao banco de dados: {err}")
         return None
 
-def garantir_campo_link(connection, table_empresas):
-    cursor = connection.cursor()
-    try:
-        cursor.execute("""
-            SELECT COLUMN_NAME 
-            FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = 'link';
-        """, (os.getenv("DB_NAME"), table_empresas))
-        result = cursor.fetchone()
-        if not result:
-            try:
-                cursor.execute(f"ALTER TABLE {table_empresas} ADD COLUMN link VARCHAR(2083);")
-                connection.commit()
-                print(f"[INFO] Coluna 'link' adicionada à tabela '{table_empresas}'.")
-            except mysql.connector.Error as err:
-                print(f"[ERROR] Não foi possível adicionar a coluna 'link': {err}")
-        else:
-            print(f"[INFO] A tabela '{table_empresas}' já possui a coluna 'link'.")
-    finally:
-        cursor.close()
-
 def conectar_selenium():
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")  # Atualizado para headless novo se disponível
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-    )
-
     try:
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_window_size(1920, 1080)
-        return driver
+        return navegador.criar_driver("linkesf")
     except WebDriverException as e:
         print(f"[ERROR] Não foi possível iniciar o WebDriver do Selenium: {e}")
         return None
 
-def obter_empresa_id(nome_empresa, connection, table_empresas):
-    cursor = connection.cursor()
-    try:
-        cursor.execute(f"SELECT id FROM {table_empresas} WHERE nome = %s", (nome_empresa,))
-        empresa = cursor.fetchone()
-        if empresa:
-            return empresa[0]
-        else:
-            print(f"[WARN] Empresa '{nome_empresa}' não encontrada na tabela.")
-            return None
-    finally:
-        cursor.close()
-
-def atualizar_link_no_banco(connection, table_empresas, empresa_id, link_novo):
-    cursor = connection.cursor()
-    try:
-        cursor.execute(f"SELECT link FROM {table_empresas} WHERE id = %s", (empresa_id,))
-        resultado = cursor.fetchone()
-        link_atual = resultado[0] if resultado else None
-
-        if link_atual != link_novo:
-            try:
-                cursor.execute(f"UPDATE {table_empresas} SET link = %s WHERE id = %s", (link_novo, empresa_id))
-                connection.commit()
-                print(f"[INFO] Link atualizado para a empresa ID {empresa_id}: {link_novo}")
-            except mysql.connector.Error as err:
-                print(f"[ERROR] Erro ao atualizar o link para a empresa ID {empresa_id}: {err}")
-        else:
-            print(f"[INFO] Link para a empresa ID {empresa_id} já está atualizado.")
-    finally:
-        cursor.close()
-
 def fechar_notificacoes(driver):
     """
     Tenta fechar quaisquer notificações ou elementos que possam estar interceptando cliques.
@@ -119,150 +59,255 @@ def fechar_notificacoes(driver):
                 fechar_botao = notificacao.find_element(By.CSS_SELECTOR, "button.close")  # Atualize o seletor conforme necessário
                 fechar_botao.click()
                 print("[INFO] Notificação fechada.")
-                time.sleep(1)  # Pausa para garantir que a notificação foi fechada
+                WebDriverWait(driver, 2).until(EC.invisibility_of_element(notificacao))
             except NoSuchElementException:
                 continue
     except Exception as e:
         print(f"[WARN] Não foi possível fechar notificações: {e}")
 
-def processar_cards_esf(driver, connection, table_empresas):
+# URL base usada para resolver links relativos dos cards e página de parceiros da Esfera
+URL_BASE_ESFERA = grade_esfera.URL_BASE_ESFERA
+URL_PARCEIROS = grade_esfera.URL_PARCEIROS
+
+# Lê, em uma única consulta ao DOM, nome e href de todos os cards
+SCRIPT_COLETA_CARDS = """
+return Array.from(document.querySelectorAll("div.box-partner-custom")).map(function (card, indice) {
+    var img = card.querySelector("img");
+    var link = card.querySelector("a");
+    return {
+        indice: indice,
+        nome: img ? img.getAttribute("alt") : null,
+        tem_link: !!link,
+        href: link ? link.getAttribute("href") : null
+    };
+});
+"""
+
+def coletar_cards(driver):
+    """
+    Retorna, com um único execute_script, nome e href de todos os cards.
+    """
+    return driver.execute_script(SCRIPT_COLETA_CARDS) or []
+
+def resolver_link_por_clique(driver, indice, nome_empresa):
+    """
+    Obtém o link de um card sem 'href' clicando nele e voltando para a página
+    principal. Usado apenas para os cards raros sem href no DOM.
+
+    Returns:
+        str ou None: URL obtida após a navegação.
+    """
+    url_principal = driver.current_url
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.box-partner-custom"))
+    )
+    card = driver.find_elements(By.CSS_SELECTOR, "div.box-partner-custom")[indice]
+
+    # Fechar notificações que possam estar interferindo
+    fechar_notificacoes(driver)
+
     try:
-        cards = driver.find_elements(By.CSS_SELECTOR, "div.box-partner-custom")
-        num_cards = len(cards)
-        print(f"[INFO] Total de cards a serem processados: {num_cards}")
+        card.find_element(By.TAG_NAME, "a").click()
+        # Esperar a navegação para a página do parceiro
+        WebDriverWait(driver, 20).until(EC.url_changes(url_principal))
+        link_novo = driver.current_url
+        print(f"[INFO] Link obtido após clique para a empresa '{nome_empresa}': {link_novo}")
+        # Navegar de volta e esperar a página principal carregar novamente
+        driver.back()
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div.box-partner-custom"))
+        )
+        return link_novo
+    except Exception as click_e:
+        print(f"[ERROR] Falha ao clicar para obter o link da empresa '{nome_empresa}': {click_e}")
+        return None
 
-        for i in range(num_cards):
-            try:
-                # Re-encontrar os cards para evitar StaleElementReferenceException
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.box-partner-custom"))
-                )
-                cards = driver.find_elements(By.CSS_SELECTOR, "div.box-partner-custom")
-                card = cards[i]
-
-                # Extrair o nome da empresa
-                try:
-                    img_tag = card.find_element(By.CSS_SELECTOR, "img")
-                    nome_empresa = img_tag.get_attribute("alt")
-                    print(f"[INFO] Processando empresa: {nome_empresa}")
-                except NoSuchElementException:
+def abrir_pagina_principal(driver):
+    """
+    Abre a página de parceiros da Esfera, aceita os cookies e espera os cards.
+
+    Returns:
+        bool: True se os cards foram encontrados.
+    """
+    print("[INFO] Abrindo página principal da Esfera...")
+    navegador.abrir(driver, URL_PARCEIROS, "linkesf")
+
+    # Tenta clicar no botão de cookies, se existir
+    try:
+        WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
+        ).click()
+        print("[INFO] Cookies aceitos.")
+    except TimeoutException:
+        print("[INFO] Nenhum pop-up de cookies encontrado.")
+
+    # Esperar os cards carregarem
+    try:
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div.box-partner-custom"))
+        )
+        print("[INFO] Cards encontrados na página principal da Esfera.")
+        espera.aguardar_estabilidade(driver, "div.box-partner-custom", nome="linkesf.cards")
+        return True
+    except TimeoutException:
+        print("[ERROR] Timeout ao esperar os cards na página principal da Esfera.")
+        return False
+
+def abrir_navegador_para_cliques(sem_href):
+    """
+    Abre o navegador quando a grade veio via HTTP mas alguns cards não têm
+    href, e preenche o 'indice' desses cards pela posição no DOM (casando pelo
+    nome). Cards não encontrados na página ficam sem índice.
+
+    Returns:
+        WebDriver ou None: Navegador na página principal.
+    """
+    driver = conectar_selenium()
+    if not driver:
+        return None
+    if not abrir_pagina_principal(driver):
+        navegador.encerrar_driver(driver)
+        return None
+    indices = {card["nome"]: card["indice"] for card in coletar_cards(driver) if card.get("nome")}
+    for card in sem_href:
+        card["indice"] = indices.get(card["nome"])
+    return driver
+
+def processar_cards_esf(driver, connection, table_empresas, cards=None):
+    """
+    Tira um único snapshot (nome, href) de todos os cards, resolve os links
+    relativos em Python e só navega no navegador para os cards sem href.
+    Apenas os parceiros selecionados por politica_links (novos, vencidos ou
+    com falha) são processados. O tempo de cada fase é registrado em metricas.
+
+    Args:
+        driver (WebDriver ou None): Navegador na página principal; None quando
+            os cards vieram via HTTP (o navegador só é aberto se houver cliques).
+        cards (list, opcional): Cards já coletados via HTTP; sem eles, o
+            snapshot é tirado do navegador.
+    """
+    driver_proprio = None
+    try:
+        with metricas.etapa("linkesf.snapshot"):
+            if cards is None:
+                cards = coletar_cards(driver)
+        print(f"[INFO] Total de cards encontrados: {len(cards)}")
+
+        # Só entram na rodada parceiros novos, com link vencido ou que falharam
+        estado = politica_links.carregar_estado_links(connection, table_empresas)
+        trabalho = politica_links.selecionar_trabalho(estado, [card.get("nome") for card in cards if card.get("nome")])
+
+        links = {}
+        sem_href = []
+        with metricas.etapa("linkesf.resolucao_links"):
+            for card in cards:
+                nome_empresa = card.get("nome")
+                if not nome_empresa:
                     print("[WARN] Nome da empresa não encontrado no card.")
                     continue
-
-                # Extrair o link da empresa
-                try:
-                    link_element = card.find_element(By.TAG_NAME, "a")
-                    link_relativo = link_element.get_attribute("href")
-                    
-                    if link_relativo:
-                        if not link_relativo.startswith("http"):
-                            # Se o link for relativo, construí-lo com a base da URL
-                            link_novo = f"https://www.esfera.com.vc{link_relativo}"
-                        else:
-                            link_novo = link_relativo
-                        print(f"[INFO] Link encontrado para a empresa '{nome_empresa}': {link_novo}")
-                    else:
-                        # Caso o 'href' não exista, tentar clicar e obter a URL
-                        print(f"[WARN] 'href' não encontrado para a empresa '{nome_empresa}', tentando clicar para obter o link.")
-                        try:
-                            link_element.click()
-                            # Esperar a nova página carregar
-                            WebDriverWait(driver, 20).until(
-                                EC.presence_of_element_located((By.TAG_NAME, "body"))
-                            )
-                            link_novo = driver.current_url
-                            print(f"[INFO] Link obtido após clique para a empresa '{nome_empresa}': {link_novo}")
-                            # Navegar de volta para a página principal
-                            driver.back()
-                            # Esperar a página principal carregar novamente
-                            WebDriverWait(driver, 20).until(
-                                EC.presence_of_element_located((By.CSS_SELECTOR, "div.box-partner-custom"))
-                            )
-                        except Exception as click_e:
-                            print(f"[ERROR] Falha ao clicar para obter o link da empresa '{nome_empresa}': {click_e}")
-                            continue
-
-                except NoSuchElementException:
-                    print("[WARN] Link não encontrado no card.")
+                if nome_empresa not in trabalho:
                     continue
-                except Exception as e:
-                    print(f"[ERROR] Erro ao extrair o link para a empresa '{nome_empresa}': {e}")
+                if not card.get("tem_link"):
+                    print(f"[WARN] Link não encontrado no card da empresa '{nome_empresa}'.")
                     continue
+                if card.get("href"):
+                    # Links relativos são resolvidos com a base da URL da Esfera
+                    links[nome_empresa] = urljoin(URL_BASE_ESFERA, card["href"])
+                else:
+                    sem_href.append(card)
 
-                # Fechar notificações que possam estar interferindo
-                fechar_notificacoes(driver)
+        print(f"[INFO] {len(links)} links lidos do snapshot; {len(sem_href)} cards sem 'href' exigem clique.")
 
-                # Atualizar o banco de dados
-                empresa_id = obter_empresa_id(nome_empresa, connection, table_empresas)
-                if empresa_id:
-                    atualizar_link_no_banco(connection, table_empresas, empresa_id, link_novo)
+        if sem_href and driver is None:
+            with metricas.etapa("linkesf.carregamento"):
+                driver = driver_proprio = abrir_navegador_para_cliques(sem_href)
+            sem_href = [card for card in sem_href if driver and card["indice"] is not None]
 
-                # Pausa para evitar sobrecarga e garantir que a página esteja estável
-                time.sleep(1)
+        # Cards sem href são distribuídos entre os navegadores do pool
+        # (LINK_WORKERS); o navegador atual é reaproveitado como primeiro worker
+        with metricas.etapa("linkesf.cliques"):
+            resultados = pool_navegadores.resolver_em_paralelo(
+                sem_href,
+                criar_driver=conectar_selenium,
+                encerrar_driver=navegador.encerrar_driver,
+                preparar_pagina=abrir_pagina_principal,
+                resolver=lambda driver_worker, card: resolver_link_por_clique(
+                    driver_worker, card["indice"], card["nome"]
+                ),
+                drivers_existentes=[driver],
+            )
+            for card, link_novo in resultados:
+                if link_novo:
+                    links[card["nome"]] = link_novo
 
-            except IndexError:
-                print(f"[ERROR] Índice {i} fora do intervalo. Número de cards pode ter mudado.")
-                break
-            except Exception as e:
-                print(f"[ERROR] Ocorreu um erro inesperado: {e}")
-                continue
+        # Atualizar o banco de dados
+        with metricas.etapa("linkesf.gravacao"):
+            falhas = [nome_empresa for nome_empresa in trabalho if nome_empresa not in links]
+            politica_links.registrar_resultados(connection, table_empresas, estado, links, falhas)
 
     except Exception as e:
         print(f"[ERROR] Erro durante o processamento dos cards: {e}")
+    finally:
+        if driver_proprio:
+            navegador.encerrar_driver(driver_proprio)
 
-def main():
-    # Conectar ao banco de dados
-    connection = conectar_banco()
-    if not connection:
-        return
-
+def executar(connection):
+    """
+    Executa o bot com uma conexão já aberta (usado por main e pelo orquestrador milog.py).
+    """
     # Obter o nome da tabela de empresas para Esfera
     table_empresas = get_env_var("TABLE_EMPRESAS_ESF")  # Certifique-se de definir esta variável de ambiente
+    table_pontuacao = get_env_var("TABLE_PONTUACAO_ESF")
 
-    # Garantir que a tabela possui o campo 'link'
-    garantir_campo_link(connection, table_empresas)
-
-    # Configurar o Selenium
-    driver = conectar_selenium()
-    if not driver:
-        connection.close()
-        return
+    # Garantir que a tabela possui o campo 'link' (aplicado uma única vez via migrações)
+    migracoes.aplicar_migracoes(connection, table_empresas, table_pontuacao)
 
-    # URL da Esfera
-    url = "https://www.esfera.com.vc/c/ganhe-pontos/esf02163"
+    # Grade via HTTP: o navegador só é aberto se algum card exigir clique
+    cards = None
+    if coleta_http.http_ativo():
+        anterior = historico.quantidade_ultima_coleta(connection, table_pontuacao)
+        with metricas.etapa("linkesf.http"):
+            registros = grade_esfera.cards_via_http(
+                minimo=int(anterior * coleta_http.FRACAO_MINIMA), campos=("alt",)
+            )
+        if registros is not None:
+            cards = [
+                {"indice": None, "nome": registro["alt"], "tem_link": registro["tem_link"], "href": registro["href"]}
+                for registro in registros
+            ]
 
+    driver = None
     try:
-        print("[INFO] Abrindo página principal da Esfera...")
-        driver.get(url)
-
-        # Tenta clicar no botão de cookies, se existir
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-            ).click()
-            print("[INFO] Cookies aceitos.")
-        except TimeoutException:
-            print("[INFO] Nenhum pop-up de cookies encontrado.")
-
-        # Esperar os cards carregarem
-        try:
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div.box-partner-custom"))
-            )
-            print("[INFO] Cards encontrados na página principal da Esfera.")
-        except TimeoutException:
-            print("[ERROR] Timeout ao esperar os cards na página principal da Esfera.")
-            driver.quit()
-            connection.close()
-            return
+        if cards is None:
+            # Configurar o Selenium
+            driver = conectar_selenium()
+            if not driver:
+                return
+
+            inicio_carregamento = time.perf_counter()
+            if not abrir_pagina_principal(driver):
+                return
+            metricas.registrar("linkesf.carregamento", time.perf_counter() - inicio_carregamento)
 
         # Processar os cards para obter e salvar os links
-        processar_cards_esf(driver, connection, table_empresas)
+        processar_cards_esf(driver, connection, table_empresas, cards)
+
+    finally:
+        # Fechar o navegador
+        if driver:
+            navegador.encerrar_driver(driver)
+
+def main():
+    # Conectar ao banco de dados
+    connection = conectar_banco()
+    if not connection:
+        return
 
+    try:
+        executar(connection)
     finally:
-        # Fechar o navegador e a conexão com o banco
-        driver.quit()
         connection.close()
+        metricas.imprimir_resumo()
         print("[INFO] Bot finalizado com sucesso.")
 
 if __name__ == "__main__":
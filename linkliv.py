@@ -1,9 +1,9 @@
 import os
+import re
 import mysql.connector
-import time
+import banco
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from urllib.parse import urljoin
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import (
     NoSuchElementException,
@@ -14,6 +14,13 @@ from selenium.common.exceptions import (
 )
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+import coleta_http
+import metricas
+import migracoes
+import espera
+import navegador
+import politica_links
+import pool_navegadores
 
 def get_env_var(var_name: str) -> str:
     value = os.getenv(var_name)
@@ -23,12 +30,7 @@ def get_env_var(var_name: str) -> str:
 
 def conectar_banco():
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            database=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD")
-        )
+        connection = banco.conectar()  # Com novas tentativas em falhas transitórias
         if connection.is_connected():
             print("[INFO] Conectado ao banco de dados.")
             return connection
@@ -36,77 +38,13 @@ def conectar_banco():
         print(f"[ERROR] Não foi possível conectar ao banco de dados: {err}")
         return None
 
-def garantir_campo_link(connection, table_empresas):
-    cursor = connection.cursor()
-    try:
-        cursor.execute("""
-            SELECT COLUMN_NAME 
-            FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = 'link';
-        """, (os.getenv("DB_NAME"), table_empresas))
-        result = cursor.fetchone()
-        if not result:
-            try:
-                cursor.execute(f"ALTER TABLE {table_empresas} ADD COLUMN link VARCHAR(2083);")
-                connection.commit()
-                print(f"[INFO] Coluna 'link' adicionada à tabela '{table_empresas}'.")
-            except mysql.connector.Error as err:
-                print(f"[ERROR] Não foi possível adicionar a coluna 'link': {err}")
-        else:
-            print(f"[INFO] A tabela '{table_empresas}' já possui a coluna 'link'.")
-    finally:
-        cursor.close()
-
 def conectar_selenium():
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")  # Atualizado para headless novo se disponível
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-    )
-
     try:
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_window_size(1920, 1080)
-        return driver
+        return navegador.criar_driver("linkliv")
     except WebDriverException as e:
         print(f"[ERROR] Não foi possível iniciar o WebDriver do Selenium: {e}")
         return None
 
-def obter_empresa_id(nome_empresa, connection, table_empresas):
-    cursor = connection.cursor()
-    try:
-        cursor.execute(f"SELECT id FROM {table_empresas} WHERE nome = %s", (nome_empresa,))
-        empresa = cursor.fetchone()
-        if empresa:
-            return empresa[0]
-        else:
-            print(f"[WARN] Empresa '{nome_empresa}' não encontrada na tabela.")
-            return None
-    finally:
-        cursor.close()
-
-def atualizar_link_no_banco(connection, table_empresas, empresa_id, link_novo):
-    cursor = connection.cursor()
-    try:
-        cursor.execute(f"SELECT link FROM {table_empresas} WHERE id = %s", (empresa_id,))
-        resultado = cursor.fetchone()
-        link_atual = resultado[0] if resultado else None
-
-        if link_atual != link_novo:
-            try:
-                cursor.execute(f"UPDATE {table_empresas} SET link = %s WHERE id = %s", (link_novo, empresa_id))
-                connection.commit()
-                print(f"[INFO] Link atualizado para a empresa ID {empresa_id}: {link_novo}")
-            except mysql.connector.Error as err:
-                print(f"[ERROR] Erro ao atualizar o link para a empresa ID {empresa_id}: {err}")
-        else:
-            print(f"[INFO] Link para a empresa ID {empresa_id} já está atualizado.")
-    finally:
-        cursor.close()
-
 def fechar_notificacoes(driver):
     """
     Tenta fechar quaisquer notificações ou elementos que possam estar interceptando cliques.
@@ -119,166 +57,254 @@ def fechar_notificacoes(driver):
                 fechar_botao = notificacao.find_element(By.CSS_SELECTOR, "button.close")  # Atualize o seletor conforme necessário
                 fechar_botao.click()
                 print("[INFO] Notificação fechada.")
-                time.sleep(1)  # Pausa para garantir que a notificação foi fechada
+                WebDriverWait(driver, 2).until(EC.invisibility_of_element(notificacao))
             except NoSuchElementException:
                 continue
     except Exception as e:
         print(f"[WARN] Não foi possível fechar notificações: {e}")
 
-def processar_cards(driver, connection, table_empresas):
+# Página de parceiros da Livelo (sobrescrita por LIVELO_PARITY_URL, como em liv.py)
+URL_PARCEIROS = coleta_http.url_configurada(
+    "LIVELO_PARITY_URL", "https://www.livelo.com.br/ganhe-pontos-compre-e-pontue"
+)
+
+# Lê, em uma única chamada, nome e destino do botão 'Ir para regras do parceiro' de todos os cards
+SCRIPT_COLETA_CARDS = """
+return Array.from(document.querySelectorAll("div.parity__card")).map(function (card, indice) {
+    var img = card.querySelector("img.parity__card--img");
+    var botao = card.querySelector("a.button__knowmore--link.gtm-link-event");
+    var dados = {};
+    if (botao) {
+        for (var i = 0; i < botao.attributes.length; i++) {
+            var atributo = botao.attributes[i];
+            if (atributo.name.indexOf("data-") === 0) {
+                dados[atributo.name] = atributo.value;
+            }
+        }
+    }
+    return {
+        indice: indice,
+        nome: img ? img.getAttribute("alt") : null,
+        tem_botao: !!botao,
+        href: botao ? botao.getAttribute("href") : null,
+        onclick: botao ? botao.getAttribute("onclick") : null,
+        dados: dados
+    };
+});
+"""
+
+def coletar_cards(driver):
+    """
+    Retorna, com um único execute_script, os dados de todos os cards da página.
+    """
+    return driver.execute_script(SCRIPT_COLETA_CARDS) or []
+
+def resolver_link_estatico(card, url_base):
+    """
+    Tenta determinar o destino do card sem clicar: href do botão, atributos
+    data-* com cara de URL ou 'location.href' no onclick.
+
+    Returns:
+        str ou None: URL absoluta, ou None se for preciso clicar.
+    """
+    candidatos = [card.get("href")]
+    candidatos += [valor for valor in (card.get("dados") or {}).values()]
+    match = re.search(r"location(?:\.href)?\s*=\s*['\"](.*?)['\"]", card.get("onclick") or "")
+    if match:
+        candidatos.append(match.group(1))
+
+    for candidato in candidatos:
+        candidato = (candidato or "").strip()
+        if not candidato or candidato.startswith(("#", "javascript:")):
+            continue
+        if candidato.startswith(("http://", "https://", "/")):
+            return urljoin(url_base, candidato)
+    return None
+
+def resolver_link_por_clique(driver, indice, nome_empresa, url_principal):
+    """
+    Resolve o destino de um card clicando no botão 'Ir para regras do parceiro'
+    e voltando para a página principal. Usado apenas para os cards cujo destino
+    não pôde ser lido do DOM.
+
+    Returns:
+        str ou None: URL obtida após a navegação.
+    """
+    # Re-encontrar os cards para evitar StaleElementReferenceException
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.parity__card"))
+    )
+    card = driver.find_elements(By.CSS_SELECTOR, "div.parity__card")[indice]
+
+    # Fechar notificações que possam estar interferindo
+    fechar_notificacoes(driver)
+
     try:
-        cards = driver.find_elements(By.CSS_SELECTOR, "div.parity__card")
-        num_cards = len(cards)
-        print(f"[INFO] Total de cards a serem processados: {num_cards}")
+        botao_know_more = card.find_element(By.CSS_SELECTOR, "a.button__knowmore--link.gtm-link-event")
+    except NoSuchElementException:
+        print(f"[WARN] Botão 'Ir para regras do parceiro' não encontrado para a empresa '{nome_empresa}'.")
+        return None
 
-        for i in range(num_cards):
-            try:
-                # Re-encontrar os cards para evitar StaleElementReferenceException
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.parity__card"))
-                )
-                cards = driver.find_elements(By.CSS_SELECTOR, "div.parity__card")
-                card = cards[i]
-
-                # Extrair o nome da empresa
-                try:
-                    img_tag = card.find_element(By.CSS_SELECTOR, "img.parity__card--img")
-                    nome_empresa = img_tag.get_attribute("alt")
-                    print(f"[INFO] Processando empresa: {nome_empresa}")
-                except NoSuchElementException:
-                    print("[WARN] Nome da empresa não encontrado no card.")
-                    continue
-
-                # Fechar notificações que possam estar interferindo
-                fechar_notificacoes(driver)
-
-                # Encontrar o botão 'Ir para regras do parceiro'
-                try:
-                    botao_know_more = card.find_element(By.CSS_SELECTOR, "a.button__knowmore--link.gtm-link-event")
-                except NoSuchElementException:
-                    print("[WARN] Botão 'Ir para regras do parceiro' não encontrado.")
-                    continue
-
-                # Scroll até o botão para garantir que está visível
-                driver.execute_script("arguments[0].scrollIntoView(true);", botao_know_more)
-                time.sleep(1)  # Pausa para garantir o scroll
-
-                # Esperar que o botão esteja clicável
-                try:
-                    WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a.button__knowmore--link.gtm-link-event")))
-                except TimeoutException:
-                    print(f"[WARN] Botão 'Ir para regras do parceiro' não está clicável para a empresa '{nome_empresa}'.")
-                    continue
-
-                # Simular o clique no botão
-                try:
-                    botao_know_more.click()
-                    print(f"[INFO] Clicado no botão 'Ir para regras do parceiro' para a empresa '{nome_empresa}'.")
-                except (ElementClickInterceptedException, StaleElementReferenceException) as e:
-                    print(f"[ERROR] Não foi possível clicar no botão para a empresa '{nome_empresa}': {e}")
-                    # Tentar clicar via JavaScript como fallback
-                    try:
-                        driver.execute_script("arguments[0].click();", botao_know_more)
-                        print(f"[INFO] Clicado no botão via JavaScript para a empresa '{nome_empresa}'.")
-                    except Exception as js_e:
-                        print(f"[ERROR] Falha ao clicar no botão via JavaScript para a empresa '{nome_empresa}': {js_e}")
-                        continue
-
-                # Esperar a nova página carregar
-                try:
-                    WebDriverWait(driver, 20).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "body"))
-                    )
-                    url_atual = driver.current_url
-                    print(f"[INFO] URL obtida: {url_atual}")
-                except TimeoutException:
-                    print("[ERROR] Timeout ao esperar a nova página carregar.")
-                    continue
-
-                # Atualizar o banco de dados
-                empresa_id = obter_empresa_id(nome_empresa, connection, table_empresas)
-                if empresa_id:
-                    atualizar_link_no_banco(connection, table_empresas, empresa_id, url_atual)
-
-                # Navegar de volta para a página principal
-                driver.back()
-                print(f"[INFO] Retornando para a página principal.")
-
-                # Esperar a página principal carregar novamente
-                try:
-                    WebDriverWait(driver, 20).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.parity__card"))
-                    )
-                    print("[INFO] Página principal recarregada com sucesso.")
-                except TimeoutException:
-                    print("[ERROR] Timeout ao esperar a página principal recarregar.")
-                    break
-
-                # Pausa para evitar sobrecarga e garantir que a página esteja estável
-                time.sleep(2)
-
-            except IndexError:
-                print(f"[ERROR] Índice {i} fora do intervalo. Número de cards pode ter mudado.")
-                break
-            except Exception as e:
-                print(f"[ERROR] Ocorreu um erro inesperado: {e}")
+    # Scroll até o botão para garantir que está visível
+    driver.execute_script("arguments[0].scrollIntoView({behavior: 'instant', block: 'center'});", botao_know_more)
+
+    # Simular o clique no botão (com JavaScript como fallback)
+    try:
+        botao_know_more.click()
+    except (ElementClickInterceptedException, StaleElementReferenceException) as e:
+        print(f"[WARN] Clique interceptado para a empresa '{nome_empresa}', tentando via JavaScript: {e}")
+        try:
+            driver.execute_script("arguments[0].click();", botao_know_more)
+        except Exception as js_e:
+            print(f"[ERROR] Falha ao clicar no botão via JavaScript para a empresa '{nome_empresa}': {js_e}")
+            return None
+
+    # Esperar a navegação para a página do parceiro
+    try:
+        WebDriverWait(driver, 20).until(EC.url_changes(url_principal))
+        url_atual = driver.current_url
+        print(f"[INFO] URL obtida após clique para a empresa '{nome_empresa}': {url_atual}")
+    except TimeoutException:
+        print(f"[ERROR] Timeout ao esperar a navegação para a empresa '{nome_empresa}'.")
+        return None
+
+    # Navegar de volta e esperar a página principal carregar novamente
+    driver.back()
+    WebDriverWait(driver, 20).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "div.parity__card"))
+    )
+    espera.aguardar_estabilidade(driver, "div.parity__card", nome="linkliv.retorno")
+    return url_atual
+
+def abrir_pagina_principal(driver):
+    """
+    Abre a página de parceiros, aceita os cookies e espera os cards carregarem.
+
+    Returns:
+        bool: True se os cards foram encontrados.
+    """
+    print("[INFO] Abrindo página principal...")
+    navegador.abrir(driver, URL_PARCEIROS, "linkliv")
+
+    # Tenta clicar no botão de cookies
+    try:
+        WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
+        ).click()
+        print("[INFO] Cookies aceitos.")
+    except TimeoutException:
+        print("[INFO] Nenhum pop-up de cookies encontrado.")
+
+    # Esperar os cards carregarem
+    try:
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div.parity__card"))
+        )
+        print("[INFO] Cards encontrados na página principal.")
+        espera.aguardar_estabilidade(driver, "div.parity__card", nome="linkliv.cards")
+        return True
+    except TimeoutException:
+        print("[ERROR] Timeout ao esperar os cards na página principal.")
+        return False
+
+def processar_cards(driver, connection, table_empresas):
+    """
+    Coleta os links de todos os cards com uma única leitura do DOM e só clica
+    nos cards cujo destino não pode ser determinado estaticamente. Apenas os
+    parceiros selecionados por politica_links (novos, vencidos ou com falha)
+    são processados.
+    """
+    try:
+        url_principal = driver.current_url
+        cards = coletar_cards(driver)
+        print(f"[INFO] Total de cards encontrados: {len(cards)}")
+
+        # Só entram na rodada parceiros novos, com link vencido ou que falharam
+        estado = politica_links.carregar_estado_links(connection, table_empresas)
+        trabalho = politica_links.selecionar_trabalho(estado, [card.get("nome") for card in cards if card.get("nome")])
+
+        links = {}
+        pendentes = []
+        for card in cards:
+            nome_empresa = card.get("nome")
+            if not nome_empresa:
+                print("[WARN] Nome da empresa não encontrado no card.")
+                continue
+            if nome_empresa not in trabalho:
+                continue
+            if not card.get("tem_botao"):
+                print(f"[WARN] Botão 'Ir para regras do parceiro' não encontrado para a empresa '{nome_empresa}'.")
                 continue
 
+            link = resolver_link_estatico(card, url_principal)
+            if link:
+                links[nome_empresa] = link
+            else:
+                pendentes.append(card)
+
+        print(f"[INFO] {len(links)} links lidos diretamente do DOM; {len(pendentes)} exigem clique.")
+
+        # Cards que exigem clique são distribuídos entre os navegadores do pool
+        # (LINK_WORKERS); o navegador atual é reaproveitado como primeiro worker
+        resultados = pool_navegadores.resolver_em_paralelo(
+            pendentes,
+            criar_driver=conectar_selenium,
+            encerrar_driver=navegador.encerrar_driver,
+            preparar_pagina=abrir_pagina_principal,
+            resolver=lambda driver_worker, card: resolver_link_por_clique(
+                driver_worker, card["indice"], card["nome"], driver_worker.current_url
+            ),
+            drivers_existentes=[driver],
+        )
+        for card, link in resultados:
+            if link:
+                links[card["nome"]] = link
+
+        # Atualizar o banco de dados (links resolvidos e falhas)
+        falhas = [nome_empresa for nome_empresa in trabalho if nome_empresa not in links]
+        politica_links.registrar_resultados(connection, table_empresas, estado, links, falhas)
+
     except Exception as e:
         print(f"[ERROR] Erro durante o processamento dos cards: {e}")
 
-def main():
-    # Conectar ao banco de dados
-    connection = conectar_banco()
-    if not connection:
-        return
-
+def executar(connection):
+    """
+    Executa o bot com uma conexão já aberta (usado por main e pelo orquestrador milog.py).
+    """
     # Obter o nome da tabela de empresas
     table_empresas = get_env_var("TABLE_EMPRESAS_LIV")
+    table_pontuacao = get_env_var("TABLE_PONTUACAO_LIV")
 
-    # Garantir que a tabela possui o campo 'link'
-    garantir_campo_link(connection, table_empresas)
+    # Garantir que a tabela possui o campo 'link' (aplicado uma única vez via migrações)
+    migracoes.aplicar_migracoes(connection, table_empresas, table_pontuacao)
 
     # Configurar o Selenium
     driver = conectar_selenium()
     if not driver:
-        connection.close()
         return
 
-    url = "https://www.livelo.com.br/ganhe-pontos-compre-e-pontue"
-
     try:
-        print("[INFO] Abrindo página principal...")
-        driver.get(url)
-
-        # Tenta clicar no botão de cookies
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-            ).click()
-            print("[INFO] Cookies aceitos.")
-        except TimeoutException:
-            print("[INFO] Nenhum pop-up de cookies encontrado.")
-
-        # Esperar os cards carregarem
-        try:
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div.parity__card"))
-            )
-            print("[INFO] Cards encontrados na página principal.")
-        except TimeoutException:
-            print("[ERROR] Timeout ao esperar os cards na página principal.")
-            driver.quit()
-            connection.close()
+        if not abrir_pagina_principal(driver):
             return
 
         # Processar os cards para obter e salvar os links
         processar_cards(driver, connection, table_empresas)
 
     finally:
-        # Fechar o navegador e a conexão com o banco
-        driver.quit()
+        # Fechar o navegador
+        navegador.encerrar_driver(driver)
+
+def main():
+    # Conectar ao banco de dados
+    connection = conectar_banco()
+    if not connection:
+        return
+
+    try:
+        executar(connection)
+    finally:
         connection.close()
+        metricas.imprimir_resumo()
         print("[INFO] Bot finalizado com sucesso.")
 
 if __name__ == "__main__":
@@ -1,15 +1,39 @@
 import os  # ✅ Importação corrigida
 import mysql.connector
+import banco
 import re
 import time
 from datetime import datetime
 from collections import Counter
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+import migracoes
+import rotulos
+import historico
+import analise_html
+import coleta_http
+import espera
+import extracao
+import metricas
+import navegador
+import regras_pontuacao
+import impressoes
+
+# Versão de interpretar(): incremente ao mudar como os cards viram parceiros,
+# para descartar o cache de cards da coleta anterior
+VERSAO_INTERPRETACAO = 1
+
+# Quantidade máxima de linhas por INSERT multi-linha
+TAMANHO_LOTE_INSERCAO = 500
+
+# Colunas gravadas em cada linha de pontuação, na ordem do INSERT
+COLUNAS_PONTUACAO = (
+    "data_hora_coleta", "moeda", "pontuacao", "pontuacao_clube_livelo", "empresa_id", "descricao_text", "visto_ate"
+)
+
+# Colunas que, no modo "gravar só mudanças", definem se a coleta gera linha nova
+COLUNAS_MUDANCA = ("moeda", "pontuacao", "pontuacao_clube_livelo", "descricao_text")
 
 
 def get_env_var(var_name: str) -> str:
@@ -28,12 +52,7 @@ def conectar_banco():
     Conecta ao banco de dados MySQL e retorna o objeto de conexão.
     """
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),        # Host do banco de dados
-            database=os.getenv("DB_NAME"),    # Nome do banco de dados
-            user=os.getenv("DB_USER"),        # Usuário do banco de dados
-            password=os.getenv("DB_PASSWORD") # Senha do banco de dados
-        )
+        connection = banco.conectar()  # Com novas tentativas em falhas transitórias
         if connection.is_connected():
             print("[INFO] Conectado ao banco de dados.")
             return connection
@@ -51,6 +70,11 @@ def criar_tabelas(connection):
     table_pontuacao = get_env_var("TABLE_PONTUACAO_LIV")
 
     try:
+        # Esquema já na versão atual: nenhuma verificação adicional
+        if migracoes.esquema_atualizado(connection, table_empresas):
+            print(f"[INFO] Esquema de '{table_empresas}' já está na versão {migracoes.VERSAO_ATUAL}.")
+            return
+
         cursor = connection.cursor()
 
         # Criação da tabela para as empresas
@@ -79,36 +103,76 @@ def criar_tabelas(connection):
         """
         cursor.execute(create_pontuacao_table_query)
         connection.commit()
+
+        # Índices, tabela de agregados e demais alterações versionadas
+        migracoes.aplicar_migracoes(connection, table_empresas, table_pontuacao)
         print(f"[INFO] Tabelas '{table_empresas}' e '{table_pontuacao}' criadas ou já existentes.")
     except mysql.connector.Error as err:
         print(f"[ERROR] Não foi possível criar as tabelas: {err}")
 
 
-def obter_empresa_id(nome_empresa, logo, connection):
+def resolver_empresas(empresas, connection):
     """
-    Verifica se a empresa já está cadastrada. Se sim, atualiza o logo,
-    caso contrário, insere a empresa e retorna o novo ID.
+    Resolve em lote os IDs das empresas de todos os cards coletados.
+    Carrega o mapa nome -> (id, logo) com uma única consulta e grava as
+    empresas novas e os logos alterados em um único upsert multi-linha,
+    dentro de uma única transação.
+
+    Args:
+        empresas (list of tuple): Pares (nome, logo), um por card.
+        connection: Objeto de conexão MySQL.
+
+    Returns:
+        list of int: IDs das empresas, na mesma ordem dos cards.
     """
     table_empresas = get_env_var("TABLE_EMPRESAS_LIV")
 
     cursor = connection.cursor()
-    cursor.execute(f"SELECT id, logo FROM {table_empresas} WHERE nome = %s", (nome_empresa,))
-    empresa = cursor.fetchone()
-
-    if empresa:
-        # Empresa já existe, vamos atualizar o logo se for diferente
-        empresa_id, current_logo = empresa
-        if current_logo != logo:
-            cursor.execute(f"UPDATE {table_empresas} SET logo = %s WHERE id = %s", (logo, empresa_id))
+    cursor.execute(f"SELECT nome, id, logo FROM {table_empresas}")
+    existentes = {nome: (empresa_id, logo) for nome, empresa_id, logo in cursor.fetchall()}
+
+    # Se o mesmo nome aparecer em mais de um card, prevalece o último logo
+    logos = {}
+    for nome_empresa, logo in empresas:
+        logos[nome_empresa] = logo
+
+    pendentes = [
+        (nome_empresa, logo) for nome_empresa, logo in logos.items()
+        if nome_empresa not in existentes or existentes[nome_empresa][1] != logo
+    ]
+    ids = {nome_empresa: dados[0] for nome_empresa, dados in existentes.items()}
+
+    if pendentes:
+        try:
+            cursor.executemany(f"""
+                INSERT INTO {table_empresas} (nome, logo) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE logo = VALUES(logo)
+            """, pendentes)
+
+            novas = [nome_empresa for nome_empresa, _ in pendentes if nome_empresa not in existentes]
+            if novas:
+                marcadores = ", ".join(["%s"] * len(novas))
+                cursor.execute(
+                    f"SELECT nome, id FROM {table_empresas} WHERE nome IN ({marcadores})", novas
+                )
+                ids.update({nome_empresa: empresa_id for nome_empresa, empresa_id in cursor.fetchall()})
+
+                # A collation do MySQL pode casar nomes que diferem só em caixa/acento
+                for nome_empresa in novas:
+                    if nome_empresa not in ids:
+                        cursor.execute(f"SELECT id FROM {table_empresas} WHERE nome = %s", (nome_empresa,))
+                        ids[nome_empresa] = cursor.fetchone()[0]
+
             connection.commit()
-            print(f"[INFO] Logo atualizado para a empresa '{nome_empresa}'.")
-        return empresa_id
-    else:
-        # Inserir nova empresa
-        cursor.execute(f"INSERT INTO {table_empresas} (nome, logo) VALUES (%s, %s)", (nome_empresa, logo))
-        connection.commit()
-        print(f"[INFO] Empresa '{nome_empresa}' inserida com sucesso.")
-        return cursor.lastrowid
+        except mysql.connector.Error:
+            connection.rollback()
+            raise
+
+        atualizadas = len(pendentes) - len(novas)
+        print(f"[INFO] Empresas resolvidas em lote: {len(novas)} inseridas, {atualizadas} logos atualizados.")
+
+    return [ids[nome_empresa] for nome_empresa, _ in empresas]
+
 
 
 def parse_descricao(descricao: str):
@@ -118,62 +182,153 @@ def parse_descricao(descricao: str):
       - Valor base do dinheiro (p.ex.: 1, 2, etc.)
       - Pontuação 'normal' (pontuacao)
       - Pontuação 'clube' (pontuacao_clube)
-    """
-    moeda = ""
-    base_money = 1.0
-    pontuacao = "x"
-    pontuacao_clube = "x"
 
-    match_moeda = re.search(r"(R\$|U\$)\s*(\d+(?:,\d+)?)", descricao)
-    if match_moeda:
-        moeda = match_moeda.group(1)
-        base_money_str = match_moeda.group(2).replace(",", ".")
-        base_money = float(base_money_str)
-
-    match_clube = re.search(r"(?:até|=)\s*(\d+(?:,\d+)?)(?=.*no Clube Livelo)", descricao, re.IGNORECASE)
-    if match_clube:
-        valor_str = match_clube.group(1).replace(",", ".")
-        valor_num = float(valor_str)
-        ratio = valor_num / base_money
-        pontuacao_clube = round(ratio, 3)
+    As regras ficam em regras_pontuacao (compartilhadas com a Esfera), com
+    cache por texto da descrição.
+    """
+    return regras_pontuacao.pontuacao_livelo(descricao)
+
+
+# Devolve, em uma única chamada, só os campos brutos de cada card (null = elemento ausente).
+# Sem a div do grid, devolve null para o chamador recorrer ao HTML.
+SCRIPT_EXTRACAO_CARDS = extracao.FUNCOES_JS + """
+var grid = document.querySelector("div#div-cardsParity");
+if (!grid) { return null; }
+return Array.from(grid.querySelectorAll("div.parity__card")).map(function (card) {
+    var img = card.querySelector("img.parity__card--img");
+    return {
+        nome: atributo(img, "alt"),
+        logo: atributo(img, "src"),
+        descricao: texto(card.querySelector("div.info__value"), " "),
+        clube: texto(card.querySelector("div.info__club"), " ")
+    };
+});
+"""
+
+# Só a div do grid é analisada; o resto da página é descartado
+CONTAINER_CARDS = analise_html.container("div", id="div-cardsParity")
+SELETOR_GRID = analise_html.seletor("div#div-cardsParity")
+SELETOR_CARD = analise_html.seletor("div.parity__card")
+SELETOR_LOGO = analise_html.seletor("img.parity__card--img")
+SELETOR_VALOR = analise_html.seletor("div.info__value")
+SELETOR_CLUBE = analise_html.seletor("div.info__club")
+
+def cards_do_html(html, parser=None, restringir=True):
+    """
+    Extrai do HTML da página os mesmos campos brutos de SCRIPT_EXTRACAO_CARDS.
+    Caminho de fallback (e de conferência) da extração no navegador.
 
-    match_normal = re.search(r"(?:até|=)\s*(\d+(?:,\d+)?)(?=.*Pontos?\s+Livelo)(?!.*no Clube)", 
-                             descricao, re.IGNORECASE)
-    if match_normal:
-        valor_str = match_normal.group(1).replace(",", ".")
-        valor_num = float(valor_str)
-        ratio = valor_num / base_money
-        pontuacao = round(ratio, 3)
+    Args:
+        parser (str, opcional): Parser do BeautifulSoup (padrão: lxml, se instalado).
+        restringir (bool): Analisa só a div do grid em vez do documento inteiro.
 
-    return moeda, pontuacao, pontuacao_clube
+    Returns:
+        list ou None: Cards; None se a div do grid não existir.
+    """
+    soup = analise_html.criar_soup(html, CONTAINER_CARDS if restringir else None, parser)
+    div_cards = SELETOR_GRID.select_one(soup)
+    if not div_cards:
+        return None
 
+    cards = []
+    for card in SELETOR_CARD.select(div_cards):
+        img_tag = SELETOR_LOGO.select_one(card)
+        info_value = SELETOR_VALOR.select_one(card)
+        clube_livelo = SELETOR_CLUBE.select_one(card)
+        cards.append({
+            "nome": img_tag.get("alt") if img_tag else None,
+            "logo": img_tag.get("src") if img_tag else None,
+            "descricao": info_value.get_text(" ", strip=True) if info_value else None,
+            "clube": clube_livelo.get_text(" ", strip=True) if clube_livelo else None,
+        })
+    return cards
+
+# Página de paridades (sobrescrita por LIVELO_PARITY_URL, ex.: servidor local de testes)
+URL_PARCEIROS = coleta_http.url_configurada(
+    "LIVELO_PARITY_URL", "https://www.livelo.com.br/ganhe-pontos-compre-e-pontue"
+)
+
+# Chaves aceitas para cada campo quando os cards vêm em JSON (embutido na
+# página ou do endpoint em LIVELO_PARITY_API_URL)
+CHAVES_JSON_CARD = {
+    "nome": ("partnerName", "nome", "name"),
+    "logo": ("partnerImage", "imageUrl", "logo", "image", "image.url"),
+    "descricao": ("parityText", "parity", "description", "descricao"),
+    "clube": ("clubParityText", "clubParity", "clubDescription"),
+}
+
+def registro_parece_card(registro):
+    """
+    Reconhece um card de paridade em JSON: tem nome e um texto de pontuação
+    (com número e 'ponto'), como o exibido em div.info__value.
+    """
+    descricao = coleta_http.primeiro_campo(registro, CHAVES_JSON_CARD["descricao"])
+    return (
+        coleta_http.primeiro_campo(registro, CHAVES_JSON_CARD["nome"]) is not None
+        and isinstance(descricao, str)
+        and "ponto" in descricao.lower()
+        and re.search(r"\d", descricao) is not None
+    )
 
-def extrair_parceiros(connection):
+def cards_de_json(objeto):
     """
-    Acessa a página da Livelo, coleta as informações dos cards de parceiros
-    e retorna uma lista de dicionários com:
-      - nome
-      - moeda
-      - descricao_text
-      - pontuacao
-      - pontuacao_clube_livelo
+    Converte a maior lista de cards encontrada no JSON para os mesmos campos
+    brutos de SCRIPT_EXTRACAO_CARDS.
+    """
+    cards = []
+    for registro in coleta_http.procurar_registros(objeto, registro_parece_card):
+        card = {}
+        for campo, chaves in CHAVES_JSON_CARD.items():
+            valor = coleta_http.primeiro_campo(registro, chaves)
+            card[campo] = " ".join(str(valor).split()) if valor is not None else None
+        cards.append(card)
+    return cards
+
+def cards_via_http(minimo=0):
     """
-    url = "https://www.livelo.com.br/ganhe-pontos-compre-e-pontue"
+    Coleta os cards sem navegador: HTML renderizado no servidor, JSON embutido
+    na página e, se configurado, o endpoint em LIVELO_PARITY_API_URL. Usa o
+    primeiro resultado completo (ao menos 'minimo' cards, todos com nome e
+    descrição).
 
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-    )
+    Returns:
+        list ou None: Cards; None se nenhuma fonte trouxe dados completos.
+    """
+    candidatos = []
+    resposta = coleta_http.obter(URL_PARCEIROS, "liv")
+    if resposta is not None:
+        inicio = time.perf_counter()
+        candidatos.append(("HTML", cards_do_html(resposta.text)))
+        candidatos += [("JSON embutido", cards_de_json(bloco)) for bloco in coleta_http.jsons_embutidos(resposta.text)]
+        metricas.registrar("extracao.liv.http", time.perf_counter() - inicio)
+
+    url_api = os.getenv("LIVELO_PARITY_API_URL")
+    if url_api:
+        resposta_api = coleta_http.obter(url_api, "liv.api")
+        if resposta_api is not None:
+            try:
+                candidatos.append(("API", cards_de_json(resposta_api.json())))
+            except ValueError:
+                print("[WARN] Resposta de LIVELO_PARITY_API_URL não é JSON.")
+
+    for origem, cards in candidatos:
+        if coleta_http.cards_completos(cards, ("nome", "descricao"), minimo):
+            print(f"[INFO] {len(cards)} cards obtidos via HTTP ({origem}), sem abrir o navegador.")
+            return cards
+    print("[INFO] Coleta via HTTP sem dados completos; usando o navegador.")
+    return None
+
+def cards_via_selenium():
+    """
+    Abre a página no Chrome e extrai os campos brutos dos cards.
 
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.set_window_size(1920, 1080)
+    Returns:
+        list ou None: Cards; None se a página não carregou ou não há o grid de cards.
+    """
+    driver = navegador.criar_driver("liv")
 
     print("[INFO] Abrindo página...")
-    driver.get(url)
+    navegador.abrir(driver, URL_PARCEIROS, "liv")
 
     # Tenta clicar no botão de cookies
     try:
@@ -192,38 +347,74 @@ def extrair_parceiros(connection):
         print("[INFO] Cards encontrados.")
     except:
         print("[ERROR] Timeout ao esperar os cards.")
-        driver.quit()
-        return []
+        navegador.encerrar_driver(driver)
+        return None
 
-    time.sleep(2)  # Pausa para garantir o carregamento
-    html = driver.page_source
-    driver.quit()
+    espera.aguardar_estabilidade(driver, "div.parity__card", nome="liv.cards")
+    cards = extracao.coletar_cards(driver, SCRIPT_EXTRACAO_CARDS, cards_do_html, "liv")
+    navegador.encerrar_driver(driver)
+    return cards
 
-    soup = BeautifulSoup(html, "html.parser")
-    div_cards = soup.find("div", id="div-cardsParity")
-    if not div_cards:
+def minimo_cards(connection):
+    """
+    Quantidade mínima de cards para aceitar a coleta via HTTP: menos cards que
+    a coleta anterior indica uma resposta parcial.
+    """
+    if not coleta_http.http_ativo():
+        return 0
+    anterior = historico.quantidade_ultima_coleta(connection, get_env_var("TABLE_PONTUACAO_LIV"))
+    return int(anterior * coleta_http.FRACAO_MINIMA)
+
+def coletar(minimo=0):
+    """
+    Etapa de coleta: obtém os campos brutos dos cards via HTTP, com o Selenium
+    como alternativa. Não acessa o banco.
+
+    Returns:
+        list ou None: Cards; None se a div dos cards não foi encontrada.
+    """
+    cards = None
+    if coleta_http.http_ativo():
+        cards = cards_via_http(minimo=minimo)
+    if cards is None:
+        cards = cards_via_selenium()
+    return cards
+
+def interpretar(cards, usar_cache=True):
+    """
+    Etapa de interpretação: converte os cards brutos em parceiros com:
+      - nome
+      - logo
+      - moeda
+      - pontuacao
+      - pontuacao_clube_livelo
+      - descricao_text
+    """
+    if cards is None:
         print("[ERROR] Não foi possível encontrar a div com os cards.")
         return []
 
-    cards = div_cards.find_all("div", class_="parity__card")
     print(f"[INFO] Total de cards encontrados: {len(cards)}")
 
+    # Cards idênticos aos da coleta anterior reaproveitam o parceiro já
+    # interpretado e resolvido (com empresa_id)
+    # (usar_cache=False: reprocessamento do arquivo de páginas, fora da coleta)
+    anteriores = impressoes.carregar("liv", chave_cache()) if usar_cache else {}
+    reaproveitados = 0
+
     parceiros = []
+    novos = []
     for card in cards:
-        img_tag = card.find("img", class_="parity__card--img")
-        nome = img_tag.get("alt", "Nome não encontrado") if img_tag else "Nome não encontrado"
-        
-        # Logo
-        logo_relativo = img_tag.get("src", "") if img_tag else ""
-        logo_completo = f"{logo_relativo}" if logo_relativo else ""
-
-        descricao_principal = ""
-        info_value = card.find("div", class_="info__value")
-        if info_value:
-            descricao_principal = info_value.get_text(" ", strip=True)
+        impressao = impressoes.impressao(card)
+        if impressao in anteriores:
+            parceiros.append(dict(anteriores[impressao]))
+            reaproveitados += 1
+            continue
 
-        clube_livelo = card.find("div", class_="info__club")
-        texto_clube_livelo = clube_livelo.get_text(" ", strip=True) if clube_livelo else ""
+        nome = card["nome"] if card["nome"] is not None else "Nome não encontrado"
+        logo_completo = card["logo"] or ""
+        descricao_principal = card["descricao"] or ""
+        texto_clube_livelo = card["clube"] or ""
 
         # Ajusta descrição completa para parse_descricao
         if texto_clube_livelo:
@@ -232,19 +423,81 @@ def extrair_parceiros(connection):
         else:
             descricao_completa = descricao_principal
 
-        moeda, pontuacao, pontuacao_clube = parse_descricao(descricao_completa)
+        parceiro = {
+            "nome": nome,
+            "logo": logo_completo,
+            "descricao_text": descricao_completa,
+            "impressao": impressao
+        }
+        parceiros.append(parceiro)
+        novos.append(parceiro)
+
+    # Faz o parse de todas as descrições novas de uma vez
+    pontuacoes = regras_pontuacao.pontuacoes_livelo([parceiro["descricao_text"] for parceiro in novos])
+    for parceiro, (moeda, pontuacao, pontuacao_clube) in zip(novos, pontuacoes):
+        parceiro["moeda"] = moeda
+        parceiro["pontuacao"] = pontuacao
+        parceiro["pontuacao_clube_livelo"] = pontuacao_clube
+
+    if reaproveitados:
+        print(f"[INFO] {reaproveitados} cards inalterados desde a última coleta reaproveitados do cache.")
+    return parceiros
 
-        empresa_id = obter_empresa_id(nome, logo_completo, connection)
+def valores_derivados(parceiro):
+    """
+    Colunas da linha de pontuação que vêm da interpretação da página (as que o
+    reprocessamento do arquivo de páginas reescreve).
+    """
+    return {
+        "moeda": parceiro["moeda"],
+        "pontuacao": parceiro["pontuacao"],
+        "pontuacao_clube_livelo": parceiro["pontuacao_clube_livelo"],
+        "descricao_text": parceiro["descricao_text"],
+    }
+
+def chave_cache():
+    """
+    Chave do cache de cards: banco, tabela de empresas e versão das regras.
+    """
+    versao = f"{regras_pontuacao.VERSAO_REGRAS}.{VERSAO_INTERPRETACAO}"
+    return impressoes.identidade(get_env_var("TABLE_EMPRESAS_LIV"), versao)
+
+def resolver_parceiros(parceiros, connection):
+    """
+    Preenche o empresa_id dos parceiros que ainda não o têm (os reaproveitados
+    do cache já vêm resolvidos), resolvendo todas as empresas de uma vez em vez
+    de uma ida ao banco por card.
+    """
+    pendentes = [parceiro for parceiro in parceiros if "empresa_id" not in parceiro]
+    if pendentes:
+        empresa_ids = resolver_empresas([(parceiro["nome"], parceiro["logo"]) for parceiro in pendentes], connection)
+        for parceiro, empresa_id in zip(pendentes, empresa_ids):
+            parceiro["empresa_id"] = empresa_id
+    return parceiros
 
-        parceiros.append({
-            "empresa_id": empresa_id,
-            "moeda": moeda,
-            "pontuacao": pontuacao,
-            "pontuacao_clube_livelo": pontuacao_clube,
-            "descricao_text": descricao_completa
+def gravar(parceiros, connection, data_hora_coleta=None):
+    """
+    Etapa de gravação: resolve as empresas e grava a pontuação e as labels.
+    Depois de gravados, os parceiros passam a ser o cache da próxima coleta.
+    """
+    if parceiros and salvar_relatorio_mysql(resolver_parceiros(parceiros, connection), connection, data_hora_coleta):
+        impressoes.salvar("liv", chave_cache(), {
+            parceiro["impressao"]: parceiro for parceiro in parceiros if "impressao" in parceiro
         })
 
-    return parceiros
+def extrair_parceiros(connection):
+    """
+    Coleta as informações dos cards de parceiros da Livelo (via HTTP, com o
+    Selenium como alternativa) e retorna uma lista de dicionários com:
+      - nome
+      - moeda
+      - descricao_text
+      - pontuacao
+      - pontuacao_clube_livelo
+      - empresa_id
+    """
+    parceiros = interpretar(coletar(minimo_cards(connection)))
+    return resolver_parceiros(parceiros, connection) if parceiros else []
 
 
 def calcular_moda(pontuacoes):
@@ -306,15 +559,23 @@ def calcular_label_pontuacao(pontuacoes):
         return "Má Pontuação"
 
 
-def salvar_relatorio_mysql(parceiros, connection):
+def salvar_relatorio_mysql(parceiros, connection, data_hora_coleta=None):
     """
     Insere os dados de pontuação no banco de dados MySQL.
     Relaciona com a empresa e inclui a descrição.
     Atualiza a label_pontuacao na tabela de empresas.
 
+    Todas as linhas da execução recebem o mesmo data_hora_coleta e são
+    enviadas como INSERT multi-linha em lotes de TAMANHO_LOTE_INSERCAO,
+    com um único commit ao final.
+
     Args:
         parceiros (list of dict): Lista de parceiros com suas pontuações.
         connection: Objeto de conexão MySQL.
+        data_hora_coleta (str, opcional): Carimbo da coleta; se omitido, usa o horário atual.
+
+    Returns:
+        bool: True se os dados foram gravados.
     """
     if not parceiros:
         print("[WARN] Lista de parceiros vazia; não há o que salvar.")
@@ -327,61 +588,80 @@ def salvar_relatorio_mysql(parceiros, connection):
     try:
         cursor = connection.cursor()
         insert_query = f"""
-            INSERT INTO {table_pontuacao} (
-                data_hora_coleta, moeda, pontuacao, pontuacao_clube_livelo, empresa_id, descricao_text
-            ) VALUES (%s, %s, %s, %s, %s, %s)
+            INSERT INTO {table_pontuacao} ({", ".join(COLUNAS_PONTUACAO)})
+            VALUES ({", ".join(["%s"] * len(COLUNAS_PONTUACAO))})
         """
 
-        for parceiro in parceiros:
+        inicio = time.perf_counter()
+        if data_hora_coleta is None:
             data_hora_coleta = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute(insert_query, (
+
+        linhas = [
+            (
                 data_hora_coleta,
                 parceiro["moeda"],
                 parceiro["pontuacao"],
                 parceiro["pontuacao_clube_livelo"],
                 parceiro["empresa_id"],
-                parceiro["descricao_text"]
-            ))
+                parceiro["descricao_text"],
+                data_hora_coleta
+            )
+            for parceiro in parceiros
+        ]
+
+        # Toda coleta entra nos agregados, mesmo as que não geram linha nova
+        posicao_empresa = COLUNAS_PONTUACAO.index("empresa_id")
+        posicao_pontuacao = COLUNAS_PONTUACAO.index("pontuacao")
+        observacoes = [(linha[posicao_empresa], linha[posicao_pontuacao]) for linha in linhas]
+
+        vistas = []
+        if historico.gravar_so_mudancas():
+            linhas, vistas = historico.separar_inalteradas(
+                connection, table_pontuacao, COLUNAS_PONTUACAO, linhas, COLUNAS_MUDANCA
+            )
+            historico.marcar_vistas(connection, table_pontuacao, vistas, data_hora_coleta)
+        historico.registrar_coleta(
+            connection, table_pontuacao, data_hora_coleta, len({empresa_id for empresa_id, _ in observacoes})
+        )
 
-        connection.commit()
-        print("[INFO] Dados inseridos no banco de dados com sucesso.")
-
-        # Após inserir, atualizar a label_pontuacao para cada parceiro
-        for parceiro in parceiros:
-            empresa_id = parceiro["empresa_id"]
-
-            # Recuperar todas as pontuações do parceiro
-            cursor.execute(f"""
-                SELECT pontuacao FROM {table_pontuacao}
-                WHERE empresa_id = %s ORDER BY data_hora_coleta ASC
-            """, (empresa_id,))
-            resultados = cursor.fetchall()
-            pontuacoes = [row[0] for row in resultados]
-
-            # Calcular a label
-            label = calcular_label_pontuacao(pontuacoes)
-
-            # Atualizar a tabela de empresas
-            cursor.execute(f"""
-                UPDATE {table_empresas}
-                SET label_pontuacao = %s
-                WHERE id = %s
-            """, (label, empresa_id))
-            print(f"[INFO] label_pontuacao atualizado para a empresa ID {empresa_id}: {label}")
+        for i in range(0, len(linhas), TAMANHO_LOTE_INSERCAO):
+            cursor.executemany(insert_query, linhas[i:i + TAMANHO_LOTE_INSERCAO])
+
+        duracao = time.perf_counter() - inicio
+        print(f"[INFO] {len(linhas)} linhas de pontuação enviadas em {duracao:.2f}s "
+              f"({len(linhas) / duracao if duracao else 0:.0f} linhas/s); "
+              f"{len(vistas)} inalteradas só tiveram visto_ate atualizado.")
+
+        # Atualiza os agregados e a label_pontuacao sem reler o histórico completo
+        rotulos.atualizar_labels(connection, table_pontuacao, table_empresas, observacoes)
 
         connection.commit()
-        print("[INFO] Labels de pontuação atualizadas com sucesso.")
+        print(f"[INFO] Dados e labels de pontuação gravados em uma única transação "
+              f"({time.perf_counter() - inicio:.2f}s no total).")
+        return True
     except mysql.connector.Error as err:
+        # Conexão perdida: quem chamou reconecta ou guarda os registros no spool
+        if banco.erro_de_conexao(err):
+            raise
+        connection.rollback()
         print(f"[ERROR] Erro ao inserir dados no banco de dados: {err}")
+        return False
+
 
+def executar(connection):
+    """
+    Executa o bot com uma conexão já aberta (usado por main e pelo orquestrador milog.py).
+    """
+    criar_tabelas(connection)
+    banco.reenviar_spool("liv", gravar, connection)
+    parceiros = interpretar(coletar(minimo_cards(connection)))
+    # Se o banco cair depois da coleta, os parceiros ficam no spool para a próxima execução
+    banco.gravar_ou_guardar("liv", gravar, parceiros, connection)
 
 def main():
     connection = conectar_banco()
     if connection:
-        criar_tabelas(connection)
-        parceiros = extrair_parceiros(connection)
-        if parceiros:
-            salvar_relatorio_mysql(parceiros, connection)
+        executar(connection)
         connection.close()
 
 
@@ -0,0 +1,61 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Durações registradas na execução atual: lista de (etapa, segundos)
+REGISTRO = []
+_trava = threading.Lock()
+
+def registrar(nome, duracao):
+    """
+    Registra a duração (em segundos) de uma etapa.
+    """
+    with _trava:
+        REGISTRO.append((nome, duracao))
+
+@contextmanager
+def etapa(nome, silencioso=False):
+    """
+    Mede a duração do bloco e a registra com o nome da etapa.
+
+    Exemplo:
+        with metricas.etapa("linkesf.snapshot"):
+            cards = coletar_cards(driver)
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        registrar(nome, duracao)
+        if not silencioso:
+            print(f"[INFO] Etapa '{nome}' concluída em {duracao:.2f}s.")
+
+def resumo():
+    """
+    Soma as durações por etapa.
+
+    Returns:
+        dict: etapa -> {"total": segundos, "vezes": quantidade}.
+    """
+    totais = {}
+    with _trava:
+        for nome, duracao in REGISTRO:
+            item = totais.setdefault(nome, {"total": 0.0, "vezes": 0})
+            item["total"] += duracao
+            item["vezes"] += 1
+    return totais
+
+def imprimir_resumo():
+    """
+    Imprime o tempo total gasto em cada etapa.
+    """
+    for nome, item in resumo().items():
+        print(f"[INFO] {nome}: {item['total']:.2f}s ({item['vezes']}x)")
+
+def limpar():
+    """
+    Descarta as durações registradas.
+    """
+    with _trava:
+        REGISTRO.clear()
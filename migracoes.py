@@ -0,0 +1,142 @@
+import mysql.connector
+from datetime import datetime
+import historico
+import rotulos
+
+# Tabela que guarda a versão do esquema aplicada a cada tabela de empresas
+TABELA_VERSOES = "milog_schema_versao"
+
+# Erros do MySQL que indicam que a alteração já existe (aplicada antes do controle de versão)
+ERROS_JA_APLICADO = {
+    1060,  # ER_DUP_FIELDNAME: coluna já existe
+    1061,  # ER_DUP_KEYNAME: índice já existe
+}
+
+def _criar_tabela_agregados(connection, table_empresas, table_pontuacao):
+    rotulos.criar_tabela_agregados(connection, table_pontuacao)
+
+def _criar_indice_empresa_data(connection, table_empresas, table_pontuacao):
+    # Toda atualização de label filtra por empresa_id e ordena por data_hora_coleta
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        CREATE INDEX idx_empresa_data ON {table_pontuacao} (empresa_id, data_hora_coleta, id)
+    """)
+
+def _adicionar_campo_link(connection, table_empresas, table_pontuacao):
+    cursor = connection.cursor()
+    cursor.execute(f"ALTER TABLE {table_empresas} ADD COLUMN link VARCHAR(2083)")
+
+def _adicionar_campo_visto_ate(connection, table_empresas, table_pontuacao):
+    # Última vez em que a linha foi vista (modo "gravar só mudanças")
+    cursor = connection.cursor()
+    cursor.execute(f"ALTER TABLE {table_pontuacao} ADD COLUMN visto_ate DATETIME NULL")
+
+def _adicionar_campos_verificacao_link(connection, table_empresas, table_pontuacao):
+    # Controle de validade (TTL) dos links usado pelos bots de link
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        ALTER TABLE {table_empresas}
+            ADD COLUMN link_checked_at DATETIME NULL,
+            ADD COLUMN link_falhou TINYINT(1) NOT NULL DEFAULT 0
+    """)
+
+def _adicionar_campo_vezes_vista(connection, table_empresas, table_pontuacao):
+    # Quantas coletas cada linha representa (peso nos agregados, ver
+    # rotulos.SQL_PESO_LINHA). As linhas já estendidas por visto_ate foram
+    # gravadas com uma coleta por dia: o peso inicial é a contagem de dias.
+    cursor = connection.cursor()
+    cursor.execute(f"ALTER TABLE {table_pontuacao} ADD COLUMN vezes_vista INT NOT NULL DEFAULT 1")
+    cursor.execute(f"""
+        UPDATE {table_pontuacao}
+        SET vezes_vista = 1 + GREATEST(DATEDIFF(visto_ate, data_hora_coleta), 0)
+        WHERE visto_ate > data_hora_coleta
+    """)
+
+def _criar_tabela_coletas(connection, table_empresas, table_pontuacao):
+    # Coletas já gravadas: cada data_hora_coleta e cada visto_ate é uma coleta
+    # (no modo "só mudanças" as coletas intermediárias de uma linha se perderam)
+    historico.criar_tabela_coletas(connection, table_pontuacao)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        INSERT IGNORE INTO {historico.tabela_coletas(table_pontuacao)} (data_hora_coleta, empresas)
+        SELECT coleta, COUNT(DISTINCT empresa_id) FROM (
+            SELECT data_hora_coleta AS coleta, empresa_id FROM {table_pontuacao}
+            UNION
+            SELECT visto_ate, empresa_id FROM {table_pontuacao} WHERE visto_ate IS NOT NULL
+        ) vistas
+        GROUP BY coleta
+    """)
+
+# Migrações em ordem: (versão, descrição, função)
+MIGRACOES = [
+    (1, "tabela de agregados de pontuação", _criar_tabela_agregados),
+    (2, "índice (empresa_id, data_hora_coleta) na tabela de pontuação", _criar_indice_empresa_data),
+    (3, "coluna 'link' na tabela de empresas", _adicionar_campo_link),
+    (4, "coluna 'visto_ate' na tabela de pontuação", _adicionar_campo_visto_ate),
+    (5, "colunas 'link_checked_at' e 'link_falhou' na tabela de empresas", _adicionar_campos_verificacao_link),
+    (6, "coluna 'vezes_vista' na tabela de pontuação", _adicionar_campo_vezes_vista),
+    (7, "tabela de coletas da tabela de pontuação", _criar_tabela_coletas),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+def versao_esquema(connection, table_empresas):
+    """
+    Retorna a versão do esquema registrada para a tabela de empresas
+    (0 se ainda não houver registro ou se a tabela de versões não existir).
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT versao FROM {TABELA_VERSOES} WHERE tabela = %s", (table_empresas,))
+        resultado = cursor.fetchone()
+    except mysql.connector.Error as err:
+        if err.errno != 1146:  # ER_NO_SUCH_TABLE
+            raise
+        return 0
+    return resultado[0] if resultado else 0
+
+def esquema_atualizado(connection, table_empresas):
+    """
+    Indica se todas as migrações já foram aplicadas, com uma única consulta.
+    """
+    return versao_esquema(connection, table_empresas) >= VERSAO_ATUAL
+
+def aplicar_migracoes(connection, table_empresas, table_pontuacao):
+    """
+    Aplica, uma única vez, as migrações pendentes das tabelas de empresas e
+    de pontuação de um programa, registrando a versão na tabela de versões.
+    Em execuções seguintes nenhuma verificação de esquema é feita.
+    """
+    versao = versao_esquema(connection, table_empresas)
+    if versao >= VERSAO_ATUAL:
+        return versao
+
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABELA_VERSOES} (
+            tabela VARCHAR(255) PRIMARY KEY,
+            versao INT NOT NULL,
+            atualizado_em DATETIME NOT NULL
+        );
+    """)
+
+    for numero, descricao, migracao in MIGRACOES:
+        if numero <= versao:
+            continue
+        try:
+            migracao(connection, table_empresas, table_pontuacao)
+            print(f"[INFO] Migração {numero} aplicada em '{table_empresas}': {descricao}.")
+        except mysql.connector.Error as err:
+            if err.errno not in ERROS_JA_APLICADO:
+                print(f"[ERROR] Falha na migração {numero} ({descricao}): {err}")
+                raise
+            print(f"[INFO] Migração {numero} já estava aplicada em '{table_empresas}': {descricao}.")
+
+        cursor.execute(f"""
+            INSERT INTO {TABELA_VERSOES} (tabela, versao, atualizado_em) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE versao = VALUES(versao), atualizado_em = VALUES(atualizado_em)
+        """, (table_empresas, numero, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        connection.commit()
+        versao = numero
+
+    return versao
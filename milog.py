@@ -0,0 +1,144 @@
+import sys
+import time
+import argparse
+import importlib
+import traceback
+import threading
+import banco
+import metricas
+import navegador
+import pipeline
+
+# Jobs disponíveis: nome -> módulo com executar(connection)
+JOBS = {
+    "esf": "esf",
+    "liv": "liv",
+    "banners": "slid_liv",
+    "linkesf": "linkesf",
+    "linkliv": "linkliv",
+}
+
+# No modo concorrente, jobs da mesma faixa rodam em sequência na mesma thread:
+# os bots de link dependem das tabelas criadas pelos de pontuação e
+# reaproveitam a grade já baixada por eles
+FAIXAS = {
+    "esf": "esfera",
+    "linkesf": "esfera",
+    "liv": "livelo",
+    "linkliv": "livelo",
+    "banners": "banners",
+}
+
+def executar_job(nome, pool):
+    """
+    Executa um job com uma conexão do pool, isolando erros.
+
+    Returns:
+        tuple: (nome, sucesso, duração em segundos).
+    """
+    print(f"[INFO] === Job '{nome}' iniciado ===")
+    inicio = time.perf_counter()
+    sucesso = False
+    connection = None
+    try:
+        modulo = importlib.import_module(JOBS[nome])
+        connection = banco.obter_conexao(pool)
+        modulo.executar(connection)
+        sucesso = True
+    except Exception:
+        print(f"[ERROR] Job '{nome}' falhou:\n{traceback.format_exc()}")
+    finally:
+        if connection is not None:
+            connection.close()
+    duracao = time.perf_counter() - inicio
+    metricas.registrar(f"job.{nome}", duracao)
+    print(f"[INFO] === Job '{nome}' {'concluído' if sucesso else 'com erro'} em {duracao:.2f}s ===")
+    return nome, sucesso, duracao
+
+def executar_sequencial(jobs, pool):
+    return [executar_job(nome, pool) for nome in jobs]
+
+def executar_em_pipeline(jobs, pool):
+    """
+    Executa as fontes de pipeline.FONTES em pipeline (coleta em paralelo,
+    um único gravador) e, em seguida, os demais jobs em sequência.
+    """
+    fontes = [nome for nome in jobs if nome in pipeline.FONTES]
+    resultados = []
+    if fontes:
+        connection = banco.obter_conexao(pool)
+        try:
+            resultados = pipeline.executar(fontes, connection)
+        finally:
+            connection.close()
+    return resultados + executar_sequencial([nome for nome in jobs if nome not in pipeline.FONTES], pool)
+
+def executar_concorrente(jobs, pool):
+    """
+    Executa cada faixa (ver FAIXAS) em uma thread, mantendo a ordem dos jobs dentro da faixa.
+    """
+    faixas = {}
+    for nome in jobs:
+        faixas.setdefault(FAIXAS[nome], []).append(nome)
+
+    resultados = []
+    trava = threading.Lock()
+
+    def executar_faixa(nomes):
+        for nome in nomes:
+            resultado = executar_job(nome, pool)
+            with trava:
+                resultados.append(resultado)
+
+    threads = [threading.Thread(target=executar_faixa, args=(nomes,)) for nomes in faixas.values()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(resultados, key=lambda resultado: jobs.index(resultado[0]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="milog",
+        description="Executa os bots no mesmo processo, com navegador e pool de conexões compartilhados.",
+    )
+    parser.add_argument("jobs", nargs="+", choices=list(JOBS), help="jobs a executar, na ordem")
+    parser.add_argument("--concorrente", action="store_true",
+                        help="executa Esfera, Livelo e banners em paralelo (um navegador por faixa)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="coleta esf, liv e banners em paralelo, interpreta as páginas à medida "
+                             "que chegam e grava tudo por uma única conexão")
+    args = parser.parse_args(argv)
+    if args.concorrente and args.pipeline:
+        parser.error("use --concorrente ou --pipeline, não os dois")
+    jobs = list(dict.fromkeys(args.jobs))
+
+    inicio = time.perf_counter()
+    faixas = len({FAIXAS[nome] for nome in jobs}) if args.concorrente else 1
+    pool = banco.criar_pool(faixas)
+    if pool is None:
+        return 1
+
+    # Navegadores ficam abertos entre os jobs e são reaproveitados
+    navegador.ativar_reaproveitamento()
+    try:
+        if args.pipeline:
+            resultados = executar_em_pipeline(jobs, pool)
+        elif args.concorrente:
+            resultados = executar_concorrente(jobs, pool)
+        else:
+            resultados = executar_sequencial(jobs, pool)
+    finally:
+        navegador.encerrar_reaproveitados()
+
+    print("[INFO] Resumo dos jobs:")
+    for nome, sucesso, duracao in resultados:
+        print(f"[INFO]   {nome:<8} {'ok' if sucesso else 'ERRO':<4} {duracao:8.2f}s")
+    print(f"[INFO] Tempo total: {time.perf_counter() - inicio:.2f}s")
+    metricas.imprimir_resumo()
+    # Coletas guardadas no spool ainda não estão no banco: a execução falha
+    pendentes = banco.avisar_spool_pendente()
+    return 0 if all(sucesso for _, sucesso, _ in resultados) and not pendentes else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import threading
+import espera
+import metricas
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+)
+
+# Padrões de URL bloqueados por categoria (curingas do Network.setBlockedURLs)
+PADROES_BLOQUEIO = {
+    "imagem": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "fonte": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "midia": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*", "*.mov*"],
+    "css": ["*.css*"],
+    "rastreador": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*googlesyndication.com*", "*googleadservices.com*", "*facebook.net*",
+        "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*", "*criteo.*",
+        "*taboola.com*", "*outbrain.com*", "*adsrvr.org*", "*analytics.tiktok.com*",
+        "*bat.bing.com*", "*nr-data.net*", "*newrelic.com*", "*dynatrace.com*",
+        "*smartlook.com*", "*snap.licdn.com*", "*ads.linkedin.com*", "*pinterest.com/ct*",
+    ],
+}
+
+# Categorias bloqueadas por scraper. Os bots de link e o de banners mantêm o
+# CSS, pois dependem de layout (cliques e carrossel).
+PERFIS = {
+    "esf": ("imagem", "fonte", "midia", "css", "rastreador"),
+    "liv": ("imagem", "fonte", "midia", "css", "rastreador"),
+    "banners": ("imagem", "fonte", "midia", "rastreador"),
+    "linkesf": ("imagem", "fonte", "midia", "rastreador"),
+    "linkliv": ("imagem", "fonte", "midia", "rastreador"),
+}
+
+# Tamanhos (bytes transferidos) dos recursos medidos numa execução sem bloqueio
+# (MILOG_SEM_BLOQUEIO=1): base da estimativa de bytes evitados pelo bloqueio.
+# Nos workflows o arquivo é preservado com actions/cache e medido de novo
+# quando falta e no dia 1 de cada mês (main.yml); localmente, atualize com
+# MILOG_SEM_BLOQUEIO=1 python milog.py esf liv banners. Vazio desativa a referência.
+ARQUIVO_TAMANHOS = os.getenv("MILOG_TAMANHOS_RECURSOS", "tamanhos_recursos.json")
+
+def bloqueio_desativado() -> bool:
+    """
+    MILOG_SEM_BLOQUEIO=1 desliga o bloqueio (útil para medir a linha de base).
+    """
+    return os.getenv("MILOG_SEM_BLOQUEIO", "").strip().lower() in ("1", "true", "sim", "yes")
+
+def padroes_do_perfil(perfil):
+    """
+    Retorna a lista de padrões de URL bloqueados para o perfil do scraper.
+    """
+    if bloqueio_desativado():
+        return []
+    return [padrao for categoria in PERFIS[perfil] for padrao in PADROES_BLOQUEIO[categoria]]
+
+# Navegadores ociosos mantidos abertos entre jobs pelo orquestrador (milog.py).
+# None = reaproveitamento desligado: cada scraper abre e fecha o seu.
+_ociosos = None
+_trava = threading.Lock()
+
+def ativar_reaproveitamento():
+    """
+    Passa a manter os navegadores abertos: encerrar_driver devolve o driver
+    para uma lista de ociosos e criar_driver reaproveita um deles (com o
+    perfil do novo scraper) antes de iniciar outro Chrome.
+    """
+    global _ociosos
+    with _trava:
+        if _ociosos is None:
+            _ociosos = []
+
+def encerrar_reaproveitados():
+    """
+    Fecha os navegadores ociosos e desliga o reaproveitamento.
+    """
+    global _ociosos
+    with _trava:
+        drivers, _ociosos = _ociosos or [], None
+    for driver in drivers:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+def aplicar_perfil(driver, perfil):
+    """
+    Aplica (ou troca, num navegador reaproveitado) o bloqueio de recursos do perfil.
+    """
+    driver.milog_perfil = perfil
+    padroes = padroes_do_perfil(perfil)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": padroes})
+    if padroes:
+        print(f"[INFO] Perfil '{perfil}': {len(padroes)} padrões de URL bloqueados.")
+
+def _reaproveitar(perfil):
+    with _trava:
+        driver = _ociosos.pop() if _ociosos else None
+    if driver is None:
+        return None
+    try:
+        aplicar_perfil(driver, perfil)
+        print(f"[INFO] Navegador reaproveitado para o perfil '{perfil}'.")
+        return driver
+    except Exception as e:
+        print(f"[WARN] Navegador ocioso não responde ({e}); iniciando outro.")
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        return None
+
+def criar_driver(perfil):
+    """
+    Cria o Chrome headless usado pelos scrapers, com o bloqueio de recursos do
+    perfil ('esf', 'liv', 'banners', 'linkesf' ou 'linkliv') aplicado via
+    interceptação de rede do DevTools. Com o reaproveitamento ativo, usa um
+    navegador ocioso, se houver. Erros de inicialização são propagados
+    (WebDriverException), como em webdriver.Chrome.
+    """
+    inicio = time.perf_counter()
+    if _ociosos is not None:
+        driver = _reaproveitar(perfil)
+        if driver is not None:
+            metricas.registrar(f"navegador.inicio.{perfil}", time.perf_counter() - inicio)
+            return driver
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    # Log de desempenho para contabilizar requisições bloqueadas e bytes transferidos
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.set_window_size(1920, 1080)
+    # Instrumentação usada por espera.aguardar_estabilidade em todo documento aberto
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": espera.SCRIPT_INSTRUMENTACAO})
+    aplicar_perfil(driver, perfil)
+    metricas.registrar(f"navegador.inicio.{perfil}", time.perf_counter() - inicio)
+    return driver
+
+def abrir(driver, url, nome):
+    """
+    Abre a URL no driver (driver.get), registrando o tempo de carregamento.
+    """
+    inicio = time.perf_counter()
+    try:
+        driver.get(url)
+    finally:
+        metricas.registrar(f"navegador.carregamento.{nome}", time.perf_counter() - inicio)
+
+def _categoria(url):
+    url = url.lower()
+    for categoria, padroes in PADROES_BLOQUEIO.items():
+        for padrao in padroes:
+            if padrao.strip("*") in url:
+                return categoria
+    return "outro"
+
+def carregar_tamanhos():
+    """
+    Referência de tamanhos: {"urls": {url: bytes}, "categorias": {categoria: [total, quantidade]}}.
+    """
+    if not ARQUIVO_TAMANHOS or not os.path.exists(ARQUIVO_TAMANHOS):
+        return {"urls": {}, "categorias": {}}
+    try:
+        with open(ARQUIVO_TAMANHOS, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Referência de tamanhos '{ARQUIVO_TAMANHOS}' ilegível: {e}")
+        return {"urls": {}, "categorias": {}}
+
+def salvar_tamanhos(tamanhos_por_url):
+    """
+    Acrescenta à referência os tamanhos medidos numa execução sem bloqueio.
+    """
+    if not ARQUIVO_TAMANHOS or not tamanhos_por_url:
+        return
+    with _trava:
+        referencia = carregar_tamanhos()
+        referencia["urls"].update(tamanhos_por_url)
+        categorias = {}
+        for url, tamanho in referencia["urls"].items():
+            total, quantidade = categorias.get(_categoria(url), (0, 0))
+            categorias[_categoria(url)] = (total + tamanho, quantidade + 1)
+        referencia["categorias"] = {categoria: list(valores) for categoria, valores in categorias.items()}
+        try:
+            with open(ARQUIVO_TAMANHOS, "w", encoding="utf-8") as arquivo:
+                json.dump(referencia, arquivo)
+        except OSError as e:
+            print(f"[WARN] Não foi possível gravar a referência de tamanhos: {e}")
+
+def estimar_bytes_evitados(urls_bloqueadas, referencia):
+    """
+    Estima os bytes dos recursos bloqueados (nunca baixados) pela referência:
+    o tamanho medido da mesma URL ou, na falta dele, a média da categoria.
+
+    Returns:
+        tuple: (bytes estimados, quantidade de bloqueadas sem estimativa).
+    """
+    estimados, sem_estimativa = 0, 0
+    for url in urls_bloqueadas:
+        if url in referencia["urls"]:
+            estimados += referencia["urls"][url]
+        elif _categoria(url) in referencia["categorias"]:
+            total, quantidade = referencia["categorias"][_categoria(url)]
+            estimados += total / quantidade
+        else:
+            sem_estimativa += 1
+    return int(estimados), sem_estimativa
+
+def relatorio_rede(driver):
+    """
+    Lê o log de desempenho do Chrome e resume a atividade de rede desde a
+    última leitura: requisições bloqueadas por categoria, bytes transferidos
+    (encodedDataLength) e bytes evitados, estimados pela referência de uma
+    execução com MILOG_SEM_BLOQUEIO=1 (os bloqueados nunca foram baixados).
+    Sem bloqueio, os tamanhos medidos alimentam essa referência.
+
+    Returns:
+        dict: {"requisicoes", "bloqueadas", "bloqueadas_por_categoria", "bytes",
+        "bytes_evitados", "sem_estimativa"}.
+    """
+    try:
+        entradas = driver.get_log("performance")
+    except Exception as e:
+        print(f"[WARN] Não foi possível ler o log de desempenho do Chrome: {e}")
+        return {}
+
+    urls = {}
+    bloqueadas = {}
+    urls_bloqueadas = []
+    tamanhos = {}
+    total_bytes = 0
+    for entrada in entradas:
+        mensagem = json.loads(entrada["message"])["message"]
+        metodo, params = mensagem.get("method"), mensagem.get("params", {})
+        if metodo == "Network.requestWillBeSent":
+            urls[params["requestId"]] = params["request"]["url"]
+        elif metodo == "Network.loadingFinished":
+            total_bytes += params.get("encodedDataLength", 0)
+            if params["requestId"] in urls:
+                tamanhos[urls[params["requestId"]]] = int(params.get("encodedDataLength", 0))
+        elif metodo == "Network.loadingFailed" and params.get("blockedReason"):
+            url = urls.get(params["requestId"], "")
+            categoria = _categoria(url)
+            bloqueadas[categoria] = bloqueadas.get(categoria, 0) + 1
+            urls_bloqueadas.append(url)
+
+    if bloqueio_desativado():
+        salvar_tamanhos(tamanhos)
+    bytes_evitados, sem_estimativa = estimar_bytes_evitados(urls_bloqueadas, carregar_tamanhos())
+    return {
+        "requisicoes": len(urls),
+        "bloqueadas": sum(bloqueadas.values()),
+        "bloqueadas_por_categoria": bloqueadas,
+        "bytes": int(total_bytes),
+        "bytes_evitados": bytes_evitados,
+        "sem_estimativa": sem_estimativa,
+    }
+
+def encerrar_driver(driver):
+    """
+    Registra o resumo de rede da execução (requisições evitadas, bytes
+    transferidos e estimativa de bytes evitados) e encerra o navegador; com o
+    reaproveitamento ativo, ele volta para a lista de ociosos (em about:blank).
+    """
+    relatorio = relatorio_rede(driver)
+    if relatorio:
+        if relatorio["sem_estimativa"]:
+            estimativa = (f"~{relatorio['bytes_evitados'] / 1024:.0f} KiB evitados "
+                          f"({relatorio['sem_estimativa']} bloqueadas sem referência de tamanho; "
+                          f"rode com MILOG_SEM_BLOQUEIO=1 para medi-las)")
+        else:
+            estimativa = f"~{relatorio['bytes_evitados'] / 1024:.0f} KiB evitados (estimativa)"
+        print(
+            f"[INFO] Rede ({getattr(driver, 'milog_perfil', '?')}): {relatorio['requisicoes']} requisições, "
+            f"{relatorio['bloqueadas']} evitadas {relatorio['bloqueadas_por_categoria']}, "
+            f"{relatorio['bytes'] / 1024:.0f} KiB transferidos, {estimativa}."
+        )
+
+    if _ociosos is not None:
+        try:
+            driver.get("about:blank")
+            driver.get_log("performance")  # descarta os eventos da navegação para about:blank
+            with _trava:
+                if _ociosos is not None:
+                    _ociosos.append(driver)
+                    return
+        except Exception:
+            pass
+    driver.quit()
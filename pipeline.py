@@ -0,0 +1,146 @@
+import os
+import time
+import queue
+import importlib
+import threading
+import traceback
+import banco
+import metricas
+
+# Fontes do pipeline: nome -> (módulo, função que cria as tabelas)
+FONTES = {
+    "esf": ("esf", "criar_tabelas"),
+    "liv": ("liv", "criar_tabelas"),
+    "banners": ("slid_liv", "criar_tabela_banners"),
+}
+
+# Capacidade das filas entre as etapas: com a fila cheia, a etapa anterior
+# espera (backpressure) em vez de acumular páginas na memória
+TAMANHO_FILA = int(os.getenv("PIPELINE_TAMANHO_FILA", "2"))
+
+# Tempo máximo de coleta + interpretação de cada fonte, em segundos; a fonte
+# que estourar é dada como falha sem segurar a gravação das outras
+LIMITE_FONTE = float(os.getenv("PIPELINE_LIMITE_FONTE", "600"))
+
+# Marca o fim da fila de páginas
+_FIM = None
+
+def coletor(nome, modulo, argumentos, paginas):
+    """
+    Etapa de coleta de uma fonte (uma thread por fonte). Erros viram um item
+    da fila, para que a falha de uma fonte não interrompa as outras.
+    """
+    try:
+        with metricas.etapa(f"pipeline.coleta.{nome}"):
+            brutos = modulo.coletar(*argumentos)
+        paginas.put((nome, brutos, None))
+    except Exception:
+        paginas.put((nome, None, traceback.format_exc()))
+
+def interpretador(modulos, paginas, registros):
+    """
+    Etapa de interpretação: converte cada página assim que ela chega.
+    """
+    while True:
+        item = paginas.get()
+        if item is _FIM:
+            return
+        nome, brutos, erro = item
+        if erro is None:
+            try:
+                with metricas.etapa(f"pipeline.interpretacao.{nome}"):
+                    brutos = modulos[nome].interpretar(brutos)
+            except Exception:
+                brutos, erro = None, traceback.format_exc()
+        registros.put((nome, brutos, erro))
+
+def gravador(modulos, registros, pendentes, connection, inicio):
+    """
+    Etapa de gravação: único dono da conexão com o banco. A cada rodada grava
+    tudo o que já chegou das fontes, até todas terminarem ou o prazo acabar.
+
+    Returns:
+        dict: fonte -> (sucesso, duração desde o início do pipeline).
+    """
+    resultados = {}
+    prazo = inicio + LIMITE_FONTE
+    while pendentes:
+        try:
+            lote = [registros.get(timeout=max(0, prazo - time.monotonic()))]
+        except queue.Empty:
+            break
+        # Agrupa o que as outras fontes já entregaram
+        while True:
+            try:
+                lote.append(registros.get_nowait())
+            except queue.Empty:
+                break
+
+        for nome, dados, erro in lote:
+            pendentes.discard(nome)
+            if erro is None:
+                try:
+                    with metricas.etapa(f"pipeline.gravacao.{nome}"):
+                        if not banco.gravar_ou_guardar(nome, modulos[nome].gravar, dados, connection):
+                            erro = "banco inacessível; registros guardados no spool"
+                except Exception:
+                    erro = traceback.format_exc()
+            if erro is not None:
+                print(f"[ERROR] Fonte '{nome}' falhou:\n{erro}")
+            resultados[nome] = (erro is None, time.monotonic() - inicio)
+
+    for nome in pendentes:
+        print(f"[ERROR] Fonte '{nome}' não terminou em {LIMITE_FONTE:.0f}s; seguindo sem ela.")
+        resultados[nome] = (False, time.monotonic() - inicio)
+    return resultados
+
+def executar(fontes, connection):
+    """
+    Coleta as fontes em paralelo, interpreta as páginas à medida que chegam e
+    grava tudo por um único gravador, com a conexão informada.
+
+    Args:
+        fontes (list of str): Nomes em FONTES, na ordem do resumo.
+
+    Returns:
+        list of tuple: (fonte, sucesso, duração em segundos), como milog.executar_job.
+    """
+    inicio = time.monotonic()
+    modulos = {}
+    argumentos = {}
+    resultados = {}
+
+    # Tabelas e mínimo de cards de cada fonte, antes de liberar os coletores
+    for nome in fontes:
+        try:
+            nome_modulo, criar_tabelas = FONTES[nome]
+            modulo = importlib.import_module(nome_modulo)
+            getattr(modulo, criar_tabelas)(connection)
+            banco.reenviar_spool(nome, modulo.gravar, connection)
+            argumentos[nome] = (modulo.minimo_cards(connection),) if hasattr(modulo, "minimo_cards") else ()
+            modulos[nome] = modulo
+        except Exception:
+            print(f"[ERROR] Fonte '{nome}' falhou na preparação:\n{traceback.format_exc()}")
+            resultados[nome] = (False, time.monotonic() - inicio)
+
+    paginas = queue.Queue(TAMANHO_FILA)
+    registros = queue.Queue(TAMANHO_FILA)
+
+    # Coletores que estourarem o prazo ficam para trás sem segurar o encerramento
+    coletores = [
+        threading.Thread(target=coletor, args=(nome, modulos[nome], argumentos[nome], paginas), daemon=True)
+        for nome in modulos
+    ]
+    thread_interpretador = threading.Thread(
+        target=interpretador, args=(modulos, paginas, registros), daemon=True
+    )
+    thread_interpretador.start()
+    for thread in coletores:
+        thread.start()
+
+    resultados.update(gravador(modulos, registros, set(modulos), connection, inicio))
+
+    if all(not thread.is_alive() for thread in coletores):
+        paginas.put(_FIM)
+        thread_interpretador.join()
+    return [(nome, *resultados[nome]) for nome in fontes]
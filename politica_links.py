@@ -0,0 +1,131 @@
+import os
+import mysql.connector
+from datetime import datetime, timedelta
+
+# Validade padrão de um link já verificado (sobrescrita por LINK_TTL_DIAS)
+TTL_PADRAO_DIAS = 30
+
+def ttl_links() -> timedelta:
+    """
+    Lê a validade dos links da variável de ambiente LINK_TTL_DIAS (em dias,
+    aceita fração). LINK_TTL_DIAS=0 força a verificação de todos os parceiros.
+    """
+    valor = os.getenv("LINK_TTL_DIAS")
+    if not valor:
+        return timedelta(days=TTL_PADRAO_DIAS)
+    try:
+        return timedelta(days=float(valor))
+    except ValueError:
+        raise ValueError(f"LINK_TTL_DIAS inválido: '{valor}'")
+
+def carregar_estado_links(connection, table_empresas):
+    """
+    Carrega, com uma única consulta, o estado de link de todas as empresas.
+
+    Returns:
+        dict: nome -> {"id", "link", "link_checked_at", "link_falhou"}.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT nome, id, link, link_checked_at, link_falhou FROM {table_empresas}")
+        return {
+            nome: {"id": empresa_id, "link": link, "link_checked_at": verificado_em, "link_falhou": bool(falhou)}
+            for nome, empresa_id, link, verificado_em, falhou in cursor.fetchall()
+        }
+    finally:
+        cursor.close()
+
+def motivo_verificacao(empresa, agora, ttl):
+    """
+    Decide se o link de uma empresa precisa ser resolvido novamente.
+
+    Returns:
+        str ou None: 'nova', 'falhou' ou 'expirada'; None se o link ainda vale.
+    """
+    if empresa["link_checked_at"] is None:
+        return "nova"
+    if empresa["link_falhou"]:
+        return "falhou"
+    if agora - empresa["link_checked_at"] >= ttl:
+        return "expirada"
+    return None
+
+def selecionar_trabalho(estado, nomes, agora=None, ttl=None):
+    """
+    Filtra os parceiros encontrados na página, mantendo só os que precisam ser
+    resolvidos: empresas nunca verificadas, links vencidos (mais antigos que o
+    TTL) e links que falharam na última tentativa. Parceiros que ainda não
+    existem na tabela de empresas são ignorados (não há onde gravar o link).
+
+    Args:
+        estado (dict): Resultado de carregar_estado_links.
+        nomes (iterable of str): Nomes dos parceiros presentes na página.
+
+    Returns:
+        dict: nome -> motivo.
+    """
+    agora = agora or datetime.now()
+    ttl = ttl if ttl is not None else ttl_links()
+
+    trabalho = {}
+    contagem = {"nova": 0, "falhou": 0, "expirada": 0, "em_dia": 0, "sem_empresa": 0}
+    for nome in nomes:
+        if nome not in estado:
+            contagem["sem_empresa"] += 1
+            continue
+        motivo = motivo_verificacao(estado[nome], agora, ttl)
+        if motivo:
+            trabalho[nome] = motivo
+            contagem[motivo] += 1
+        else:
+            contagem["em_dia"] += 1
+
+    print(f"[INFO] Links a resolver: {len(trabalho)} "
+          f"(novas={contagem['nova']}, falharam={contagem['falhou']}, expiradas={contagem['expirada']}); "
+          f"em dia={contagem['em_dia']}, sem empresa cadastrada={contagem['sem_empresa']}.")
+    return trabalho
+
+def registrar_resultados(connection, table_empresas, estado, links, falhas, agora=None):
+    """
+    Grava o resultado da rodada em uma única transação: links resolvidos
+    (atualizando link_checked_at e zerando link_falhou) e falhas
+    (link_falhou = 1, mantendo o link anterior).
+
+    Args:
+        estado (dict): Resultado de carregar_estado_links.
+        links (dict): nome -> link obtido.
+        falhas (iterable of str): Nomes cujo link não pôde ser resolvido.
+    """
+    agora = (agora or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+
+    sucesso = []
+    alterados = 0
+    for nome_empresa, link_novo in links.items():
+        empresa = estado.get(nome_empresa)
+        if not empresa:
+            print(f"[WARN] Empresa '{nome_empresa}' não encontrada na tabela.")
+            continue
+        if empresa["link"] != link_novo:
+            alterados += 1
+            print(f"[INFO] Link atualizado para a empresa ID {empresa['id']}: {link_novo}")
+        sucesso.append((link_novo, agora, empresa["id"]))
+
+    falhou = [(agora, estado[nome]["id"]) for nome in falhas if nome in estado]
+
+    cursor = connection.cursor()
+    try:
+        if sucesso:
+            cursor.executemany(f"""
+                UPDATE {table_empresas} SET link = %s, link_checked_at = %s, link_falhou = 0 WHERE id = %s
+            """, sucesso)
+        if falhou:
+            cursor.executemany(f"""
+                UPDATE {table_empresas} SET link_checked_at = %s, link_falhou = 1 WHERE id = %s
+            """, falhou)
+        connection.commit()
+        print(f"[INFO] {len(sucesso)} links verificados ({alterados} alterados); {len(falhou)} falhas registradas.")
+    except mysql.connector.Error as err:
+        connection.rollback()
+        print(f"[ERROR] Erro ao registrar os links: {err}")
+    finally:
+        cursor.close()
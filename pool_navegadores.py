@@ -0,0 +1,117 @@
+import os
+import queue
+import threading
+import time
+
+# Limite absoluto de navegadores simultâneos, independentemente de LINK_WORKERS
+MAX_WORKERS = 8
+
+def workers_configurados() -> int:
+    """
+    Lê a quantidade de navegadores do pool da variável de ambiente LINK_WORKERS
+    (padrão: 1, ou seja, resolução sequencial no navegador já aberto).
+    """
+    valor = os.getenv("LINK_WORKERS", "1")
+    try:
+        return max(1, min(int(valor), MAX_WORKERS))
+    except ValueError:
+        raise ValueError(f"LINK_WORKERS inválido: '{valor}'")
+
+def timeout_configurado() -> float:
+    """
+    Tempo máximo (segundos) que cada worker pode gastar no total
+    (variável de ambiente LINK_TIMEOUT_WORKER, padrão 600).
+    """
+    return float(os.getenv("LINK_TIMEOUT_WORKER", "600"))
+
+def resolver_em_paralelo(tarefas, criar_driver, preparar_pagina, resolver,
+                         workers=None, timeout_worker=None, drivers_existentes=(),
+                         encerrar_driver=None):
+    """
+    Resolve as tarefas com um pool de navegadores. Cada worker tem o seu
+    próprio driver, abre a página de listagem uma vez e retira tarefas de
+    uma fila compartilhada até ela esvaziar ou o seu tempo acabar. Os
+    resultados voltam para a thread chamadora, que é a única a gravar no banco.
+
+    Args:
+        tarefas (list): Itens a resolver (ex.: cards com 'indice' e 'nome').
+        criar_driver (callable): Cria um novo WebDriver (ou None em caso de erro).
+        preparar_pagina (callable): Recebe o driver e abre a página de listagem; retorna bool.
+        resolver (callable): Recebe (driver, tarefa) e retorna o resultado (ou None).
+        workers (int, opcional): Quantidade de navegadores (padrão: LINK_WORKERS).
+        timeout_worker (float, opcional): Tempo máximo por worker (padrão: LINK_TIMEOUT_WORKER).
+        drivers_existentes (sequence): Drivers já abertos na página de listagem,
+            usados antes de criar novos. O pool não os encerra.
+        encerrar_driver (callable, opcional): Encerra os drivers criados pelo
+            pool (padrão: driver.quit()).
+
+    Returns:
+        list: Pares (tarefa, resultado); tarefas não resolvidas têm resultado None.
+    """
+    if not tarefas:
+        return []
+
+    workers = min(workers or workers_configurados(), MAX_WORKERS, len(tarefas))
+    timeout_worker = timeout_worker or timeout_configurado()
+
+    fila = queue.Queue()
+    for tarefa in tarefas:
+        fila.put(tarefa)
+    resultados = queue.Queue()
+    drivers_existentes = list(drivers_existentes)
+
+    def trabalhar(numero):
+        proprio = numero >= len(drivers_existentes)
+        driver = criar_driver() if proprio else drivers_existentes[numero]
+        if not driver:
+            print(f"[ERROR] Worker {numero}: não foi possível iniciar o navegador.")
+            return
+        prazo = time.monotonic() + timeout_worker
+        resolvidas = 0
+        try:
+            if proprio and not preparar_pagina(driver):
+                print(f"[ERROR] Worker {numero}: não foi possível abrir a página de listagem.")
+                return
+            while time.monotonic() < prazo:
+                try:
+                    tarefa = fila.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    resultado = resolver(driver, tarefa)
+                except Exception as e:
+                    print(f"[ERROR] Worker {numero}: erro inesperado: {e}")
+                    resultado = None
+                resultados.put((tarefa, resultado))
+                resolvidas += 1
+            else:
+                print(f"[WARN] Worker {numero}: tempo limite de {timeout_worker:.0f}s atingido.")
+        finally:
+            print(f"[INFO] Worker {numero} finalizado após {resolvidas} tarefa(s).")
+            if proprio:
+                try:
+                    if encerrar_driver:
+                        encerrar_driver(driver)
+                    else:
+                        driver.quit()
+                except Exception:
+                    pass
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhar, args=(numero,), daemon=True) for numero in range(workers)]
+    for thread in threads:
+        thread.start()
+    # Os workers respeitam o próprio prazo entre tarefas; a folga cobre a tarefa em andamento
+    limite = time.monotonic() + timeout_worker + 60
+    for thread in threads:
+        thread.join(max(0, limite - time.monotonic()))
+
+    concluidas = []
+    while not resultados.empty():
+        concluidas.append(resultados.get())
+    resolvidos_ids = {id(tarefa) for tarefa, _ in concluidas}
+    concluidas += [(tarefa, None) for tarefa in tarefas if id(tarefa) not in resolvidos_ids]
+
+    print(f"[INFO] Pool de {workers} navegador(es) resolveu {len(tarefas)} tarefa(s) "
+          f"em {time.perf_counter() - inicio:.2f}s.")
+    return concluidas
@@ -0,0 +1,226 @@
+import re
+import sys
+import time
+import random
+import pandas as pd
+import regras_pontuacao as regras
+
+# Interpretação em lote (vetorizada com pandas) das mesmas regras de
+# regras_pontuacao, para reprocessar muitas descrições de uma vez. Descrições
+# repetidas são interpretadas uma única vez.
+
+def _numeros(textos):
+    """
+    Converte números com vírgula decimal ('1,5') em float.
+    """
+    return textos.str.replace(",", ".", regex=False).astype(float)
+
+def _extrair(serie, padrao, flags=0):
+    """
+    Primeiro grupo de 'padrao' em cada texto (NaN onde não casar).
+    """
+    return serie.str.extract(padrao.pattern if hasattr(padrao, "pattern") else padrao,
+                             flags=flags or getattr(padrao, "flags", 0), expand=True)
+
+def _razao_lote(descricoes, aplica):
+    """
+    Versão vetorizada de regras_pontuacao.regra_razao.
+    """
+    textos = descricoes[aplica]
+    numerador = _extrair(textos, regras.NUMERO_PT)[0]
+    denominador = _extrair(textos, regras.NUMERO_REAIS)[0]
+    validos = numerador.notna() & denominador.notna()
+    numerador, denominador = _numeros(numerador[validos]), _numeros(denominador[validos])
+
+    resultado = pd.Series("0", index=numerador.index, dtype=object)
+    divisivel = denominador != 0
+    resultado[divisivel] = (numerador[divisivel] / denominador[divisivel]).map(lambda valor: str(float(valor)))
+    return resultado
+
+def _maior_valor_lote(descricoes, aplica):
+    """
+    Versão vetorizada de regras_pontuacao.regra_maior_valor: o texto do maior
+    número (o primeiro, em caso de empate).
+    """
+    todos = descricoes[aplica].str.extractall(f"({regras.NUMERO.pattern})")[0]
+    if todos.empty:
+        return pd.Series(dtype=object)
+    posicoes = _numeros(todos).groupby(level=0).idxmax()
+    maiores = todos.loc[list(posicoes)]
+    maiores.index = maiores.index.get_level_values(0)
+    return maiores
+
+def _pontos_lote(descricoes, aplica):
+    """
+    Versão vetorizada de regras_pontuacao.regra_pontos.
+    """
+    return _extrair(descricoes[aplica], regras.NUMERO_PT)[0].dropna()
+
+# Regras de REGRAS_ESFERA (pelo nome) -> versão vetorizada
+REGRAS_ESFERA_LOTE = {
+    "a cada x reais": _razao_lote,
+    "de x a y": _maior_valor_lote,
+    "x pts": _pontos_lote,
+}
+
+def _unicas(descricoes):
+    """
+    Returns:
+        tuple: (Series com as descrições distintas, códigos para remontar a ordem original).
+    """
+    codigos, unicas = pd.factorize(pd.Series(list(descricoes), dtype=object))
+    return pd.Series(unicas, dtype=object), codigos
+
+def pontuacoes_esfera(descricoes):
+    """
+    Mesmo resultado de [regras_pontuacao.pontuacao_esfera(d) for d in descricoes],
+    calculado em lote.
+
+    Returns:
+        list of tuple: (moeda, pontuacao) por descrição, na ordem recebida.
+    """
+    if len(descricoes) == 0:
+        return []
+    textos, codigos = _unicas(descricoes)
+    minusculas = textos.str.lower()
+
+    # Moeda: a palavra-chave de maior prioridade presente (aplicada por último)
+    moeda = pd.Series("R$", index=textos.index, dtype=object)
+    for _, palavra, simbolo in reversed(regras.MOEDAS_ESFERA):
+        moeda = moeda.mask(minusculas.str.contains(palavra, regex=False), simbolo)
+
+    # Pontuação: cada regra, em ordem de prioridade, só nas descrições ainda sem valor
+    pontuacao = pd.Series("x", index=textos.index, dtype=object)
+    pendente = pd.Series(True, index=textos.index)
+    for _, nome, palavras, _ in regras.REGRAS_ESFERA:
+        aplica = pendente.copy()
+        for palavra in palavras:
+            aplica &= minusculas.str.contains(palavra, regex=False)
+        if not aplica.any():
+            continue
+        valores = REGRAS_ESFERA_LOTE[nome](textos, aplica)
+        pontuacao[valores.index] = valores
+        pendente[valores.index] = False
+
+    return list(zip(moeda.to_numpy()[codigos].tolist(), pontuacao.to_numpy()[codigos].tolist()))
+
+def pontuacoes_livelo(descricoes):
+    """
+    Mesmo resultado de [regras_pontuacao.pontuacao_livelo(d) for d in descricoes],
+    calculado em lote. Cada regra de REGRAS_LIVELO vira um único padrão com os
+    contextos como antecipações, aplicado com str.extract.
+
+    Returns:
+        list of tuple: (moeda, pontuacao, pontuacao_clube) por descrição, na ordem recebida.
+    """
+    if len(descricoes) == 0:
+        return []
+    textos, codigos = _unicas(descricoes)
+
+    moeda_valor = _extrair(textos, regras.MOEDA_VALOR)
+    moeda = moeda_valor[0].fillna("").astype(object)
+    base = pd.Series(1.0, index=textos.index)
+    com_base = moeda_valor[1].notna()
+    base[com_base] = _numeros(moeda_valor[1][com_base])
+
+    valores = {}
+    for _, campo, exigido, proibido in regras.REGRAS_LIVELO:
+        padrao = f"{regras.VALOR_ATE.pattern}(?=.*{exigido.pattern})"
+        if proibido is not None:
+            padrao += f"(?!.*{proibido.pattern})"
+        valor = _extrair(textos, padrao, re.IGNORECASE)[0]
+        casou = valor.notna()
+        if (base[casou] == 0).any():
+            raise ZeroDivisionError("float division by zero")
+
+        coluna = pd.Series("x", index=textos.index, dtype=object)
+        razoes = _numeros(valor[casou]) / base[casou]
+        coluna[casou] = razoes.map(lambda razao: round(float(razao), 3))
+        valores[campo] = coluna.to_numpy()[codigos].tolist()
+
+    return list(zip(moeda.to_numpy()[codigos].tolist(), valores["pontuacao"], valores["pontuacao_clube"]))
+
+PROGRAMAS = {
+    "esf": (pontuacoes_esfera, regras.pontuacao_esfera),
+    "liv": (pontuacoes_livelo, regras.pontuacao_livelo),
+}
+
+def amostra(programa, quantidade, semente=0):
+    """
+    Descrições de teste: as do corpus e recombinações aleatórias dos seus trechos.
+    """
+    corpus = [item["descricao"] for item in regras.carregar_corpus() if item["programa"] == programa]
+    trechos = [parte for descricao in corpus for parte in re.split(r"(\s+)", descricao)]
+    sorteio = random.Random(semente)
+    descricoes = list(corpus)
+    while len(descricoes) < quantidade:
+        if sorteio.random() < 0.5:
+            descricoes.append(sorteio.choice(corpus))
+        else:
+            descricoes.append("".join(sorteio.choice(trechos) for _ in range(sorteio.randint(1, 16))))
+    return descricoes[:quantidade]
+
+def sem_divisao_por_zero(funcao, descricao):
+    try:
+        funcao(descricao)
+        return True
+    except ZeroDivisionError:
+        return False
+
+def conferir(quantidade=20000):
+    """
+    Confere o lote contra a interpretação descrição a descrição.
+
+    Returns:
+        int: Quantidade de divergências.
+    """
+    divergencias = 0
+    for programa, (lote, individual) in PROGRAMAS.items():
+        descricoes = [d for d in amostra(programa, quantidade) if sem_divisao_por_zero(individual, d)]
+        esperado = [individual(descricao) for descricao in descricoes]
+        obtido = lote(descricoes)
+        diferentes = [(d, e, o) for d, e, o in zip(descricoes, esperado, obtido) if e != o]
+        for descricao, e, o in diferentes[:10]:
+            print(f"[ERROR] {programa}: {descricao!r}: individual {e}, lote {o}")
+        divergencias += len(diferentes)
+        print(f"[INFO] {programa}: {len(descricoes) - len(diferentes)}/{len(descricoes)} descrições conferem.")
+    return divergencias
+
+def benchmark(quantidade=200000):
+    """
+    Mede descrições/s do lote e da interpretação descrição a descrição (com o
+    cache vazio e com o cache quente), em uma amostra com repetições como a de
+    um reprocessamento.
+    """
+    for programa, (lote, individual) in PROGRAMAS.items():
+        descricoes = [d for d in amostra(programa, quantidade) if sem_divisao_por_zero(individual, d)]
+
+        regras.limpar_cache()
+        inicio = time.perf_counter()
+        for descricao in descricoes:
+            individual.__wrapped__(descricao)
+        sem_cache = len(descricoes) / (time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        for descricao in descricoes:
+            individual(descricao)
+        com_cache = len(descricoes) / (time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        lote(descricoes)
+        em_lote = len(descricoes) / (time.perf_counter() - inicio)
+
+        distintas = len(set(descricoes))
+        print(f"[INFO] {programa}: {len(descricoes)} descrições ({distintas} distintas):")
+        print(f"  uma a uma, sem cache {sem_cache:12,.0f} descrições/s")
+        print(f"  uma a uma, com cache {com_cache:12,.0f} descrições/s")
+        print(f"  em lote (pandas)     {em_lote:12,.0f} descrições/s ({em_lote / sem_cache:.1f}x sem cache)")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("conferir", "benchmark"):
+        print("Uso: python regras_lote.py {conferir|benchmark} [quantidade]")
+        sys.exit(1)
+    argumentos = [int(valor) for valor in sys.argv[2:3]]
+    if sys.argv[1] == "conferir":
+        sys.exit(1 if conferir(*argumentos) else 0)
+    benchmark(*argumentos)
@@ -0,0 +1,334 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+from functools import lru_cache
+
+# Descrições distintas guardadas em cada cache (as mesmas se repetem entre
+# parceiros e entre dias)
+TAMANHO_CACHE = int(os.getenv("REGRAS_TAMANHO_CACHE", "4096"))
+
+# Versão das regras: muda a cada alteração deste arquivo ou do lote com pandas
+# (regras_lote.py) e invalida os caches de cards já interpretados (impressoes.py)
+ARQUIVOS_REGRAS = ("regras_pontuacao.py", "regras_lote.py")
+_versao = hashlib.sha256()
+for _arquivo in ARQUIVOS_REGRAS:
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), _arquivo), "rb") as _fonte:
+        _versao.update(_fonte.read())
+VERSAO_REGRAS = _versao.hexdigest()[:12]
+
+# Corpus de referência: descrições reais/típicas e o resultado esperado
+CAMINHO_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus_pontuacao.json")
+
+# Padrões compilados uma única vez
+NUMERO = re.compile(r"\d+,\d+|\d+")
+NUMERO_PT = re.compile(r"(\d+,\d+|\d+)\s?pt")
+NUMERO_REAIS = re.compile(r"(\d+,\d+|\d+)\s?reais")
+MOEDA_VALOR = re.compile(r"(R\$|U\$)\s*(\d+(?:,\d+)?)")
+VALOR_ATE = re.compile(r"(?:até|=)\s*(\d+(?:,\d+)?)", re.IGNORECASE)
+NO_CLUBE_LIVELO = re.compile(r"no Clube Livelo", re.IGNORECASE)
+NO_CLUBE = re.compile(r"no Clube", re.IGNORECASE)
+PONTOS_LIVELO = re.compile(r"Pontos?\s+Livelo", re.IGNORECASE)
+
+def numero(texto):
+    return float(texto.replace(",", "."))
+
+# ---------------------------------------------------------------------------
+# Esfera: moeda por palavra-chave e pontuação pela primeira regra que casar
+# ---------------------------------------------------------------------------
+
+# (prioridade, palavra na descrição em minúsculas, moeda); sem palavra, R$
+MOEDAS_ESFERA = [
+    (1, "real", "R$"),   # "real" ou "reais"
+    (2, "dólar", "U$"),
+    (3, "euro", "Eu$"),
+]
+
+def regra_razao(descricao):
+    """
+    "x pts a cada y reais" -> x / y.
+    """
+    numerador = NUMERO_PT.search(descricao)
+    denominador = NUMERO_REAIS.search(descricao)
+    if not (numerador and denominador):
+        return None
+    try:
+        return str(numero(numerador.group(1)) / numero(denominador.group(1)))
+    except ZeroDivisionError:
+        return "0"
+
+def regra_maior_valor(descricao):
+    """
+    "Ganhe de x a y pts" -> maior valor da descrição.
+    """
+    valores = NUMERO.findall(descricao)
+    if not valores:
+        return None
+    return max(valores, key=numero)
+
+def regra_pontos(descricao):
+    """
+    Número antes de "pt" ou "pts".
+    """
+    encontrado = NUMERO_PT.search(descricao)
+    return encontrado.group(1) if encontrado else None
+
+# (prioridade, nome, palavras exigidas na descrição em minúsculas, regra);
+# vale a primeira regra cujas palavras aparecem e que devolve um valor
+REGRAS_ESFERA = sorted([
+    (1, "a cada x reais", ("a cada", "reais"), regra_razao),
+    (2, "de x a y", ("de", "a"), regra_maior_valor),
+    (3, "x pts", (), regra_pontos),
+], key=lambda regra: regra[0])
+
+def aplicar_regras(regras, descricao, minusculas, padrao):
+    """
+    Motor de regras: devolve o valor da primeira regra (em ordem de
+    prioridade) cujas palavras exigidas aparecem em 'minusculas' e que
+    extrai algo de 'descricao'.
+    """
+    for _, _, palavras, regra in regras:
+        for palavra in palavras:
+            if palavra not in minusculas:
+                break
+        else:
+            valor = regra(descricao)
+            if valor is not None:
+                return valor
+    return padrao
+
+@lru_cache(maxsize=TAMANHO_CACHE)
+def pontuacao_esfera(descricao):
+    """
+    Moeda (R$, U$, Eu$) e pontuação ('x' se não identificada) de uma
+    descrição da Esfera.
+
+    Returns:
+        tuple: (moeda, pontuacao).
+    """
+    minusculas = descricao.lower()
+    moeda = "R$"
+    for _, palavra, moeda_palavra in MOEDAS_ESFERA:
+        if palavra in minusculas:
+            moeda = moeda_palavra
+            break
+    return moeda, aplicar_regras(REGRAS_ESFERA, descricao, minusculas, "x")
+
+# ---------------------------------------------------------------------------
+# Livelo: valor base em dinheiro e valores "até N" / "= N" conforme o contexto
+# ---------------------------------------------------------------------------
+
+def contexto_na_linha(padrao, descricao, posicao):
+    """
+    Indica se 'padrao' ocorre a partir de 'posicao' sem quebra de linha no
+    caminho: o mesmo que a antecipação (?=.*padrao), mas avaliada só nos
+    candidatos "até N" / "= N" e com uma busca direta, sem o retrocesso de .*.
+    """
+    encontrado = padrao.search(descricao, posicao)
+    return encontrado is not None and "\n" not in descricao[posicao:encontrado.start()]
+
+# (prioridade, campo, contexto exigido depois do valor, contexto proibido depois do valor)
+REGRAS_LIVELO = sorted([
+    (1, "pontuacao_clube", NO_CLUBE_LIVELO, None),
+    (2, "pontuacao", PONTOS_LIVELO, NO_CLUBE),
+], key=lambda regra: regra[0])
+
+@lru_cache(maxsize=TAMANHO_CACHE)
+def pontuacao_livelo(descricao):
+    """
+    Moeda (R$ ou U$), pontuação normal e pontuação no Clube Livelo ('x' se não
+    identificadas) de uma descrição da Livelo. As pontuações são o primeiro
+    valor "até N" / "= N" com o contexto da regra, dividido pelo valor em dinheiro.
+
+    Returns:
+        tuple: (moeda, pontuacao, pontuacao_clube).
+    """
+    moeda = ""
+    base = 1.0
+    encontrado = MOEDA_VALOR.search(descricao)
+    if encontrado:
+        moeda = encontrado.group(1)
+        base = numero(encontrado.group(2))
+
+    valores = {"pontuacao": "x", "pontuacao_clube": "x"}
+    candidatos = list(VALOR_ATE.finditer(descricao))
+    for _, campo, exigido, proibido in REGRAS_LIVELO:
+        for candidato in candidatos:
+            fim = candidato.end()
+            if not contexto_na_linha(exigido, descricao, fim):
+                continue
+            if proibido is not None and contexto_na_linha(proibido, descricao, fim):
+                continue
+            valores[campo] = round(numero(candidato.group(1)) / base, 3)
+            break
+    return moeda, valores["pontuacao"], valores["pontuacao_clube"]
+
+# A partir desta quantidade de descrições, a interpretação usa o lote
+# vetorizado com pandas (regras_lote), como nos reprocessamentos
+MINIMO_LOTE = int(os.getenv("REGRAS_MINIMO_LOTE", "2000"))
+
+def pontuacoes_esfera(descricoes):
+    """
+    pontuacao_esfera de várias descrições; em lote a partir de MINIMO_LOTE.
+    """
+    if len(descricoes) >= MINIMO_LOTE:
+        import regras_lote  # pandas só é carregado quando necessário
+        return regras_lote.pontuacoes_esfera(descricoes)
+    return [pontuacao_esfera(descricao) for descricao in descricoes]
+
+def pontuacoes_livelo(descricoes):
+    """
+    pontuacao_livelo de várias descrições; em lote a partir de MINIMO_LOTE.
+    """
+    if len(descricoes) >= MINIMO_LOTE:
+        import regras_lote  # pandas só é carregado quando necessário
+        return regras_lote.pontuacoes_livelo(descricoes)
+    return [pontuacao_livelo(descricao) for descricao in descricoes]
+
+# ---------------------------------------------------------------------------
+# Implementações anteriores (if-chain e antecipações com .*), mantidas como
+# referência para o corpus e o benchmark
+# ---------------------------------------------------------------------------
+
+def referencia_esfera(descricao):
+    moeda = "R$"
+    pontuacao = "x"
+    if "real" in descricao.lower():
+        moeda = "R$"
+    elif "dólar" in descricao.lower():
+        moeda = "U$"
+    elif "euro" in descricao.lower():
+        moeda = "Eu$"
+    if "a cada" in descricao.lower() and "reais" in descricao.lower():
+        numerador = re.search(r'(\d+,\d+|\d+)\s?pt', descricao)
+        denominador = re.search(r'(\d+,\d+|\d+)\s?reais', descricao)
+        if numerador and denominador:
+            numerador_value = numerador.group(1).replace(',', '.')
+            denominador_value = denominador.group(1).replace(',', '.')
+            try:
+                divisao = float(numerador_value) / float(denominador_value)
+                return moeda, str(divisao)
+            except ZeroDivisionError:
+                return moeda, "0"
+    if "de" in descricao.lower() and "a" in descricao.lower():
+        valores = re.findall(r'\d+,\d+|\d+', descricao)
+        if valores:
+            return moeda, max(valores, key=lambda x: float(x.replace(',', '.')))
+    pontuacao_match = re.search(r'(\d+,\d+|\d+)\s?(pt|pts)', descricao)
+    if pontuacao_match:
+        return moeda, pontuacao_match.group(1)
+    return moeda, pontuacao
+
+def referencia_livelo(descricao):
+    moeda = ""
+    base_money = 1.0
+    pontuacao = "x"
+    pontuacao_clube = "x"
+    match_moeda = re.search(r"(R\$|U\$)\s*(\d+(?:,\d+)?)", descricao)
+    if match_moeda:
+        moeda = match_moeda.group(1)
+        base_money = float(match_moeda.group(2).replace(",", "."))
+    match_clube = re.search(r"(?:até|=)\s*(\d+(?:,\d+)?)(?=.*no Clube Livelo)", descricao, re.IGNORECASE)
+    if match_clube:
+        pontuacao_clube = round(float(match_clube.group(1).replace(",", ".")) / base_money, 3)
+    match_normal = re.search(r"(?:até|=)\s*(\d+(?:,\d+)?)(?=.*Pontos?\s+Livelo)(?!.*no Clube)",
+                             descricao, re.IGNORECASE)
+    if match_normal:
+        pontuacao = round(float(match_normal.group(1).replace(",", ".")) / base_money, 3)
+    return moeda, pontuacao, pontuacao_clube
+
+# Programas: nome -> (motor, implementação de referência)
+PROGRAMAS = {
+    "esf": (pontuacao_esfera, referencia_esfera),
+    "liv": (pontuacao_livelo, referencia_livelo),
+}
+
+def limpar_cache():
+    pontuacao_esfera.cache_clear()
+    pontuacao_livelo.cache_clear()
+
+def carregar_corpus(caminho=CAMINHO_CORPUS):
+    """
+    Returns:
+        list of dict: Itens com programa, descricao e esperado.
+    """
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+def conferir(caminho=CAMINHO_CORPUS, aleatorias=2000):
+    """
+    Confere o motor contra o corpus e, em descrições aleatórias montadas com
+    trechos do corpus, contra as implementações de referência.
+
+    Returns:
+        int: Quantidade de divergências.
+    """
+    corpus = carregar_corpus(caminho)
+    divergencias = 0
+    for item in corpus:
+        motor, _ = PROGRAMAS[item["programa"]]
+        obtido = list(motor(item["descricao"]))
+        if obtido != item["esperado"]:
+            divergencias += 1
+            print(f"[ERROR] {item['programa']}: {item['descricao']!r}: esperado {item['esperado']}, obtido {obtido}")
+    print(f"[INFO] Corpus: {len(corpus) - divergencias}/{len(corpus)} descrições conferem.")
+
+    sorteio = random.Random(0)
+    for programa, (motor, referencia) in PROGRAMAS.items():
+        trechos = [parte for item in corpus if item["programa"] == programa
+                   for parte in re.split(r"(\s+)", item["descricao"])]
+        diferentes = 0
+        for _ in range(aleatorias):
+            descricao = "".join(sorteio.choice(trechos) for _ in range(sorteio.randint(1, 16)))
+            try:
+                esperado = referencia(descricao)
+            except ZeroDivisionError:
+                continue
+            if motor(descricao) != esperado:
+                diferentes += 1
+                print(f"[ERROR] {programa}: {descricao!r}: referência {esperado}, motor {motor(descricao)}")
+        divergencias += diferentes
+        print(f"[INFO] {programa}: {aleatorias - diferentes}/{aleatorias} descrições aleatórias conferem.")
+    return divergencias
+
+def benchmark(caminho=CAMINHO_CORPUS, repeticoes=200):
+    """
+    Mede descrições/s das implementações de referência e do motor, com o cache
+    vazio a cada rodada (só pré-compilação e tabela de regras) e com o cache
+    quente, no corpus e em descrições longas (cada uma repetida 50 vezes).
+    """
+    corpus = carregar_corpus(caminho)
+    for programa, (motor, referencia) in PROGRAMAS.items():
+        curtas = [item["descricao"] for item in corpus if item["programa"] == programa]
+        longas = [" ".join([descricao] * 50) for descricao in curtas]
+        for rotulo, descricoes, vezes in (("corpus", curtas, repeticoes), ("longas", longas, max(1, repeticoes // 50))):
+            total = len(descricoes) * vezes
+
+            def medir(funcao, limpar):
+                inicio = time.perf_counter()
+                for _ in range(vezes):
+                    if limpar:
+                        limpar_cache()
+                    for descricao in descricoes:
+                        funcao(descricao)
+                return total / (time.perf_counter() - inicio)
+
+            base = medir(referencia, False)
+            frio = medir(motor, True)
+            quente = medir(motor, False)
+            print(f"[INFO] {programa}, {rotulo} ({len(descricoes)} descrições x {vezes}):")
+            print(f"  referência          {base:12,.0f} descrições/s")
+            print(f"  motor, cache frio   {frio:12,.0f} descrições/s ({frio / base:.1f}x)")
+            print(f"  motor, cache quente {quente:12,.0f} descrições/s ({quente / base:.1f}x)")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("conferir", "benchmark"):
+        print("Uso: python regras_pontuacao.py {conferir|benchmark} [corpus.json]")
+        sys.exit(1)
+    argumentos = sys.argv[2:3]
+    if sys.argv[1] == "conferir":
+        sys.exit(1 if conferir(*argumentos) else 0)
+    benchmark(*argumentos)
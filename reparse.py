@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import time
+import bisect
+import argparse
+import importlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import mysql.connector
+import arquivo_paginas
+import banco
+import coleta_http
+import historico
+import rotulos
+
+# Reprocessa o arquivo de páginas (arquivo_paginas) com os parsers atuais e
+# reescreve as colunas derivadas das linhas de pontuação já gravadas, sem
+# navegador e sem rede. Ex.: python reparse.py esf liv --desde "2025-01-01"
+
+# Programa -> (módulo do bot, módulo com cards_do_html/cards_de_json)
+PROGRAMAS = {
+    "esf": ("esf", "grade_esfera"),
+    "liv": ("liv", "liv"),
+}
+
+FORMATO_DATA_HORA = "%Y-%m-%d %H:%M:%S"
+
+# Uma página pertence à primeira coleta gravada depois dela, se gravada até
+# JANELA minutos depois (páginas de execuções que não gravaram são ignoradas)
+JANELA = timedelta(minutes=float(os.getenv("REPARSE_JANELA_MINUTOS", "30")))
+
+# Coletas reescritas (e com commit) de cada vez
+TAMANHO_BLOCO = int(os.getenv("REPARSE_TAMANHO_BLOCO", "20"))
+
+def cards_da_pagina(programa, entrada):
+    """
+    Cards de uma página arquivada: o HTML e os JSON embutidos nele (ou o JSON
+    da API), como na coleta via HTTP; fica o candidato com mais cards.
+    """
+    modulo_cards = importlib.import_module(PROGRAMAS[programa][1])
+    texto = arquivo_paginas.ler(entrada)
+    if entrada["tipo"] == "json":
+        candidatos = [modulo_cards.cards_de_json(json.loads(texto))]
+    else:
+        candidatos = [modulo_cards.cards_do_html(texto)]
+        candidatos += [modulo_cards.cards_de_json(bloco) for bloco in coleta_http.jsons_embutidos(texto)]
+    return max(candidatos, key=len, default=[])
+
+def interpretar_coleta(tarefa):
+    """
+    Executada nos processos do pool: interpreta a página mais recente da
+    coleta que tenha cards (a que foi usada na gravação), sem o cache de cards.
+
+    Args:
+        tarefa (tuple): (programa, data_hora_coleta, entradas do índice em ordem de obtenção).
+
+    Returns:
+        tuple: (programa, data_hora_coleta, hash da página ou None,
+        lista de (nome, valores derivados) na ordem dos cards).
+    """
+    programa, data_hora_coleta, paginas = tarefa
+    modulo = importlib.import_module(PROGRAMAS[programa][0])
+    for entrada in reversed(paginas):
+        try:
+            cards = cards_da_pagina(programa, entrada)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"[WARN] Página {entrada['hash'][:12]} de '{entrada['fonte']}' ilegível: {e}")
+            continue
+        if cards:
+            parceiros = modulo.interpretar(cards, usar_cache=False)
+            return programa, data_hora_coleta, entrada["hash"], [
+                (parceiro["nome"], modulo.valores_derivados(parceiro)) for parceiro in parceiros
+            ]
+    return programa, data_hora_coleta, None, []
+
+def coletas_gravadas(connection, table_pontuacao, desde=None):
+    """
+    Carimbos (data_hora_coleta) das coletas gravadas, em ordem.
+    """
+    cursor = connection.cursor()
+    if desde:
+        cursor.execute(f"SELECT DISTINCT data_hora_coleta FROM {table_pontuacao} "
+                       f"WHERE data_hora_coleta >= %s ORDER BY data_hora_coleta", (desde,))
+    else:
+        cursor.execute(f"SELECT DISTINCT data_hora_coleta FROM {table_pontuacao} ORDER BY data_hora_coleta")
+    return [data_hora for (data_hora,) in cursor.fetchall()]
+
+def agrupar_paginas(programa, coletas, desde=None):
+    """
+    Associa cada página arquivada do programa à coleta que ela gerou.
+
+    Returns:
+        list of tuple: Tarefas (programa, data_hora_coleta, entradas) em ordem de coleta.
+    """
+    grupos = {}
+    for entrada in arquivo_paginas.entradas([programa], desde):
+        instante = datetime.strptime(entrada["data_hora"], FORMATO_DATA_HORA)
+        posicao = bisect.bisect_left(coletas, instante)
+        if posicao == len(coletas) or coletas[posicao] - instante > JANELA:
+            continue
+        grupos.setdefault(coletas[posicao], []).append(entrada)
+    return [(programa, coleta, grupos[coleta]) for coleta in sorted(grupos)]
+
+def interpretar_em_paralelo(tarefas, processos):
+    """
+    Interpreta as coletas num pool de processos, devolvendo os resultados em
+    ordem e mantendo poucas tarefas em andamento (as páginas são lidas do
+    disco pelos processos, à medida que o gravador consome os resultados).
+
+    Yields:
+        tuple: Resultados de interpretar_coleta.
+    """
+    processos = processos or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        em_andamento = deque()
+        for tarefa in tarefas:
+            em_andamento.append(executor.submit(interpretar_coleta, tarefa))
+            if len(em_andamento) >= 2 * processos:
+                yield em_andamento.popleft().result()
+        while em_andamento:
+            yield em_andamento.popleft().result()
+
+def atualizar_linhas(connection, table_pontuacao, colunas, mudancas):
+    """
+    Reescreve as colunas das linhas informadas com um UPDATE ... CASE por lote
+    de rotulos.TAMANHO_LOTE linhas. Não faz commit.
+
+    Args:
+        mudancas (list of tuple): (id da linha, valores na ordem de 'colunas').
+    """
+    cursor = connection.cursor()
+    for i in range(0, len(mudancas), rotulos.TAMANHO_LOTE):
+        lote = mudancas[i:i + rotulos.TAMANHO_LOTE]
+        casos = " ".join(["WHEN %s THEN %s"] * len(lote))
+        atribuicoes = ", ".join(f"{coluna} = CASE id {casos} ELSE {coluna} END" for coluna in colunas)
+        parametros = [
+            valor for posicao in range(len(colunas)) for linha_id, valores in lote
+            for valor in (linha_id, valores[posicao])
+        ]
+        parametros += [linha_id for linha_id, _ in lote]
+        cursor.execute(f"""
+            UPDATE {table_pontuacao}
+            SET {atribuicoes}
+            WHERE id IN ({", ".join(["%s"] * len(lote))})
+        """, parametros)
+
+def reescrever_bloco(connection, table_pontuacao, resultados, empresas, simular):
+    """
+    Compara os valores reinterpretados de um bloco de coletas com as linhas
+    gravadas (mesma empresa e data_hora_coleta, na ordem dos cards) e reescreve
+    só as que mudaram, com um commit por bloco.
+
+    Returns:
+        tuple: (linhas comparadas, linhas alteradas, cards de empresas desconhecidas).
+    """
+    resultados = [resultado for resultado in resultados if resultado[3]]
+    if not resultados:
+        return 0, 0, 0
+    colunas = tuple(resultados[0][3][0][1])
+
+    cursor = connection.cursor()
+    carimbos = [data_hora_coleta for _, data_hora_coleta, _, _ in resultados]
+    cursor.execute(f"""
+        SELECT id, empresa_id, data_hora_coleta, {", ".join(colunas)}
+        FROM {table_pontuacao}
+        WHERE data_hora_coleta IN ({", ".join(["%s"] * len(carimbos))})
+        ORDER BY id
+    """, carimbos)
+    gravadas = {}
+    for linha in cursor.fetchall():
+        gravadas.setdefault((linha[1], linha[2]), []).append((linha[0], linha[3:]))
+
+    comparadas = 0
+    desconhecidas = 0
+    mudancas = []
+    for _, data_hora_coleta, _, parceiros in resultados:
+        novas = {}
+        for nome, valores in parceiros:
+            if nome not in empresas:
+                desconhecidas += 1
+                continue
+            novas.setdefault(empresas[nome], []).append(tuple(valores[coluna] for coluna in colunas))
+        for empresa_id, valores_empresa in novas.items():
+            # No modo "só mudanças" a coleta pode não ter linha da empresa
+            for (linha_id, atuais), valores in zip(gravadas.get((empresa_id, data_hora_coleta), []), valores_empresa):
+                comparadas += 1
+                if not all(historico.mesmo_valor(novo, atual) for novo, atual in zip(valores, atuais)):
+                    mudancas.append((linha_id, valores))
+
+    if mudancas and not simular:
+        try:
+            atualizar_linhas(connection, table_pontuacao, colunas, mudancas)
+            connection.commit()
+        except mysql.connector.Error:
+            connection.rollback()
+            raise
+    return comparadas, len(mudancas), desconhecidas
+
+def reprocessar(connection, programa, processos=None, desde=None, simular=False):
+    """
+    Reprocessa as páginas arquivadas de um programa ('esf' ou 'liv') e
+    reescreve as linhas de pontuação que mudaram; se alguma mudou, recalcula
+    os agregados e as labels.
+
+    Returns:
+        int: Quantidade de linhas alteradas (ou que seriam, com simular=True).
+    """
+    inicio = time.perf_counter()
+    env_empresas, env_pontuacao = rotulos.PROGRAMAS[programa]
+    table_empresas = rotulos.get_env_var(env_empresas)
+    table_pontuacao = rotulos.get_env_var(env_pontuacao)
+
+    tarefas = agrupar_paginas(programa, coletas_gravadas(connection, table_pontuacao, desde), desde)
+    print(f"[INFO] {len(tarefas)} coleta(s) de '{programa}' com páginas no arquivo.")
+    if not tarefas:
+        return 0
+
+    # Só associa às empresas existentes; o reprocessamento não cria empresas
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT nome, id FROM {table_empresas}")
+    empresas = dict(cursor.fetchall())
+
+    totais = [0, 0, 0]
+    sem_pagina = 0
+    bloco = []
+    for resultado in interpretar_em_paralelo(tarefas, processos):
+        if resultado[2] is None:
+            sem_pagina += 1
+        bloco.append(resultado)
+        if len(bloco) >= TAMANHO_BLOCO:
+            totais = [a + b for a, b in zip(totais, reescrever_bloco(connection, table_pontuacao, bloco, empresas, simular))]
+            bloco = []
+    totais = [a + b for a, b in zip(totais, reescrever_bloco(connection, table_pontuacao, bloco, empresas, simular))]
+    comparadas, alteradas, desconhecidas = totais
+
+    acao = "seriam reescritas" if simular else "reescritas"
+    print(f"[INFO] '{programa}': {comparadas} linhas comparadas, {alteradas} {acao} "
+          f"em {time.perf_counter() - inicio:.2f}s.")
+    if sem_pagina:
+        print(f"[WARN] '{programa}': {sem_pagina} coleta(s) sem página legível com cards.")
+    if desconhecidas:
+        print(f"[WARN] '{programa}': {desconhecidas} cards de empresas que não estão em {table_empresas} ignorados.")
+
+    if alteradas and not simular:
+        rotulos.recalcular_labels(connection, programa)
+    return alteradas
+
+def main(argumentos):
+    parser = argparse.ArgumentParser(
+        description="Reprocessa o arquivo de páginas com os parsers atuais e reescreve as linhas derivadas."
+    )
+    parser.add_argument("programas", nargs="+", choices=sorted(PROGRAMAS), help="Programas a reprocessar.")
+    parser.add_argument("--processos", type=int, default=None,
+                        help="Processos do pool de interpretação (padrão: um por CPU).")
+    parser.add_argument("--desde", default=None, help="Só coletas a partir deste horário ('AAAA-MM-DD[ HH:MM:SS]').")
+    parser.add_argument("--simular", action="store_true", help="Só conta as linhas que mudariam, sem gravar.")
+    opcoes = parser.parse_args(argumentos)
+
+    if not arquivo_paginas.arquivo_ativo():
+        print("[ERROR] Arquivo de páginas desativado; informe a pasta em MILOG_ARQUIVO.")
+        return 1
+    try:
+        connection = banco.conectar()
+    except mysql.connector.Error as err:
+        print(f"[ERROR] Não foi possível conectar ao banco de dados: {err}")
+        return 1
+    try:
+        for programa in opcoes.programas:
+            reprocessar(connection, programa, opcoes.processos, opcoes.desde, opcoes.simular)
+    finally:
+        connection.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
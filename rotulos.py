@@ -0,0 +1,434 @@
+import os
+import sys
+import json
+import time
+import importlib
+import mysql.connector
+import banco
+import metricas
+
+# Variáveis de ambiente com os nomes das tabelas de cada programa
+PROGRAMAS = {
+    "esf": ("TABLE_EMPRESAS_ESF", "TABLE_PONTUACAO_ESF"),
+    "liv": ("TABLE_EMPRESAS_LIV", "TABLE_PONTUACAO_LIV"),
+}
+
+# Quantidade máxima de linhas por comando em lote (upsert de agregados, UPDATE ... CASE)
+TAMANHO_LOTE = 500
+
+# Quantas coletas cada linha do histórico representa. No modo de gravação
+# completo é sempre 1; no modo "só mudanças" cada coleta que repete a linha
+# soma 1 em vezes_vista (historico.marcar_vistas), seja qual for o intervalo
+# entre as coletas (várias no mesmo dia ou dias sem coleta).
+SQL_PESO_LINHA = "COALESCE(vezes_vista, 1)"
+
+def get_env_var(var_name: str) -> str:
+    """
+    Lê a variável de ambiente 'var_name'.
+    Se não estiver definida, gera um erro (ValueError).
+    """
+    value = os.getenv(var_name)
+    if not value:
+        raise ValueError(f"A variável de ambiente '{var_name}' não está definida!")
+    return value
+
+def conectar_banco():
+    """
+    Conecta ao banco de dados MySQL e retorna o objeto de conexão.
+    """
+    try:
+        connection = banco.conectar()  # Com novas tentativas em falhas transitórias
+        if connection.is_connected():
+            print("[INFO] Conectado ao banco de dados.")
+            return connection
+    except mysql.connector.Error as err:
+        print(f"[ERROR] Não foi possível conectar ao banco de dados: {err}")
+        return None
+
+def nome_tabela_agregados(table_pontuacao):
+    """
+    Retorna o nome da tabela de agregados associada à tabela de pontuação.
+    """
+    return f"{table_pontuacao}_agregados"
+
+def criar_tabela_agregados(connection, table_pontuacao):
+    """
+    Cria a tabela de agregados por empresa caso ela não exista.
+    Cada linha guarda o histograma de pontuações (valor -> frequência),
+    o mínimo, o máximo e o último valor coletado da empresa.
+    """
+    table_agregados = nome_tabela_agregados(table_pontuacao)
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_agregados} (
+            empresa_id INT PRIMARY KEY,
+            histograma JSON NOT NULL,
+            minimo DOUBLE,
+            maximo DOUBLE,
+            ultimo DOUBLE,
+            total INT NOT NULL DEFAULT 0
+        );
+        """)
+        connection.commit()
+        print(f"[INFO] Tabela '{table_agregados}' criada ou já existente.")
+    except mysql.connector.Error as err:
+        print(f"[ERROR] Não foi possível criar a tabela de agregados: {err}")
+
+def normalizar_pontuacao(valor):
+    """
+    Converte a pontuação para o valor que o MySQL devolve de uma coluna FLOAT
+    (6 dígitos significativos), para que o agregado incremental use as mesmas
+    chaves que a leitura do histórico bruto. Valores não numéricos viram 0.0.
+    """
+    try:
+        return float(f"{float(valor):.6g}")
+    except (TypeError, ValueError):
+        return 0.0
+
+def novo_agregado():
+    """
+    Retorna um agregado vazio.
+    """
+    return {"histograma": {}, "minimo": None, "maximo": None, "ultimo": None, "total": 0}
+
+def agregar(agregado, valor, peso=1):
+    """
+    Acumula uma nova pontuação no agregado (O(1)).
+
+    Args:
+        agregado (dict): Agregado da empresa.
+        valor (float): Pontuação já normalizada.
+        peso (int): Quantas coletas o valor representa (ver SQL_PESO_LINHA).
+    """
+    histograma = agregado["histograma"]
+    histograma[valor] = histograma.get(valor, 0) + peso
+    agregado["minimo"] = valor if agregado["minimo"] is None else min(agregado["minimo"], valor)
+    agregado["maximo"] = valor if agregado["maximo"] is None else max(agregado["maximo"], valor)
+    agregado["ultimo"] = valor
+    agregado["total"] += peso
+    return agregado
+
+def calcular_moda_histograma(histograma):
+    """
+    Calcula a moda a partir do histograma de pontuações.
+
+    Returns:
+        float: Moda do histograma. Se houver múltiplas modas, retorna a maior.
+    """
+    if not histograma:
+        return 0
+
+    max_freq = max(histograma.values())
+    return max(pont for pont, freq in histograma.items() if freq == max_freq)
+
+def calcular_label_agregado(agregado):
+    """
+    Calcula a label de pontuação a partir do agregado da empresa.
+    Reproduz exatamente a regra de calcular_label_pontuacao de esf.py/liv.py,
+    sem precisar do histórico completo.
+
+    Returns:
+        str: Label da pontuação.
+    """
+    if not agregado or not agregado["total"]:
+        return "Sem Dados"
+
+    min_val = agregado["minimo"]
+    max_val = agregado["maximo"]
+    mode_val = calcular_moda_histograma(agregado["histograma"])
+    last_val = agregado["ultimo"]
+
+    # Definindo os thresholds
+    excellent_threshold = mode_val * 2
+    good_threshold = mode_val
+    poor_threshold = mode_val / 2
+
+    # Determinando a label
+    if max_val <= 0 or min_val == max_val:
+        return "Pontuação Normal"
+
+    if last_val > excellent_threshold:
+        return "Ótima Pontuação"
+    elif good_threshold < last_val <= excellent_threshold:
+        return "Boa Pontuação"
+    elif last_val == mode_val:
+        return "Pontuação Normal"
+    elif poor_threshold <= last_val < good_threshold:
+        return "Pouco Abaixo do Normal"
+    else:
+        return "Má Pontuação"
+
+def carregar_agregados(connection, table_pontuacao, empresa_ids):
+    """
+    Carrega os agregados das empresas informadas com uma única consulta.
+
+    Returns:
+        dict: empresa_id -> agregado. Empresas sem agregado ficam de fora.
+    """
+    empresa_ids = list(set(empresa_ids))
+    if not empresa_ids:
+        return {}
+
+    table_agregados = nome_tabela_agregados(table_pontuacao)
+    marcadores = ", ".join(["%s"] * len(empresa_ids))
+
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT empresa_id, histograma, minimo, maximo, ultimo, total
+        FROM {table_agregados} WHERE empresa_id IN ({marcadores})
+    """, empresa_ids)
+
+    agregados = {}
+    for empresa_id, histograma, minimo, maximo, ultimo, total in cursor.fetchall():
+        agregados[empresa_id] = {
+            "histograma": {valor: freq for valor, freq in json.loads(histograma)},
+            "minimo": minimo,
+            "maximo": maximo,
+            "ultimo": ultimo,
+            "total": total,
+        }
+    return agregados
+
+def salvar_agregados(connection, table_pontuacao, agregados):
+    """
+    Grava (upsert) os agregados informados. Não faz commit.
+    """
+    if not agregados:
+        return
+
+    table_agregados = nome_tabela_agregados(table_pontuacao)
+    linhas = [
+        (
+            empresa_id,
+            json.dumps(list(agregado["histograma"].items())),
+            agregado["minimo"],
+            agregado["maximo"],
+            agregado["ultimo"],
+            agregado["total"],
+        )
+        for empresa_id, agregado in agregados.items()
+    ]
+
+    cursor = connection.cursor()
+    for i in range(0, len(linhas), TAMANHO_LOTE):
+        cursor.executemany(f"""
+            INSERT INTO {table_agregados} (empresa_id, histograma, minimo, maximo, ultimo, total)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE histograma = VALUES(histograma), minimo = VALUES(minimo),
+                maximo = VALUES(maximo), ultimo = VALUES(ultimo), total = VALUES(total)
+        """, linhas[i:i + TAMANHO_LOTE])
+
+def gravar_labels(connection, table_empresas, labels):
+    """
+    Grava as labels com um único UPDATE ... CASE por lote de TAMANHO_LOTE
+    empresas, em vez de um UPDATE por empresa. Não faz commit.
+
+    Args:
+        labels (dict): empresa_id -> label.
+    """
+    itens = list(labels.items())
+    cursor = connection.cursor()
+    for i in range(0, len(itens), TAMANHO_LOTE):
+        lote = itens[i:i + TAMANHO_LOTE]
+        casos = " ".join(["WHEN %s THEN %s"] * len(lote))
+        marcadores = ", ".join(["%s"] * len(lote))
+        parametros = [valor for item in lote for valor in item] + [empresa_id for empresa_id, _ in lote]
+        cursor.execute(f"""
+            UPDATE {table_empresas}
+            SET label_pontuacao = CASE id {casos} ELSE label_pontuacao END
+            WHERE id IN ({marcadores})
+        """, parametros)
+
+def agregados_do_historico(connection, table_pontuacao, empresa_ids=None):
+    """
+    Monta os agregados a partir do histórico bruto da tabela de pontuação,
+    em uma única varredura ordenada por empresa e data de coleta.
+
+    Args:
+        empresa_ids (list of int, opcional): Restringe a varredura a essas empresas.
+
+    Returns:
+        dict: empresa_id -> agregado.
+    """
+    filtro = ""
+    parametros = ()
+    if empresa_ids is not None:
+        empresa_ids = list(set(empresa_ids))
+        if not empresa_ids:
+            return {}
+        filtro = f"WHERE empresa_id IN ({', '.join(['%s'] * len(empresa_ids))})"
+        parametros = tuple(empresa_ids)
+
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT empresa_id, pontuacao, {SQL_PESO_LINHA} FROM {table_pontuacao}
+        {filtro}
+        ORDER BY empresa_id, data_hora_coleta ASC, id ASC
+    """, parametros)
+
+    agregados = {}
+    for empresa_id, pontuacao, peso in cursor:
+        if empresa_id is None or pontuacao is None:
+            continue
+        agregado = agregados.setdefault(empresa_id, novo_agregado())
+        agregar(agregado, normalizar_pontuacao(pontuacao), int(peso))
+    return agregados
+
+def atualizar_labels(connection, table_pontuacao, table_empresas, novas_pontuacoes):
+    """
+    Atualiza os agregados e a label_pontuacao das empresas da execução,
+    sem reler o histórico completo. Empresas ainda sem agregado (primeira
+    execução após a implantação) têm o agregado montado a partir do histórico,
+    que já inclui as linhas recém-inseridas. Não faz commit.
+
+    Args:
+        novas_pontuacoes (list of tuple): Pares (empresa_id, pontuacao) na ordem de inserção.
+
+    Returns:
+        dict: empresa_id -> label calculada.
+    """
+    inicio = time.perf_counter()
+    empresa_ids = [empresa_id for empresa_id, _ in novas_pontuacoes]
+    agregados = carregar_agregados(connection, table_pontuacao, empresa_ids)
+
+    sem_agregado = set(empresa_ids) - set(agregados)
+    if sem_agregado:
+        print(f"[INFO] Montando agregados a partir do histórico para {len(sem_agregado)} empresa(s).")
+        agregados.update(agregados_do_historico(connection, table_pontuacao, sem_agregado))
+
+    for empresa_id, pontuacao in novas_pontuacoes:
+        if empresa_id not in sem_agregado:
+            agregar(agregados[empresa_id], normalizar_pontuacao(pontuacao))
+
+    salvar_agregados(connection, table_pontuacao, agregados)
+
+    labels = {empresa_id: calcular_label_agregado(agregados.get(empresa_id)) for empresa_id in set(empresa_ids)}
+    gravar_labels(connection, table_empresas, labels)
+    metricas.registrar(f"rotulos.{table_pontuacao}", time.perf_counter() - inicio)
+    print(f"[INFO] label_pontuacao atualizado para {len(labels)} empresa(s).")
+    return labels
+
+def reconstruir_agregados(connection, programa):
+    """
+    Regenera todos os agregados do programa ('esf' ou 'liv') a partir do
+    histórico bruto e faz o commit.
+    """
+    env_empresas, env_pontuacao = PROGRAMAS[programa]
+    table_empresas = get_env_var(env_empresas)
+    table_pontuacao = get_env_var(env_pontuacao)
+    table_agregados = nome_tabela_agregados(table_pontuacao)
+
+    import migracoes  # import local: migracoes depende deste módulo
+    migracoes.aplicar_migracoes(connection, table_empresas, table_pontuacao)
+    agregados = agregados_do_historico(connection, table_pontuacao)
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"DELETE FROM {table_agregados}")
+        salvar_agregados(connection, table_pontuacao, agregados)
+        connection.commit()
+        print(f"[INFO] Agregados de '{programa}' reconstruídos para {len(agregados)} empresa(s).")
+    except mysql.connector.Error as err:
+        connection.rollback()
+        print(f"[ERROR] Erro ao reconstruir os agregados de '{programa}': {err}")
+
+def recalcular_labels(connection, programa):
+    """
+    Recalcula a label_pontuacao de todas as empresas do programa em uma única
+    passada: uma varredura do histórico (que também regenera os agregados) e
+    um UPDATE ... CASE em lote. Empresas sem histórico recebem 'Sem Dados'.
+    Útil após mudanças de thresholds ou backfills.
+    """
+    env_empresas, env_pontuacao = PROGRAMAS[programa]
+    table_empresas = get_env_var(env_empresas)
+    table_pontuacao = get_env_var(env_pontuacao)
+    table_agregados = nome_tabela_agregados(table_pontuacao)
+
+    inicio = time.perf_counter()
+    import migracoes  # import local: migracoes depende deste módulo
+    migracoes.aplicar_migracoes(connection, table_empresas, table_pontuacao)
+    agregados = agregados_do_historico(connection, table_pontuacao)
+
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT id FROM {table_empresas}")
+    labels = {empresa_id: calcular_label_agregado(agregados.get(empresa_id)) for (empresa_id,) in cursor.fetchall()}
+
+    try:
+        cursor.execute(f"DELETE FROM {table_agregados}")
+        salvar_agregados(connection, table_pontuacao, agregados)
+        gravar_labels(connection, table_empresas, labels)
+        connection.commit()
+        print(f"[INFO] Labels de '{programa}' recalculadas para {len(labels)} empresa(s) "
+              f"em {time.perf_counter() - inicio:.2f}s.")
+    except mysql.connector.Error as err:
+        connection.rollback()
+        print(f"[ERROR] Erro ao recalcular as labels de '{programa}': {err}")
+    return labels
+
+def verificar_labels(connection, programa):
+    """
+    Confere, empresa a empresa, se a label calculada em lote a partir dos
+    agregados é idêntica à de calcular_label_pontuacao do programa aplicada
+    ao histórico completo. Não grava nada.
+
+    Returns:
+        list of tuple: Divergências (empresa_id, label_lote, label_original).
+    """
+    _, env_pontuacao = PROGRAMAS[programa]
+    table_pontuacao = get_env_var(env_pontuacao)
+    calcular_label_pontuacao = importlib.import_module(programa).calcular_label_pontuacao
+
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT empresa_id, pontuacao, {SQL_PESO_LINHA} FROM {table_pontuacao}
+        ORDER BY empresa_id, data_hora_coleta ASC, id ASC
+    """)
+    historicos = {}
+    for empresa_id, pontuacao, peso in cursor:
+        if empresa_id is not None and pontuacao is not None:
+            historicos.setdefault(empresa_id, []).extend([pontuacao] * int(peso))
+
+    agregados = agregados_do_historico(connection, table_pontuacao)
+    divergencias = []
+    for empresa_id, pontuacoes in historicos.items():
+        label_lote = calcular_label_agregado(agregados.get(empresa_id))
+        label_original = calcular_label_pontuacao(pontuacoes)
+        if label_lote != label_original:
+            divergencias.append((empresa_id, label_lote, label_original))
+
+    if divergencias:
+        for empresa_id, label_lote, label_original in divergencias:
+            print(f"[ERROR] Empresa ID {empresa_id}: lote='{label_lote}', original='{label_original}'.")
+    else:
+        print(f"[INFO] Labels de '{programa}' idênticas para {len(historicos)} empresa(s).")
+    return divergencias
+
+# Subcomandos da linha de comando
+COMANDOS = {
+    "reconstruir": reconstruir_agregados,
+    "recalcular": recalcular_labels,
+    "verificar": verificar_labels,
+}
+
+def main(argumentos):
+    if len(argumentos) < 2 or argumentos[0] not in COMANDOS or any(p not in PROGRAMAS for p in argumentos[1:]):
+        print(f"Uso: python rotulos.py {{{'|'.join(COMANDOS)}}} {' '.join(f'[{p}]' for p in PROGRAMAS)}")
+        return 1
+
+    connection = conectar_banco()
+    if not connection:
+        return 1
+    falhou = False
+    try:
+        for programa in argumentos[1:]:
+            resultado = COMANDOS[argumentos[0]](connection, programa)
+            if argumentos[0] == "verificar" and resultado:
+                falhou = True
+    finally:
+        connection.close()
+    return 1 if falhou else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
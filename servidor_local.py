@@ -0,0 +1,63 @@
+import os
+import sys
+import gzip
+import mimetypes
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import coleta_http
+
+class ManipuladorRespostas(BaseHTTPRequestHandler):
+    """
+    Serve as respostas gravadas com MILOG_GRAVAR_RESPOSTAS: o arquivo é
+    escolhido pelo caminho + query da requisição (coleta_http.nome_arquivo_resposta).
+    Comprime com gzip quando o cliente aceita, como os servidores reais.
+    """
+    pasta = "."
+
+    def do_GET(self):
+        caminho = os.path.join(self.pasta, coleta_http.nome_arquivo_resposta(self.path))
+        if not os.path.isfile(caminho):
+            self.send_error(404, "Resposta não gravada")
+            return
+
+        with open(caminho, "rb") as arquivo:
+            corpo = arquivo.read()
+        inicio = corpo.lstrip()[:1]
+        if inicio in (b"{", b"["):
+            tipo = "application/json; charset=utf-8"
+        else:
+            tipo = mimetypes.guess_type(self.path.split("?")[0])[0] or "text/html"
+            tipo += "; charset=utf-8" if tipo.startswith("text/") else ""
+
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            corpo = gzip.compress(corpo)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+def iniciar(pasta, porta=0):
+    """
+    Sobe o servidor em uma thread e retorna (servidor, url_base). Com porta=0,
+    usa uma porta livre. Encerre com servidor.shutdown().
+    """
+    manipulador = type("Manipulador", (ManipuladorRespostas,), {"pasta": pasta})
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python servidor_local.py <pasta de respostas gravadas> [porta]")
+        sys.exit(1)
+    servidor, url = iniciar(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 8000)
+    print(f"[INFO] Servindo {sys.argv[1]} em {url} (Ctrl+C para sair).")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
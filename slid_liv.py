@@ -1,16 +1,21 @@
 import os  # ✅ Importação corrigida
+import sys
+import argparse
 import mysql.connector
-import time
+import banco
 from datetime import datetime
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import logging
 import json
 import re
+import hashlib
+import analise_html
+import coleta_http
+import espera
+import extracao
+import navegador
 
 # Configuração do logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -30,12 +35,7 @@ def conectar_banco():
     Conecta ao banco de dados MySQL e retorna o objeto de conexão.
     """
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),        # Host do banco de dados
-            database=os.getenv("DB_NAME"),    # Nome do banco de dados
-            user=os.getenv("DB_USER"),        # Usuário do banco de dados
-            password=os.getenv("DB_PASSWORD") # Senha do banco de dados
-        )
+        connection = banco.conectar()  # Com novas tentativas em falhas transitórias
         if connection.is_connected():
             logging.info("Conectado ao banco de dados.")
             return connection
@@ -43,52 +43,209 @@ def conectar_banco():
         logging.error(f"Não foi possível conectar ao banco de dados: {err}")
         return None
 
-def criar_tabela_banners(connection):
+def nomes_tabelas_banners():
     """
-    Cria a tabela no banco de dados caso ela não exista.
-    O nome da tabela é lido obrigatoriamente da variável de ambiente.
+    Retorna os nomes das tabelas normalizadas de banners, derivados do nome
+    lido da variável de ambiente TABLE_BANNERS_LIV (sem fallback). A tabela
+    com exatamente esse nome é a antiga tabela única, não mais gravada; suas
+    linhas são copiadas uma única vez com: python slid_liv.py --migrar-legado
     """
-    # Lê o nome da tabela (sem fallback)
     table_banners = get_env_var("TABLE_BANNERS_LIV")
+    return {
+        "conteudo": f"{table_banners}_conteudo",
+        "aparicoes": f"{table_banners}_aparicoes",
+        "snapshots": f"{table_banners}_snapshots",
+        "snapshot_itens": f"{table_banners}_snapshot_itens",
+    }
+
+def criar_tabela_banners(connection):
+    """
+    Cria as tabelas normalizadas de banners caso elas não existam:
+      - conteudo: cada banner distinto, uma única vez (chave: hash do conteúdo)
+      - aparicoes: intervalos em que cada banner esteve no ar
+      - snapshots: uma linha curta por coleta, com o hash do carrossel
+      - snapshot_itens: composição (ordem dos banners) de cada hash de carrossel
+    """
+    tabelas = nomes_tabelas_banners()
 
     try:
         cursor = connection.cursor()
-        create_table_query = f"""
-        CREATE TABLE IF NOT EXISTS {table_banners} (
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {tabelas["conteudo"]} (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            hash CHAR(64) NOT NULL UNIQUE,
+            textos JSON NOT NULL,
+            redirect_link VARCHAR(2083),
+            primeira_aparicao DATETIME NOT NULL,
+            INDEX idx_redirect_link (redirect_link(255))
+        );
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {tabelas["aparicoes"]} (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            banner_id INT NOT NULL,
+            inicio DATETIME NOT NULL,
+            fim DATETIME NULL, -- NULL enquanto o banner continua no ar
+            INDEX idx_banner_periodo (banner_id, inicio, fim),
+            INDEX idx_periodo (inicio, fim),
+            FOREIGN KEY (banner_id) REFERENCES {tabelas["conteudo"]}(id)
+        );
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {tabelas["snapshots"]} (
             id INT AUTO_INCREMENT PRIMARY KEY,
             datahora_coleta DATETIME NOT NULL,
-            banners JSON NOT NULL
+            hash_snapshot CHAR(64) NOT NULL,
+            INDEX idx_datahora (datahora_coleta)
+        );
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {tabelas["snapshot_itens"]} (
+            hash_snapshot CHAR(64) NOT NULL,
+            posicao INT NOT NULL,
+            banner_id INT NOT NULL,
+            PRIMARY KEY (hash_snapshot, posicao),
+            FOREIGN KEY (banner_id) REFERENCES {tabelas["conteudo"]}(id)
         );
-        """
-        cursor.execute(create_table_query)
+        """)
         connection.commit()
-        logging.info(f"Tabela '{table_banners}' criada ou já existente.")
+        logging.info(f"Tabelas de banners {sorted(tabelas.values())} criadas ou já existentes.")
     except mysql.connector.Error as err:
-        logging.error(f"Erro ao criar a tabela: {err}")
+        logging.error(f"Erro ao criar as tabelas de banners: {err}")
 
-def extrair_banners():
+def hash_banner(banner):
     """
-    Acessa a página principal da Livelo, extrai todos os textos dos banners,
-    incluindo títulos, subtítulos, textos adicionais, e links de redirecionamento,
-    retornando uma lista de dicionários.
+    Calcula o hash do conteúdo de um banner (textos + link de redirecionamento).
+    """
+    conteudo = json.dumps(
+        {"texts": banner["texts"], "redirect_link": banner["redirect_link"]},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+def deduplicar_banners(banners):
     """
-    url = "https://www.livelo.com.br/"
+    Remove banners repetidos dentro do mesmo snapshot (o carrossel Owl renderiza
+    'owl-item' clonados), preservando a ordem da primeira ocorrência.
+
+    Returns:
+        list of tuple: Pares (hash, banner).
+    """
+    vistos = set()
+    unicos = []
+    for banner in banners:
+        chave = hash_banner(banner)
+        if chave not in vistos:
+            vistos.add(chave)
+            unicos.append((chave, banner))
+    return unicos
+
+# Página principal da Livelo (sobrescrita por LIVELO_HOME_URL, ex.: servidor local de testes)
+URL_HOME = coleta_http.url_configurada("LIVELO_HOME_URL", "https://www.livelo.com.br/")
+
+# Classe exata da div do carrossel
+CLASSE_SLIDER = "owl-stage-outer banner--large-default"
+
+# Devolve, em uma única chamada, os textos (títulos, spans 'text--*' e parágrafos,
+# nessa ordem) e os atributos do botão de cada item do carrossel. Itens sem
+# div-banner viram null; sem o slider, o script devolve null.
+SCRIPT_EXTRACAO_BANNERS = extracao.FUNCOES_JS + """
+var slider = Array.from(document.querySelectorAll("div.owl-stage-outer.banner--large-default"))
+    .filter(function (div) { return classes(div).join(" ") === "%s"; })[0];
+if (!slider) { return null; }
+function textos(elementos) {
+    return Array.from(elementos).map(function (el) { return texto(el, ""); })
+        .filter(function (t) { return t; });
+}
+return Array.from(slider.querySelectorAll("div.owl-item")).map(function (item) {
+    var banner = item.querySelector("div.div-banner");
+    if (!banner) { return null; }
+    var spans = Array.from(banner.querySelectorAll("span")).filter(function (span) {
+        return classes(span).some(function (c) { return c.indexOf("text--") === 0; });
+    });
+    var botao = Array.from(banner.querySelectorAll("button")).filter(function (b) {
+        return (b.getAttribute("class") || "").indexOf("banner-carousel-button") !== -1;
+    })[0];
+    return {
+        texts: textos(banner.querySelectorAll("h1, h2, h3"))
+            .concat(textos(spans), textos(banner.querySelectorAll("p"))),
+        tem_botao: !!botao,
+        onclick: atributo(botao, "onclick"),
+        gtm_label: atributo(botao, "data-gtm-event-label"),
+        gtm_action: atributo(botao, "data-gtm-event-action")
+    };
+});
+""" % CLASSE_SLIDER
+
+# Só o carrossel é analisado; o resto da página é descartado
+CONTAINER_SLIDER = analise_html.container("div", class_=CLASSE_SLIDER)
+SELETOR_SLIDER = analise_html.seletor("div.owl-stage-outer.banner--large-default")
+SELETOR_ITEM = analise_html.seletor("div.owl-item")
+SELETOR_BANNER = analise_html.seletor("div.div-banner")
+SELETOR_TITULOS = analise_html.seletor("h1, h2, h3")
+# Spans com alguma classe começando com 'text--'
+SELETOR_SPANS = analise_html.seletor('span[class^="text--"], span[class*=" text--"]')
+SELETOR_PARAGRAFOS = analise_html.seletor("p")
+SELETOR_BOTAO = analise_html.seletor('button[class*="banner-carousel-button"]')
 
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Executa o Chrome em modo headless
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+def banners_do_html(html, parser=None, restringir=True):
+    """
+    Extrai do HTML da página os mesmos campos brutos de SCRIPT_EXTRACAO_BANNERS.
+    Caminho de fallback (e de conferência) da extração no navegador.
+
+    Args:
+        parser (str, opcional): Parser do BeautifulSoup (padrão: lxml, se instalado).
+        restringir (bool): Analisa só o carrossel em vez do documento inteiro.
+
+    Returns:
+        list ou None: Um item por 'owl-item' (None se não houver div-banner);
+        None se o slider não existir.
+    """
+    soup = analise_html.criar_soup(html, CONTAINER_SLIDER if restringir else None, parser)
+    slider_div = next(
+        (div for div in SELETOR_SLIDER.select(soup) if div.get("class") == CLASSE_SLIDER.split()), None
     )
+    if not slider_div:
+        return None
 
-    # Inicializa o WebDriver
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.set_window_size(1920, 1080)
+    itens = []
+    for item in SELETOR_ITEM.select(slider_div):
+        banner_div = SELETOR_BANNER.select_one(item)
+        if not banner_div:
+            itens.append(None)
+            continue
+
+        # Títulos (h1, h2, h3), spans com classes que começam com 'text--' e parágrafos
+        tags = (
+            SELETOR_TITULOS.select(banner_div)
+            + SELETOR_SPANS.select(banner_div)
+            + SELETOR_PARAGRAFOS.select(banner_div)
+        )
+        texts = [text for text in (tag.get_text(strip=True) for tag in tags) if text]
+
+        button = SELETOR_BOTAO.select_one(banner_div)
+        itens.append({
+            "texts": texts,
+            "tem_botao": button is not None,
+            "onclick": button.get("onclick") if button else None,
+            "gtm_label": button.get("data-gtm-event-label") if button else None,
+            "gtm_action": button.get("data-gtm-event-action") if button else None,
+        })
+    return itens
+
+def coletar():
+    """
+    Etapa de coleta: acessa a página principal da Livelo e extrai os campos
+    brutos de cada item do carrossel. Não acessa o banco.
+
+    Returns:
+        list ou None: Itens do carrossel; None se o slider não foi encontrado
+        ([] se a página não carregou).
+    """
+    driver = navegador.criar_driver("banners")
 
     logging.info("Abrindo página principal da Livelo...")
-    driver.get(url)
+    navegador.abrir(driver, URL_HOME, "banners")
 
     try:
         # Aceitar cookies se o botão estiver presente
@@ -107,71 +264,48 @@ def extrair_banners():
         logging.info("Slider encontrado.")
     except Exception as e:
         logging.error(f"Timeout ao esperar o slider: {e}")
-        driver.quit()
+        navegador.encerrar_driver(driver)
         return []
 
-    # Aguarda um pouco para garantir que todos os elementos sejam carregados
-    time.sleep(2)
+    # Aguarda o carrossel terminar de montar os banners
+    espera.aguardar_estabilidade(driver, "div.owl-item", nome="banners.slider")
 
-    html = driver.page_source
-    driver.quit()
+    itens = extracao.coletar_cards(driver, SCRIPT_EXTRACAO_BANNERS, banners_do_html, "banners")
+    navegador.encerrar_driver(driver)
+    return itens
 
-    soup = BeautifulSoup(html, "html.parser")
-    slider_div = soup.find("div", class_="owl-stage-outer banner--large-default")
-    if not slider_div:
+def interpretar(itens):
+    """
+    Etapa de interpretação: converte os itens brutos do carrossel em banners
+    com os textos e o link de redirecionamento.
+    """
+    if itens is None:
         logging.error("Não foi possível encontrar a div do slider.")
         return []
 
-    # Encontra todos os itens do slider
-    owl_items = slider_div.find_all("div", class_="owl-item")
-    logging.info(f"Total de banners encontrados: {len(owl_items)}")
+    logging.info(f"Total de banners encontrados: {len(itens)}")
 
     banners = []
-    for idx, item in enumerate(owl_items, start=1):
+    for idx, item in enumerate(itens, start=1):
         # Cada 'owl-item' contém um banner
-        banner_div = item.find("div", class_="div-banner")
-        if not banner_div:
+        if item is None:
             logging.warning(f"BANNER {idx}: div-banner não encontrado.")
             continue
 
-        # Extrai todos os textos do banner
-        texts = []
-
-        # Extrai títulos (h1, h2, h3)
-        title_tags = banner_div.find_all(["h1", "h2", "h3"])
-        for tag in title_tags:
-            text = tag.get_text(strip=True)
-            if text:
-                texts.append(text)
-
-        # Extrai spans com classes que começem com 'text--'
-        span_tags = banner_div.find_all("span", class_=re.compile(r'^text--'))
-        for span in span_tags:
-            text = span.get_text(strip=True)
-            if text:
-                texts.append(text)
-
-        # Extrai parágrafos
-        p_tags = banner_div.find_all("p")
-        for p in p_tags:
-            text = p.get_text(strip=True)
-            if text:
-                texts.append(text)
+        texts = item["texts"]
 
         # Link de redirecionamento
-        button = banner_div.find("button", class_=re.compile(r'banner-carousel-button'))
         redirect_link = ""
-        if button:
-            onclick_attr = button.get("onclick", "")
-            match = re.search(r"window\.location\.href=['\"](.*?)['\"]", onclick_attr)
+        if item["tem_botao"]:
+            match = re.search(r"window\.location\.href=['\"](.*?)['\"]", item["onclick"] or "")
             if match:
                 redirect_link = match.group(1)
             else:
                 # Alternativamente, extrair de 'data-gtm-event-label'
-                redirect_link = button.get("data-gtm-event-label", "")
+                redirect_link = item["gtm_label"] or ""
                 if not redirect_link:
                     # Tentar extrair de 'data-gtm-event-action'
-                    redirect_link = button.get("data-gtm-event-action", "")
+                    redirect_link = item["gtm_action"] or ""
 
         banner_data = {
             "texts": texts,  # lista de todos os textos extraídos
@@ -188,45 +322,206 @@ def extrair_banners():
     logging.info(f"Total de banners válidos extraídos: {len(banners)}")
     return banners
 
-def salvar_banners_mysql(banners, connection):
+def extrair_banners():
     """
-    Insere os dados de banners no banco de dados MySQL.
+    Acessa a página principal da Livelo, extrai todos os textos dos banners,
+    incluindo títulos, subtítulos, textos adicionais, e links de redirecionamento,
+    retornando uma lista de dicionários.
+    """
+    return interpretar(coletar())
+
+def salvar_banners_mysql(banners, connection, data_hora_coleta=None):
+    """
+    Grava o snapshot de banners no formato normalizado, em uma única transação.
+    Se o carrossel for idêntico ao da coleta anterior, grava apenas uma linha
+    curta em snapshots. Caso contrário, registra os banners novos (uma única vez
+    por hash), a composição do carrossel e abre/fecha os intervalos de aparição.
     """
     if not banners:
         logging.warning("Lista de banners vazia; não há o que salvar.")
         return
 
-    # Lê o nome da tabela de banners (sem fallback)
-    table_banners = get_env_var("TABLE_BANNERS_LIV")
-
-    try:
-        cursor = connection.cursor()
-        insert_query = f"""
-        INSERT INTO {table_banners} (datahora_coleta, banners)
-        VALUES (%s, %s)
-        """
+    if data_hora_coleta is None:
         data_hora_coleta = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        banners_json = json.dumps(banners, ensure_ascii=False)  # Garante que caracteres especiais sejam mantidos
 
-        cursor.execute(insert_query, (
-            data_hora_coleta,
-            banners_json
-        ))
+    unicos = deduplicar_banners(banners)
+    if len(unicos) < len(banners):
+        logging.info(f"{len(banners) - len(unicos)} banners repetidos (clones do carrossel) descartados.")
+
+    try:
+        mudancas = gravar_snapshot(connection.cursor(), nomes_tabelas_banners(), unicos, data_hora_coleta)
         connection.commit()
-        logging.info("Banners inseridos no banco de dados com sucesso.")
+        if mudancas is None:
+            logging.info("Carrossel inalterado desde a última coleta; apenas o snapshot foi registrado.")
+        else:
+            logging.info(f"Snapshot de banners gravado: {mudancas[0]} entraram, {mudancas[1]} saíram do ar.")
     except mysql.connector.Error as err:
+        # Conexão perdida: quem chamou reconecta ou guarda os banners no spool
+        if banco.erro_de_conexao(err):
+            raise
+        connection.rollback()
         logging.error(f"Erro ao inserir banners no banco de dados: {err}")
 
-def main():
+def gravar_snapshot(cursor, tabelas, unicos, data_hora_coleta):
+    """
+    Grava um snapshot já deduplicado nas tabelas normalizadas. Não faz commit.
+
+    Args:
+        unicos (list of tuple): Pares (hash, banner) de deduplicar_banners.
+
+    Returns:
+        tuple ou None: (banners que entraram, banners que saíram do ar);
+        None se o carrossel não mudou desde o snapshot anterior.
+    """
+    hashes = [chave for chave, _ in unicos]
+    hash_snapshot = hashlib.sha256("".join(hashes).encode("ascii")).hexdigest()
+
+    cursor.execute(f"""
+        SELECT hash_snapshot, datahora_coleta FROM {tabelas["snapshots"]}
+        ORDER BY id DESC LIMIT 1
+    """)
+    anterior = cursor.fetchone()
+
+    cursor.execute(f"""
+        INSERT INTO {tabelas["snapshots"]} (datahora_coleta, hash_snapshot) VALUES (%s, %s)
+    """, (data_hora_coleta, hash_snapshot))
+
+    if anterior and anterior[0] == hash_snapshot:
+        return None
+
+    # Banners ainda não conhecidos entram uma única vez na tabela de conteúdo
+    cursor.executemany(f"""
+        INSERT IGNORE INTO {tabelas["conteudo"]} (hash, textos, redirect_link, primeira_aparicao)
+        VALUES (%s, %s, %s, %s)
+    """, [
+        (chave, json.dumps(banner["texts"], ensure_ascii=False), banner["redirect_link"], data_hora_coleta)
+        for chave, banner in unicos
+    ])
+    marcadores = ", ".join(["%s"] * len(hashes))
+    cursor.execute(f"""
+        SELECT hash, id FROM {tabelas["conteudo"]} WHERE hash IN ({marcadores})
+    """, hashes)
+    ids = dict(cursor.fetchall())
+
+    # Composição do carrossel, gravada só na primeira vez em que o hash aparece
+    cursor.executemany(f"""
+        INSERT IGNORE INTO {tabelas["snapshot_itens"]} (hash_snapshot, posicao, banner_id)
+        VALUES (%s, %s, %s)
+    """, [(hash_snapshot, posicao, ids[chave]) for posicao, chave in enumerate(hashes)])
+
+    # Intervalos de aparição: fecha os que saíram do ar e abre os que entraram
+    cursor.execute(f"SELECT banner_id FROM {tabelas['aparicoes']} WHERE fim IS NULL")
+    abertos = {banner_id for (banner_id,) in cursor.fetchall()}
+    atuais = set(ids.values())
+
+    sairam = abertos - atuais
+    if sairam:
+        marcadores = ", ".join(["%s"] * len(sairam))
+        # Fim = última coleta em que o banner ainda estava presente
+        cursor.execute(f"""
+            UPDATE {tabelas["aparicoes"]} SET fim = %s
+            WHERE fim IS NULL AND banner_id IN ({marcadores})
+        """, [anterior[1]] + list(sairam))
+
+    entraram = atuais - abertos
+    if entraram:
+        cursor.executemany(f"""
+            INSERT INTO {tabelas["aparicoes"]} (banner_id, inicio) VALUES (%s, %s)
+        """, [(banner_id, data_hora_coleta) for banner_id in entraram])
+    return len(entraram), len(sairam)
+
+def migrar_tabela_legada(connection, table_legada):
+    """
+    Copia, uma única vez, os snapshots da antiga tabela única de banners
+    (datahora_coleta, banners JSON) para as tabelas normalizadas, em ordem de
+    coleta e em uma única transação. Só roda com as tabelas normalizadas
+    vazias; a tabela antiga é mantida.
+
+    Returns:
+        int: Quantidade de snapshots copiados.
+    """
+    tabelas = nomes_tabelas_banners()
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {tabelas['snapshots']}")
+    (existentes,) = cursor.fetchone()
+    if existentes:
+        logging.warning(f"'{tabelas['snapshots']}' já tem {existentes} snapshots; a migração de "
+                        f"'{table_legada}' só roda com as tabelas normalizadas vazias.")
+        return 0
+
+    cursor.execute(f"SELECT datahora_coleta, banners FROM {table_legada} ORDER BY datahora_coleta, id")
+    linhas = cursor.fetchall()
+    copiados = 0
+    try:
+        for data_hora_coleta, banners_json in linhas:
+            unicos = deduplicar_banners(json.loads(banners_json) if banners_json else [])
+            if unicos:
+                gravar_snapshot(cursor, tabelas, unicos, data_hora_coleta)
+                copiados += 1
+        connection.commit()
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    logging.info(f"{copiados} de {len(linhas)} snapshots de '{table_legada}' copiados para as tabelas normalizadas.")
+    return copiados
+
+def gravar(banners, connection, data_hora_coleta=None):
+    """
+    Etapa de gravação: grava o snapshot de banners.
+    """
+    if banners:
+        salvar_banners_mysql(banners, connection, data_hora_coleta)
+
+def periodos_banner(connection, redirect_link):
+    """
+    Responde "quando esta campanha esteve no ar" com uma consulta indexada.
+    Intervalos ainda abertos terminam na última coleta registrada.
+
+    Returns:
+        list of tuple: (inicio, fim, textos) de cada aparição do link.
+    """
+    tabelas = nomes_tabelas_banners()
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT a.inicio,
+               COALESCE(a.fim, (SELECT MAX(datahora_coleta) FROM {tabelas["snapshots"]})),
+               c.textos
+        FROM {tabelas["conteudo"]} c
+        JOIN {tabelas["aparicoes"]} a ON a.banner_id = c.id
+        WHERE c.redirect_link = %s
+        ORDER BY a.inicio
+    """, (redirect_link,))
+    return [(inicio, fim, json.loads(textos)) for inicio, fim, textos in cursor.fetchall()]
+
+def executar(connection):
+    """
+    Executa o bot com uma conexão já aberta (usado por main e pelo orquestrador milog.py).
+    """
+    criar_tabela_banners(connection)
+    banco.reenviar_spool("banners", gravar, connection)
+    # Se o banco cair depois da coleta, os banners ficam no spool para a próxima execução
+    banco.gravar_ou_guardar("banners", gravar, extrair_banners(), connection)
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Coleta os banners da página principal da Livelo.")
+    parser.add_argument("--migrar-legado", action="store_true",
+                        help="Copia uma única vez as linhas da antiga tabela única de banners "
+                             "(TABLE_BANNERS_LIV) para as tabelas normalizadas e encerra.")
+    opcoes = parser.parse_args(argumentos)
+
     connection = conectar_banco()
-    if connection:
-        criar_tabela_banners(connection)
-        banners = extrair_banners()
-        if banners:
-            salvar_banners_mysql(banners, connection)
-        connection.close()
-    else:
+    if not connection:
         logging.error("Falha na conexão com o banco de dados. O bot será encerrado.")
+        return 1
+    try:
+        if opcoes.migrar_legado:
+            criar_tabela_banners(connection)
+            migrar_tabela_legada(connection, get_env_var("TABLE_BANNERS_LIV"))
+        else:
+            executar(connection)
+    finally:
+        connection.close()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
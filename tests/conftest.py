@@ -0,0 +1,33 @@
+import os
+import sys
+from urllib.parse import urlsplit
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório (sem pacote instalável)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import coleta_http
+import servidor_local
+
+@pytest.fixture
+def servir(tmp_path, monkeypatch):
+    """
+    Serve as páginas {módulo: html} nas URLs dos módulos, apontadas para o servidor local.
+    """
+    for variavel in ("MILOG_GRAVAR_RESPOSTAS", "ESFERA_API_URL", "LIVELO_PARITY_API_URL"):
+        monkeypatch.delenv(variavel, raising=False)
+    servidores = []
+
+    def servir(paginas):
+        for modulo, html in paginas.items():
+            (tmp_path / coleta_http.nome_arquivo_resposta(modulo.URL_PARCEIROS)).write_text(html, encoding="utf-8")
+        servidor, url_base = servidor_local.iniciar(str(tmp_path))
+        servidores.append(servidor)
+        for modulo in paginas:
+            partes = urlsplit(modulo.URL_PARCEIROS)
+            monkeypatch.setattr(modulo, "URL_PARCEIROS", url_base + partes.path)
+
+    yield servir
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
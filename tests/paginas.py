@@ -0,0 +1,40 @@
+import json
+
+# Páginas sintéticas da Esfera e da Livelo, com a estrutura das páginas reais,
+# usadas pelos testes da coleta via HTTP e da extração no navegador.
+
+PAGINA_ESFERA = """<html><body><div class="grid">
+<div class="col-xs-6 col-sm-3 col-lg-2">
+  <div class="box-partner-custom"><a href="/parceiro/loja-a"><img src="/a.png" alt="Loja A"></a></div>
+  <div class="-partnerName">Loja A</div>
+  <div class="-partnerPoints">Ganhe 3 pts a cada R$ 1 gasto</div>
+</div>
+<div class="col-xs-6 col-sm-3 col-lg-2">
+  <div class="box-partner-custom"><img src="/b.png" alt="Loja B"></div>
+  <div class="-partnerName">Loja B</div>
+  <div class="-partnerPoints">Até 10 pts por real gasto</div>
+</div>
+<div class="col-xs-6 col-sm-3 col-lg-2 destaque"><div class="-partnerName">Fora da grade</div></div>
+</div></body></html>"""
+
+PAGINA_LIVELO = """<html><body><div id="div-cardsParity">
+<div class="parity__card">
+  <img class="parity__card--img" src="/x.png" alt="Loja X">
+  <div class="info__value">ou até R$ 1 = até 6 Pontos Livelo</div>
+  <div class="info__club">R$ 1 = até 12</div>
+</div>
+<div class="parity__card">
+  <img class="parity__card--img" src="/y.png" alt="Loja Y">
+  <div class="info__value">R$ 2 = até 5 Pontos Livelo</div>
+</div>
+</div></body></html>"""
+
+# Sem o grid renderizado no servidor: os cards vêm do estado embutido na página
+ESTADO_LIVELO = {"parity": {"items": [
+    {"partnerName": "Loja X", "partnerImage": "/x.png", "parityText": "R$ 1 = até 6 Pontos Livelo"},
+    {"partnerName": "Loja Y", "partnerImage": "/y.png", "parityText": "R$ 2 = até 5 Pontos Livelo"},
+]}}
+PAGINA_LIVELO_JSON = (
+    "<html><head><script>window.__INITIAL_STATE__ = " + json.dumps(ESTADO_LIVELO) + ";</script></head>"
+    "<body><div id='app'></div></body></html>"
+)
@@ -0,0 +1,45 @@
+import esf
+import grade_esfera
+import liv
+from paginas import PAGINA_ESFERA, PAGINA_LIVELO, PAGINA_LIVELO_JSON
+
+# Offline: páginas sintéticas servidas por servidor_local (como as respostas
+# gravadas da bancada) e lidas por cards_via_http, sem navegador e sem banco.
+
+def test_cards_da_esfera(servir):
+    servir({grade_esfera: PAGINA_ESFERA})
+    cards = grade_esfera.cards_via_http()
+    assert cards == [
+        {"nome": "Loja A", "alt": "Loja A", "logo": "/a.png", "descricao": "Ganhe 3 pts a cada R$ 1 gasto",
+         "tem_link": True, "href": "/parceiro/loja-a"},
+        {"nome": "Loja B", "alt": "Loja B", "logo": "/b.png", "descricao": "Até 10 pts por real gasto",
+         "tem_link": False, "href": None},
+    ]
+    parceiros = esf.interpretar(cards, usar_cache=False)
+    assert [(p["nome"], p["moeda"], p["pontuacao"]) for p in parceiros] == [
+        ("Loja A", "R$", "3"), ("Loja B", "R$", "10"),
+    ]
+
+def test_cards_da_livelo(servir):
+    servir({liv: PAGINA_LIVELO})
+    cards = liv.cards_via_http()
+    assert cards == [
+        {"nome": "Loja X", "logo": "/x.png", "descricao": "ou até R$ 1 = até 6 Pontos Livelo", "clube": "R$ 1 = até 12"},
+        {"nome": "Loja Y", "logo": "/y.png", "descricao": "R$ 2 = até 5 Pontos Livelo", "clube": None},
+    ]
+    parceiros = liv.interpretar(cards, usar_cache=False)
+    assert [(p["nome"], p["moeda"], p["pontuacao"], p["pontuacao_clube_livelo"]) for p in parceiros] == [
+        ("Loja X", "R$", 6.0, 12.0), ("Loja Y", "R$", 2.5, "x"),
+    ]
+
+def test_cards_da_livelo_em_json_embutido(servir):
+    servir({liv: PAGINA_LIVELO_JSON})
+    assert liv.cards_via_http() == [
+        {"nome": "Loja X", "logo": "/x.png", "descricao": "R$ 1 = até 6 Pontos Livelo", "clube": None},
+        {"nome": "Loja Y", "logo": "/y.png", "descricao": "R$ 2 = até 5 Pontos Livelo", "clube": None},
+    ]
+
+def test_coleta_parcial_usa_o_navegador(servir):
+    servir({grade_esfera: PAGINA_ESFERA, liv: PAGINA_LIVELO})
+    assert grade_esfera.cards_via_http(minimo=3) is None
+    assert liv.cards_via_http(minimo=3) is None
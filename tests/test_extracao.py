@@ -0,0 +1,37 @@
+import shutil
+import pytest
+import extracao
+import grade_esfera
+import liv
+import navegador
+from paginas import PAGINA_ESFERA, PAGINA_LIVELO
+
+# Conferência das duas extrações: o script executado no Chrome headless
+# (SCRIPT_EXTRACAO_CARDS) tem de devolver exatamente os cards de cards_do_html,
+# o caminho de fallback com BeautifulSoup. Sem Chrome/chromedriver, é pulado.
+
+NAVEGADORES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+@pytest.fixture(scope="module")
+def driver():
+    if not any(shutil.which(nome) for nome in NAVEGADORES):
+        pytest.skip("Chrome não instalado.")
+    try:
+        driver = navegador.criar_driver("esf")
+    except Exception as e:  # WebDriverException, chromedriver ausente ou incompatível
+        pytest.skip(f"Chrome/chromedriver indisponível: {e}")
+    yield driver
+    driver.quit()
+
+@pytest.mark.parametrize("modulo, pagina", [(grade_esfera, PAGINA_ESFERA), (liv, PAGINA_LIVELO)], ids=["esf", "liv"])
+def test_script_do_navegador_confere_com_cards_do_html(driver, servir, monkeypatch, modulo, pagina):
+    monkeypatch.setenv("MILOG_EXTRACAO", "js")
+    servir({modulo: pagina})
+    navegador.abrir(driver, modulo.URL_PARCEIROS, "teste")
+
+    esperado = modulo.cards_do_html(pagina)
+    assert esperado
+    assert modulo.cards_do_html(driver.page_source) == esperado
+    # O script roda de fato (sem cair no fallback) e devolve os mesmos cards
+    assert extracao.extrair_no_navegador(driver, modulo.SCRIPT_EXTRACAO_CARDS, "teste") == esperado
+    assert extracao.coletar_cards(driver, modulo.SCRIPT_EXTRACAO_CARDS, modulo.cards_do_html, "teste") == esperado
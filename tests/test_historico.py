@@ -0,0 +1,151 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+import pytest
+import historico
+
+# Offline: o modo "gravar só mudanças" (linhas estendidas por visto_ate) tem de
+# mostrar a mesma série diária e os mesmos pesos que o modo de gravação completa.
+
+COLUNAS = ("data_hora_coleta", "moeda", "pontuacao", "empresa_id", "visto_ate")
+COMPARAR = ("moeda", "pontuacao")
+
+def cards(vistas):
+    # {empresa_id: valores} ou, com cards repetidos, [(empresa_id, valores), ...]
+    return list(vistas.items()) if isinstance(vistas, dict) else list(vistas)
+
+def gravar_completo(coletas):
+    """
+    Modo completo: uma linha por card em cada coleta.
+    """
+    tabela = []
+    for data_hora_coleta, vistas in coletas:
+        for empresa_id, (moeda, pontuacao) in cards(vistas):
+            tabela.append({"id": len(tabela) + 1, "empresa_id": empresa_id, "data_hora_coleta": data_hora_coleta,
+                           "visto_ate": data_hora_coleta, "vezes_vista": 1, "moeda": moeda, "pontuacao": pontuacao})
+    return tabela
+
+def gravar_so_mudancas(coletas):
+    """
+    Modo "só mudanças", como em salvar_relatorio_mysql: separar_linhas sobre a
+    última linha de cada empresa, marcar_vistas nas repetidas e registrar_coleta.
+    """
+    tabela, registradas = [], []
+    for data_hora_coleta, vistas in coletas:
+        linhas = [(data_hora_coleta, moeda, pontuacao, empresa_id, data_hora_coleta)
+                  for empresa_id, (moeda, pontuacao) in cards(vistas)]
+        ultimas = {}
+        for linha in tabela:
+            ultimas[linha["empresa_id"]] = linha
+        anterior = max((coleta for coleta in registradas if coleta < data_hora_coleta), default=None)
+        inserir, repetidas = historico.separar_linhas(COLUNAS, linhas, ultimas, COMPARAR, anterior)
+        for linha in tabela:
+            if linha["id"] in repetidas:
+                linha["visto_ate"] = data_hora_coleta
+                linha["vezes_vista"] += repetidas.count(linha["id"])
+        for linha in inserir:
+            tabela.append(dict(zip(COLUNAS, linha), id=len(tabela) + 1, vezes_vista=1))
+        registradas.append(data_hora_coleta)
+    return tabela, registradas
+
+def serie(tabela, empresa_id, coletas):
+    linhas = sorted(
+        (linha for linha in tabela if linha["empresa_id"] == empresa_id),
+        key=lambda linha: (linha["data_hora_coleta"], linha["id"]),
+    )
+    return historico.expandir_serie_diaria(
+        [(linha["data_hora_coleta"], linha["visto_ate"], linha["moeda"], linha["pontuacao"]) for linha in linhas],
+        coletas,
+    )
+
+def pesos(tabela, empresa_id):
+    contagem = Counter()
+    for linha in tabela:
+        if linha["empresa_id"] == empresa_id:
+            contagem[linha["pontuacao"]] += linha["vezes_vista"]
+    return contagem
+
+def conferir_modos(coletas):
+    completo = gravar_completo(coletas)
+    compacto, registradas = gravar_so_mudancas(coletas)
+    for empresa_id in {empresa_id for _, vistas in coletas for empresa_id, _ in cards(vistas)}:
+        esperada = {}
+        for data_hora_coleta, vistas in coletas:
+            for card_empresa, valores in cards(vistas):
+                if card_empresa == empresa_id:
+                    esperada[data_hora_coleta.date()] = valores
+        assert serie(completo, empresa_id, registradas) == sorted(esperada.items())
+        assert serie(compacto, empresa_id, registradas) == sorted(esperada.items())
+        assert pesos(compacto, empresa_id) == pesos(completo, empresa_id)
+    return compacto
+
+def d(dia, hora=15):
+    return datetime(2025, 1, dia, hora)
+
+def test_mesmo_dia_e_dias_nao_consecutivos():
+    coletas = [
+        (d(1, 9), {1: ("pts", 2.0), 2: ("pts", 1.0)}),
+        (d(1, 15), {1: ("pts", 3.0), 2: ("pts", 1.0)}),   # mudou no mesmo dia
+        (d(2, 9), {1: ("pts", 3.0), 2: ("pts", 1.0)}),
+        (d(2, 15), {1: ("pts", 2.0), 2: ("pts", 1.0)}),   # voltou ao valor anterior no mesmo dia
+        (d(5), {1: ("pts", 2.0), 2: ("pts", 1.0)}),       # dias 3 e 4 sem coleta
+        (d(6), {1: ("pts", 2.0)}),                        # empresa 2 ausente
+        (d(9), {1: ("pts", 2.0), 2: ("pts", 1.0)}),       # empresa 2 volta com o mesmo valor
+    ]
+    compacto = conferir_modos(coletas)
+    # A volta da empresa 2 depois da ausência gera linha nova
+    assert [linha["vezes_vista"] for linha in compacto if linha["empresa_id"] == 2] == [5, 1]
+
+def test_cards_repetidos_contam_cada_observacao():
+    # A mesma empresa em dois cards idênticos numa coleta: o modo completo
+    # grava duas linhas de peso 1; no "só mudanças" vezes_vista soma 2
+    coletas = [
+        (d(1), [(1, ("pts", 2.0)), (1, ("pts", 2.0)), (2, ("pts", 1.0))]),
+        (d(2), [(1, ("pts", 2.0)), (1, ("pts", 2.0)), (2, ("pts", 1.0))]),
+        (d(3), [(1, ("pts", 2.0)), (2, ("pts", 1.0)), (2, ("pts", 1.0))]),
+    ]
+    compacto = conferir_modos(coletas)
+    assert sum(linha["vezes_vista"] for linha in compacto if linha["empresa_id"] == 1) == 5
+    assert sum(linha["vezes_vista"] for linha in compacto if linha["empresa_id"] == 2) == 4
+
+def test_marcar_vistas_soma_cards_repetidos():
+    class Cursor:
+        def __init__(self):
+            self.comandos = []
+        def execute(self, sql, parametros):
+            self.comandos.append((" ".join(sql.split()), parametros))
+
+    class Conexao:
+        cursor_ = Cursor()
+        def cursor(self):
+            return self.cursor_
+
+    conexao = Conexao()
+    historico.marcar_vistas(conexao, "pontuacao", [7, 8, 7, 9], "2025-01-02 15:00:00")
+    assert conexao.cursor_.comandos == [
+        ("UPDATE pontuacao SET visto_ate = %s, vezes_vista = vezes_vista + %s WHERE id IN (%s, %s)",
+         ["2025-01-02 15:00:00", 1, 8, 9]),
+        ("UPDATE pontuacao SET visto_ate = %s, vezes_vista = vezes_vista + %s WHERE id IN (%s)",
+         ["2025-01-02 15:00:00", 2, 7]),
+    ]
+
+def test_serie_sem_coletas_registradas_mantem_intervalo_continuo():
+    linhas = [(d(1), d(3), "pts", 2.0)]
+    assert [dia.day for dia, _ in historico.expandir_serie_diaria(linhas)] == [1, 2, 3]
+    assert [dia.day for dia, _ in historico.expandir_serie_diaria(linhas, [d(1), d(3)])] == [1, 3]
+
+@pytest.mark.parametrize("semente", range(20))
+def test_historicos_sinteticos(semente):
+    sorteio = random.Random(semente)
+    instante = datetime(2025, 1, 1, 8)
+    coletas = []
+    for _ in range(40):
+        # Várias coletas no mesmo dia ou saltos de alguns dias
+        instante += timedelta(hours=sorteio.choice([3, 6, 24, 24, 48, 120]))
+        vistas = {
+            empresa_id: ("pts", sorteio.choice([1.0, 2.0, 2.0, 3.0]))
+            for empresa_id in range(1, 6) if sorteio.random() > 0.15
+        }
+        repetidos = [item for item in vistas.items() if sorteio.random() < 0.1]
+        coletas.append((instante, list(vistas.items()) + repetidos))
+    conferir_modos(coletas)
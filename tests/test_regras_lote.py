@@ -0,0 +1,17 @@
+import regras_lote
+import regras_pontuacao
+
+# O lote vetorizado (pandas) tem de dar o mesmo resultado que a interpretação
+# descrição a descrição.
+
+def test_lote_confere_com_a_interpretacao_individual():
+    assert regras_lote.conferir(5000) == 0
+
+def test_corpus_em_lote():
+    corpus = regras_pontuacao.carregar_corpus()
+    for programa, (lote, individual) in regras_lote.PROGRAMAS.items():
+        descricoes = [
+            item["descricao"] for item in corpus
+            if item["programa"] == programa and regras_lote.sem_divisao_por_zero(individual, item["descricao"])
+        ]
+        assert lote(descricoes) == [individual(descricao) for descricao in descricoes]
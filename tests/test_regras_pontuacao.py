@@ -0,0 +1,18 @@
+import pytest
+import regras_pontuacao
+
+# O motor de regras tem de reproduzir as implementações de referência (as
+# if-chains anteriores) em todo o corpus e em descrições montadas com ele.
+
+CORPUS = regras_pontuacao.carregar_corpus()
+
+@pytest.mark.parametrize(
+    "item", CORPUS, ids=[f"{item['programa']}-{i}" for i, item in enumerate(CORPUS)]
+)
+def test_corpus(item):
+    motor, referencia = regras_pontuacao.PROGRAMAS[item["programa"]]
+    assert list(referencia(item["descricao"])) == item["esperado"]
+    assert list(motor(item["descricao"])) == item["esperado"]
+
+def test_descricoes_aleatorias_conferem_com_a_referencia():
+    assert regras_pontuacao.conferir(aleatorias=5000) == 0
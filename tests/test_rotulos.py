@@ -0,0 +1,57 @@
+import random
+import pytest
+import esf
+import liv
+import rotulos
+
+# Offline: a label calculada a partir dos agregados (rotulos.calcular_label_agregado)
+# tem de ser idêntica à de calcular_label_pontuacao de cada programa aplicada
+# ao histórico completo, inclusive com linhas de peso > 1 (modo "só mudanças")
+# e empates na moda.
+
+PROGRAMAS = [esf.calcular_label_pontuacao, liv.calcular_label_pontuacao]
+
+def label_do_agregado(linhas):
+    agregado = rotulos.novo_agregado()
+    for pontuacao, peso in linhas:
+        rotulos.agregar(agregado, rotulos.normalizar_pontuacao(pontuacao), peso)
+    return rotulos.calcular_label_agregado(agregado)
+
+def historico_completo(linhas):
+    # Cada linha vale por 'peso' coletas, como em verificar_labels
+    return [rotulos.normalizar_pontuacao(pontuacao) for pontuacao, peso in linhas for _ in range(peso)]
+
+CASOS = {
+    "sem dados": [],
+    "valor único": [(2.0, 1)],
+    "constante com peso": [(3.0, 5)],
+    "tudo zero": [(0.0, 2), (0.0, 1)],
+    "empate na moda fica com a maior": [(1.0, 2), (4.0, 2), (2.0, 1)],
+    "empate desfeito pelo peso": [(1.0, 1), (4.0, 1), (1.0, 3), (4.0, 1)],
+    "última ótima": [(1.0, 4), (3.0, 1)],
+    "última boa": [(2.0, 3), (3.0, 1)],
+    "última igual à moda": [(2.0, 3), (5.0, 1), (2.0, 1)],
+    "última pouco abaixo": [(2.0, 3), (1.5, 1)],
+    "última má": [(2.0, 3), (0.5, 2)],
+    "limite exato do dobro": [(2.0, 3), (4.0, 1)],
+    "limite exato da metade": [(2.0, 3), (1.0, 1)],
+    "valores não numéricos viram zero": [("x", 2), (1.0, 1)],
+    "precisão do FLOAT": [(0.1 + 0.2, 2), (0.3, 1), (1.2345678, 1)],
+}
+
+@pytest.mark.parametrize("calcular_label_pontuacao", PROGRAMAS, ids=["esf", "liv"])
+@pytest.mark.parametrize("linhas", list(CASOS.values()), ids=list(CASOS))
+def test_label_dos_casos(calcular_label_pontuacao, linhas):
+    assert label_do_agregado(linhas) == calcular_label_pontuacao(historico_completo(linhas))
+
+@pytest.mark.parametrize("calcular_label_pontuacao", PROGRAMAS, ids=["esf", "liv"])
+def test_label_de_historicos_sinteticos(calcular_label_pontuacao):
+    sorteio = random.Random(0)
+    # Poucos valores distintos para forçar empates; pesos > 1 como no modo "só mudanças"
+    valores = [0.0, 0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 8.0]
+    for _ in range(3000):
+        linhas = [
+            (sorteio.choice(valores), sorteio.choice([1, 1, 1, 2, 3, 7]))
+            for _ in range(sorteio.randint(1, 12))
+        ]
+        assert label_do_agregado(linhas) == calcular_label_pontuacao(historico_completo(linhas)), linhas